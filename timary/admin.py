@@ -1,32 +1,49 @@
+from datetime import timedelta
+
 from django import forms
+from django.conf import settings
 from django.contrib import admin, messages
-from django.db.models import Sum
 from django.template.response import TemplateResponse
 from django.urls import path
+from django.utils import timezone
 from django_otp.admin import OTPAdminSite
 
+from timary.analytics import AdminAnalytics
+from timary.cache import ADMIN_ANALYTICS, cache_stats, cached, invalidate_user_cache
 from timary.invoice_builder import InvoiceBuilder
+from timary.middlware import view_metrics
 from timary.models import (
-    Contract,
     Expenses,
+    HoursImport,
     HoursLineItem,
     IntervalInvoice,
-    Invoice,
     MilestoneInvoice,
+    MonthlyRevenue,
     Proposal,
     SentInvoice,
     SingleInvoice,
+    StripeEvent,
+    TaskRun,
     User,
     WeeklyInvoice,
 )
 
 # Register your models here.
 from timary.services.email_service import EmailService
+from timary.task_queue import task_metrics
+
+
+def invalidate_invoice_users(queryset):
+    # queryset.update() skips Invoice.save(), which bumps the user's data version.
+    # The actions set updated_at themselves, cached invoice cards and hour rows are keyed on it.
+    for user_id in set(queryset.values_list("user_id", flat=True)):
+        invalidate_user_cache(user_id)
 
 
 @admin.action(description="Pause selected invoices")
 def pause_invoices(modeladmin, request, queryset):
-    updated = queryset.update(is_paused=True)
+    updated = queryset.update(is_paused=True, updated_at=timezone.now())
+    invalidate_invoice_users(queryset)
     modeladmin.message_user(
         request,
         f"{updated} invoices were paused",
@@ -36,7 +53,8 @@ def pause_invoices(modeladmin, request, queryset):
 
 @admin.action(description="Unpause selected invoices")
 def unpause_invoices(modeladmin, request, queryset):
-    updated = queryset.update(is_paused=False)
+    updated = queryset.update(is_paused=False, updated_at=timezone.now())
+    invalidate_invoice_users(queryset)
     modeladmin.message_user(
         request,
         f"{updated} invoices were unpaused",
@@ -46,7 +64,8 @@ def unpause_invoices(modeladmin, request, queryset):
 
 @admin.action(description="Archive selected invoices")
 def archive_invoices(modeladmin, request, queryset):
-    updated = queryset.update(is_archived=True)
+    updated = queryset.update(is_archived=True, updated_at=timezone.now())
+    invalidate_invoice_users(queryset)
     modeladmin.message_user(
         request,
         f"{updated} invoices were archived",
@@ -56,7 +75,8 @@ def archive_invoices(modeladmin, request, queryset):
 
 @admin.action(description="Unarchive selected invoices")
 def unarchive_invoices(modeladmin, request, queryset):
-    updated = queryset.update(is_archived=False)
+    updated = queryset.update(is_archived=False, updated_at=timezone.now())
+    invalidate_invoice_users(queryset)
     modeladmin.message_user(
         request,
         f"{updated} invoices were unarchived",
@@ -149,7 +169,17 @@ class SentInvoiceAdmin(admin.ModelAdmin):
 
     @admin.action(description="Cancel selected sent invoices")
     def cancel_sent_invoice(self, request, queryset):
+        months = {
+            sent_invoice.revenue_state()[:2]
+            for sent_invoice in queryset
+            if sent_invoice.revenue_state()
+        }
+        user_ids = set(queryset.values_list("user_id", flat=True))
         updated = queryset.update(paid_status=SentInvoice.PaidStatus.CANCELLED)
+        for invoice_month in months:
+            MonthlyRevenue.refresh(*invoice_month)
+        for user_id in user_ids:
+            invalidate_user_cache(user_id)
         self.message_user(
             request,
             f"{updated} sent invoices were cancelled",
@@ -172,6 +202,8 @@ class HoursLineItemAdmin(admin.ModelAdmin):
     @admin.action(description="Cancel recurring schedule for selected hour line items")
     def cancel_recurring_hours(self, request, queryset):
         updated = queryset.update(recurring_logic=None)
+        for user_id in set(queryset.values_list("invoice__user_id", flat=True)):
+            invalidate_user_cache(user_id)
 
         self.message_user(
             request,
@@ -248,6 +280,67 @@ class ExpensesAdmin(admin.ModelAdmin):
     search_fields = ("description", "invoice__title", "date_tracked", "cost")
 
 
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = [
+        "event_type",
+        "event_id",
+        "created_at",
+        "claimed_at",
+        "processed_at",
+        "attempts",
+    ]
+    list_filter = ("event_type",)
+    search_fields = ("event_id",)
+    readonly_fields = ["event_id", "event_type", "payload", "error"]
+
+
+class HoursImportAdmin(admin.ModelAdmin):
+    list_display = [
+        "user",
+        "status",
+        "created_at",
+        "total_rows",
+        "imported_rows",
+        "error_count",
+    ]
+    list_filter = ("status", "created_at")
+    search_fields = ("user__email",)
+    readonly_fields = ["errors"]
+
+
+class TaskRunAdmin(admin.ModelAdmin):
+    """Slowest runs first, filter by task to compare runs of the same job"""
+
+    list_display = [
+        "task",
+        "started_at",
+        "duration_ms",
+        "query_count",
+        "query_time_ms",
+        "external_call_count",
+        "rows_processed",
+        "success",
+    ]
+    list_filter = ("task", "success", "started_at")
+    search_fields = ("task", "result")
+    ordering = ["-duration_ms"]
+    date_hierarchy = "started_at"
+    readonly_fields = [
+        "task",
+        "started_at",
+        "duration_ms",
+        "query_count",
+        "query_time_ms",
+        "external_calls",
+        "rows_processed",
+        "success",
+        "result",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(User, UserAdmin)
 admin.site.register(IntervalInvoice, IntervalInvoiceAdmin)
 admin.site.register(MilestoneInvoice, MilestoneInvoiceAdmin)
@@ -255,8 +348,11 @@ admin.site.register(WeeklyInvoice, WeeklyInvoiceAdmin)
 admin.site.register(SingleInvoice)
 admin.site.register(SentInvoice, SentInvoiceAdmin)
 admin.site.register(HoursLineItem, HoursLineItemAdmin)
+admin.site.register(HoursImport, HoursImportAdmin)
 admin.site.register(Expenses, ExpensesAdmin)
 admin.site.register(Proposal)
+admin.site.register(StripeEvent, StripeEventAdmin)
+admin.site.register(TaskRun, TaskRunAdmin)
 
 
 class SendEmailForm(forms.Form):
@@ -291,38 +387,20 @@ class TimaryAdminSite(OTPAdminSite):
     index_template = "admin/custom_index.html"
 
     def analytics(self, request):
-        users = {
-            "total": int(User.objects.exclude(stripe_subscription_status=3).count())
-        }
-        sent_invoices = {
-            "total": SentInvoice.objects.count(),
-            "pending": SentInvoice.objects.filter(
-                paid_status=SentInvoice.PaidStatus.PENDING
-            ).count(),
-            "paid": SentInvoice.objects.filter(
-                paid_status=SentInvoice.PaidStatus.PAID
-            ).count(),
-            "failed": SentInvoice.objects.filter(
-                paid_status=SentInvoice.PaidStatus.FAILED
-            ).count(),
-        }
-        overall_stats = {
-            "hour_total": int(
-                HoursLineItem.objects.aggregate(total=Sum("quantity"))["total"]
-            ),
-            "invoice_total": Invoice.objects.count(),
-            "contracts_total": Contract.objects.count(),
-        }
-        money_stats = {
-            "recurring": int(users["total"]) * 29,
-        }
-        money_stats["mrr_goal"] = (money_stats["recurring"]) / 10_000
         context = {
             "text": "Hello World",
-            "users": users,
-            "sent_invoices": sent_invoices,
-            "overall_stats": overall_stats,
-            "money_stats": money_stats,
+            **cached(
+                ADMIN_ANALYTICS,
+                AdminAnalytics.get_stats,
+                timeout=settings.ADMIN_ANALYTICS_REFRESH_INTERVAL,
+                refresh="refresh" in request.GET,
+            ),
+            "cache_stats": cache_stats(),
+            "task_metrics": task_metrics(),
+            "view_metrics": view_metrics(),
+            "slowest_task_runs": TaskRun.objects.filter(
+                started_at__gte=timezone.now() - timedelta(days=7)
+            ).order_by("-duration_ms")[:10],
             "page_name": "Custom Page",
             "app_list": self.get_app_list(request),
             **self.each_context(request),
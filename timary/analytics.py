@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from timary.models import Contract, HoursLineItem, Invoice, SentInvoice, User
+
+
+class AdminAnalytics:
+    """Site wide stats for the admin analytics page, each section is a single query"""
+
+    @staticmethod
+    def get_user_stats():
+        statuses = User.StripeSubscriptionStatus
+        stats = User.objects.aggregate(
+            total=Count("id", filter=~Q(stripe_subscription_status=statuses.INACTIVE)),
+            active=Count("id", filter=Q(stripe_subscription_status=statuses.ACTIVE)),
+            trial=Count("id", filter=Q(stripe_subscription_status=statuses.TRIAL)),
+            mrr=Sum(
+                "stripe_subscription_recurring_price",
+                filter=Q(stripe_subscription_status=statuses.ACTIVE),
+            ),
+        )
+        stats["mrr"] = stats["mrr"] or 0
+        return stats
+
+    @staticmethod
+    def get_sent_invoice_stats():
+        statuses = SentInvoice.PaidStatus
+        return SentInvoice.objects.aggregate(
+            total=Count("id"),
+            pending=Count("id", filter=Q(paid_status=statuses.PENDING)),
+            paid=Count("id", filter=Q(paid_status=statuses.PAID)),
+            failed=Count("id", filter=Q(paid_status=statuses.FAILED)),
+            cancelled=Count("id", filter=Q(paid_status=statuses.CANCELLED)),
+        )
+
+    @staticmethod
+    def get_overall_stats():
+        return {
+            "hour_total": int(
+                HoursLineItem.objects.aggregate(total=Sum("quantity"))["total"] or 0
+            ),
+            "invoice_total": Invoice.objects.count(),
+            "contracts_total": Contract.objects.count(),
+        }
+
+    @staticmethod
+    def get_weekly_series(weeks=12):
+        """Signups and paid sent invoice volume for each of the last few weeks, oldest first"""
+        today = timezone.localdate()
+        this_week = today - timedelta(days=today.weekday())
+        week_starts = [this_week - timedelta(weeks=w) for w in reversed(range(weeks))]
+        start = datetime.combine(
+            week_starts[0], datetime.min.time(), tzinfo=timezone.get_current_timezone()
+        )
+
+        signups = dict(
+            User.objects.filter(date_joined__gte=start)
+            .annotate(week=TruncWeek("date_joined"))
+            .values("week")
+            .annotate(total=Count("id"))
+            .values_list("week", "total")
+        )
+        paid_volume = dict(
+            SentInvoice.objects.filter(
+                paid_status=SentInvoice.PaidStatus.PAID,
+                date_paid__gte=start,
+            )
+            .annotate(week=TruncWeek("date_paid"))
+            .values("week")
+            .annotate(total=Sum("total_price"))
+            .values_list("week", "total")
+        )
+        signups = {week.date(): total for week, total in signups.items()}
+        paid_volume = {week.date(): total for week, total in paid_volume.items()}
+        return [
+            {
+                "week": week,
+                "signups": signups.get(week, 0),
+                "paid_volume": float(paid_volume.get(week, 0)),
+            }
+            for week in week_starts
+        ]
+
+    @classmethod
+    def get_stats(cls):
+        users = cls.get_user_stats()
+        return {
+            "users": users,
+            "sent_invoices": cls.get_sent_invoice_stats(),
+            "overall_stats": cls.get_overall_stats(),
+            "money_stats": {
+                "recurring": users["mrr"],
+                "mrr_goal": users["mrr"] / 10_000 * 100,
+            },
+            "weekly_series": cls.get_weekly_series(),
+            "computed_at": timezone.now(),
+        }
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TimaryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "timary"
+
+    def ready(self):
+        from django_q.signals import post_execute, pre_enqueue, pre_execute
+
+        from timary.task_queue import record_enqueue, record_execute, record_result
+        from timaryproject.database import configure_sqlite_connection
+
+        connection_created.connect(
+            configure_sqlite_connection, dispatch_uid="configure_sqlite_connection"
+        )
+        pre_enqueue.connect(record_enqueue, dispatch_uid="task_metrics_enqueue")
+        pre_execute.connect(record_execute, dispatch_uid="task_metrics_execute")
+        post_execute.connect(record_result, dispatch_uid="task_metrics_result")
@@ -0,0 +1,152 @@
+import functools
+import hashlib
+import time
+import zoneinfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag
+
+# Names of the cached reads, used to report hit/miss counters
+HOURS_TRACKED = "hours_tracked"
+PENDING_SENT_INVOICES = "pending_sent_invoices"
+HOURS_CALENDAR = "hours_calendar"
+ADMIN_ANALYTICS = "admin_analytics"
+CACHED_READS = [HOURS_TRACKED, PENDING_SENT_INVOICES, HOURS_CALENDAR, ADMIN_ANALYTICS]
+
+_missing = object()
+
+
+def _version_key(user_id):
+    return f"user_cache_version:{user_id}"
+
+
+def user_data_version(user_id):
+    """
+    Changes whenever the user's hours, invoices, sent invoices or clients are written (see invalidate_user_cache).
+    A version is seeded with the current time so an evicted version never brings back older entries.
+    """
+    return cache.get_or_set(_version_key(user_id), time.time_ns, timeout=None)
+
+
+def user_cache_key(user_id, name, *parts):
+    """Keys are namespaced by the user's data version, bumping it orphans every cached read for that user"""
+    version = user_data_version(user_id)
+    return ":".join([f"user:{user_id}", f"v{version}", name, *map(str, parts)])
+
+
+def invalidate_user_cache(user_id):
+    """
+    Bump the version once the write commits, a request reading the old rows in the meantime
+    can't cache them under the new version.
+    """
+    if not user_id:
+        return
+    transaction.on_commit(lambda: bump_user_data_version(user_id))
+
+
+def bump_user_data_version(user_id):
+    # A new version instead of cache.incr, FileBasedCache's incr is a get then a set
+    # and two concurrent bumps could store the same version
+    cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def user_data_etag(request, *args, **kwargs):
+    """
+    ETag for a partial rendered from the user's data, computed without the view's queries.
+    Also changes with the user's profile, their day rolling over and their CSRF token, which forms embed.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    parts = [
+        user_data_version(user.id),
+        user.updated_at.isoformat(),
+        timezone.now().astimezone(zoneinfo.ZoneInfo(user.timezone)).date(),
+        request.META.get("CSRF_COOKIE", ""),
+    ]
+    return hashlib.md5(
+        ":".join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def conditional_on_user_data(etag_func=user_data_etag):
+    """
+    Answer GETs with 304 Not Modified while the ETag still matches.
+    Responses are private and always revalidated, so HTMX swaps send If-None-Match and reuse the cached partial.
+    """
+
+    def decorator(view_func):
+        conditional_view = etag(etag_func)(view_func)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def incr_counter(key, amount=1):
+    """Counters shared by every process, they never expire"""
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        pass
+
+
+def set_max(key, value):
+    if value > (cache.get(key) or 0):
+        cache.set(key, value, timeout=None)
+
+
+def record(name, outcome):
+    incr_counter(f"cache_stats:{name}:{outcome}")
+
+
+def cache_stats(names=None):
+    """Hit and miss counters for each cached read"""
+    names = names or CACHED_READS
+    keys = [
+        f"cache_stats:{name}:{outcome}"
+        for name in names
+        for outcome in ["hits", "misses"]
+    ]
+    counts = cache.get_many(keys)
+    return {
+        name: {
+            "hits": counts.get(f"cache_stats:{name}:hits", 0),
+            "misses": counts.get(f"cache_stats:{name}:misses", 0),
+        }
+        for name in names
+    }
+
+
+def get_or_compute(key, name, compute, timeout=None, refresh=False):
+    value = _missing if refresh else cache.get(key, _missing)
+    if value is _missing:
+        record(name, "misses")
+        value = compute()
+        cache.set(key, value, timeout or settings.CACHE_TIMEOUT)
+    else:
+        record(name, "hits")
+    return value
+
+
+def cached_for_user(user, name, compute, *parts, timeout=None):
+    """Cache the result of compute() for a user until it expires or the user's data changes"""
+    return get_or_compute(user_cache_key(user.id, name, *parts), name, compute, timeout)
+
+
+def cached(name, compute, *parts, timeout=None, refresh=False):
+    """Cache the result of compute() shared across all users, refresh=True recomputes it now"""
+    return get_or_compute(
+        ":".join([name, *map(str, parts)]), name, compute, timeout, refresh
+    )
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 
 from timary.models import User
 from timary.utils import show_active_timer
@@ -12,6 +13,15 @@ def debug_mode(request):
     return {"debug_mode": settings.DEBUG}
 
 
+def lazy_values(compute, *keys):
+    """
+    Expose the dict compute() returns as lazy template values, compute() only runs once a template reads one.
+    HTMX partials and pages that don't show them skip the work entirely.
+    """
+    values = SimpleLazyObject(compute)
+    return {key: SimpleLazyObject(lambda key=key: values.get(key, "")) for key in keys}
+
+
 def random_page_title(request):
     from random import choice
 
@@ -22,25 +32,39 @@ def random_page_title(request):
         "Tired of invoicing for the same hours every week?",
         "Time tracking, invoicing and bookkeeping. Oh my!",
     ]
-    return {"random_page_title": choice(page_titles)}
+    return {"random_page_title": SimpleLazyObject(lambda: choice(page_titles))}
 
 
-def completed_connect_account(request):
+def get_connect_status(user):
     # connect_status == 0 => Account complete
     # connect_status == 1 => Pending verifications
     # connect_status == 2 => More info needed
-    if hasattr(request.user, "stripe_connect_id"):
-        user_connect_reason = request.user.stripe_connect_reason
+    if hasattr(user, "stripe_connect_id"):
+        user_connect_reason = user.stripe_connect_reason
         if user_connect_reason == User.StripeConnectDisabledReasons.NONE:
-            return {"connect_status": 0}
+            return 0
         elif user_connect_reason == User.StripeConnectDisabledReasons.PENDING:
-            return {"connect_status": 1}
-    return {"connect_status": 2}
+            return 1
+    return 2
 
 
-def timer(request):
-    if "Hx-Request" in request.headers or not request.user.is_authenticated:
+def completed_connect_account(request):
+    return {
+        "connect_status": SimpleLazyObject(lambda: get_connect_status(request.user))
+    }
+
+
+def get_timer(request):
+    if not request.user.is_authenticated:
         return {}
     ctx = show_active_timer(request.user)
     ctx.update({"is_main_view": request.path == "/main/"})
     return ctx
+
+
+def timer(request):
+    if "Hx-Request" in request.headers:
+        return {}
+    return lazy_values(
+        lambda: get_timer(request), "active_timer_ms", "timer_running", "is_main_view"
+    )
@@ -16,10 +16,28 @@ class AccountingError(Exception):
     def __str__(self):
         return f"AccountingError, {self.requests_response.reason}"
 
+    @property
+    def is_rate_limited(self):
+        return getattr(self.requests_response, "status_code", None) == 429
+
+    @property
+    def retry_after(self):
+        try:
+            return float(self.requests_response.headers.get("Retry-After", 60))
+        except (AttributeError, ValueError):
+            return 60
+
     def log(self, initial_sync=False):
         self.initial_sync = initial_sync
         from timary.models import User
 
+        if self.is_rate_limited and not initial_sync:
+            # Sync has been rescheduled, no need to bother the user.
+            return (
+                f"{self.service.title()} is busy right now, "
+                f"we'll retry syncing in {int(self.retry_after) or 1} seconds."
+            )
+
         user = User.objects.get(id=self.user_id)
         if initial_sync:
             # Remove the account ids if an error occurs after we get their integration tokens,
@@ -127,3 +145,22 @@ Timary Team
             # Sage account is not active anymore.
             if first_error["$dataCode"] == "AuthorizationFailure":
                 return "Your Sage account seems to be in-active. Please re-activate to sync your invoices."
+
+
+class AccountingRateLimitError(AccountingError):
+    """Raised before calling the provider when the org's request quota is used up."""
+
+    def __init__(self, user=None, retry_after=60):
+        super().__init__(user=user)
+        self._retry_after = retry_after
+
+    def __str__(self):
+        return f"AccountingRateLimitError, retry after {self._retry_after:.1f}s"
+
+    @property
+    def is_rate_limited(self):
+        return True
+
+    @property
+    def retry_after(self):
+        return self._retry_after
@@ -1,19 +1,25 @@
 import datetime
 import zoneinfo
+from collections import defaultdict
 from decimal import Decimal
 
 import pytz
 from dateutil.relativedelta import relativedelta
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.db import transaction
 from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.http import QueryDict
 from django.utils import timezone
 from phonenumber_field.formfields import PhoneNumberField
 
 from timary.models import (
     Client,
     Expenses,
+    HoursImport,
     HoursLineItem,
     IntervalInvoice,
     Invoice,
@@ -50,6 +56,35 @@ class LineItemForm(forms.ModelForm):
             self.fields["unit_price"].widget.attrs["readonly"] = True
 
 
+class InvoiceChoices:
+    """
+    Invoices a user can log hours to, queried once and shared by every HoursLineItemForm
+    built with it, e.g. a form per hour when editing a sent invoice's hours.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._invoices = {}
+
+    def queryset(self, include_paused=False):
+        invoices = self.user.get_invoices.filter(is_paused=False)
+        if include_paused:
+            invoices = self.user.get_all_invoices()
+        # Exclude Single invoices and Milestone invoices that have been completed
+        return (
+            invoices.exclude(Q(instance_of=SingleInvoice))
+            .annotate(mts=F("MilestoneInvoice___milestone_total_steps"))
+            .exclude(
+                Q(mts__isnull=False, MilestoneInvoice___milestone_step__gt=F("mts"))
+            )
+        )
+
+    def get(self, include_paused=False):
+        if include_paused not in self._invoices:
+            self._invoices[include_paused] = list(self.queryset(include_paused))
+        return self._invoices[include_paused]
+
+
 class HoursLineItemForm(forms.ModelForm):
     date_tracked = forms.DateTimeField(
         required=True,
@@ -84,6 +119,7 @@ class HoursLineItemForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop("user") if "user" in kwargs else None
         self.min_date = kwargs.pop("min_date") if "min_date" in kwargs else None
+        invoice_choices = kwargs.pop("invoice_choices", None)
 
         super(HoursLineItemForm, self).__init__(*args, **kwargs)
 
@@ -92,25 +128,32 @@ class HoursLineItemForm(forms.ModelForm):
         )
         if self.user:
             users_localtime = get_users_localtime(self.user)
-            invoices = self.user.get_invoices.filter(is_paused=False)
-            if self.instance.pk and self.instance.sent_invoice_id is not None:
-                # For updating sent invoices hours that are eligible, include all invoices, not excluding paused
-                invoices = self.user.get_all_invoices()
-            # Exclude Single invoices and Milestone invoices that have been completed
-            invoice_qs = (
-                invoices.exclude(Q(instance_of=SingleInvoice))
-                .annotate(mts=F("MilestoneInvoice___milestone_total_steps"))
-                .exclude(
-                    Q(mts__isnull=False, MilestoneInvoice___milestone_step__gt=F("mts"))
-                )
+            invoice_choices = invoice_choices or InvoiceChoices(self.user)
+            # For updating sent invoices hours that are eligible, include all invoices, not excluding paused
+            include_paused = bool(
+                self.instance.pk and self.instance.sent_invoice_id is not None
             )
-            invoice_qs_count = invoice_qs.count()
-            if invoice_qs.count() > 0:
-                self.fields["invoice"].queryset = invoice_qs
-                self.fields["invoice"].initial = invoice_qs.first()
+            invoices = invoice_choices.get(include_paused)
+            invoice_field = self.fields["invoice"]
+            if len(invoices) > 0:
+                invoice_field.queryset = invoice_choices.queryset(include_paused)
+                # Render from the shared list instead of querying again for every form
+                iterator = invoice_field.iterator(invoice_field)
+                invoice_field.choices = (
+                    [("", invoice_field.empty_label)]
+                    if invoice_field.empty_label is not None
+                    else []
+                ) + [iterator.choice(invoice) for invoice in invoices]
+                invoice_field.initial = min(invoices, key=lambda invoice: invoice.pk)
+                # The hour's invoice is usually one of the choices, reuse it instead of fetching it per form
+                invoice = next(
+                    (i for i in invoices if i.pk == self.instance.invoice_id), None
+                )
+                if invoice:
+                    self.instance.invoice = invoice
             else:
-                self.fields["invoice"].queryset = RecurringInvoice.objects.none()
-            self.fields["invoice"].widget.attrs["qs_count"] = invoice_qs_count
+                invoice_field.queryset = RecurringInvoice.objects.none()
+            invoice_field.widget.attrs["qs_count"] = len(invoices)
 
         date_tracked = users_localtime.date()
 
@@ -219,7 +262,7 @@ class HoursLineItemForm(forms.ModelForm):
             )
             sum_hours_for_day = (
                 HoursLineItem.objects.filter(
-                    date_tracked__range=date_tracked_range
+                    invoice__user=self.user, date_tracked__range=date_tracked_range
                 ).aggregate(sum_q=Sum("quantity"))["sum_q"]
                 or 0
             )
@@ -276,6 +319,114 @@ class HoursLineItemForm(forms.ModelForm):
         return validated_data
 
 
+class BaseHoursFormSet(forms.BaseFormSet):
+    """
+    Many rows of hours, e.g. a week of hours across invoices, validated together and
+    created in one insert. Every row shares the same invoice choices.
+    """
+
+    def __init__(self, *args, user=None, **kwargs):
+        self.user = user
+        kwargs["form_kwargs"] = {
+            "user": user,
+            "invoice_choices": InvoiceChoices(user),
+            **kwargs.get("form_kwargs", {}),
+        }
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def from_rows(cls, rows, user):
+        """Build the bound formset from a list of dicts, one per hours row"""
+        prefix = cls.get_default_prefix()
+        data = QueryDict(mutable=True)
+        data[f"{prefix}-TOTAL_FORMS"] = len(rows)
+        data[f"{prefix}-INITIAL_FORMS"] = 0
+        for index, row in enumerate(rows):
+            for field, value in row.items():
+                if isinstance(value, list):
+                    data.setlist(f"{prefix}-{index}-{field}", value)
+                elif value is not None:
+                    data[f"{prefix}-{index}-{field}"] = value
+        return cls(data, user=user)
+
+    def clean(self):
+        if any(self.errors) or len(self.forms) < 2:
+            return
+        # Each row checks the hours already saved, also keep each day under 24 hours with the other new rows
+        new_hours = defaultdict(Decimal)
+        for form in self.forms:
+            date_tracked = form.cleaned_data["date_tracked"]
+            new_hours[date_tracked.date()] += Decimal(form.cleaned_data["quantity"])
+
+        users_timezone = zoneinfo.ZoneInfo(self.user.timezone)
+        saved_hours = dict(
+            HoursLineItem.objects.filter(
+                invoice__user=self.user,
+                date_tracked__range=(
+                    datetime.datetime.combine(
+                        min(new_hours), datetime.time.min, tzinfo=users_timezone
+                    ),
+                    datetime.datetime.combine(
+                        max(new_hours), datetime.time.max, tzinfo=users_timezone
+                    ),
+                ),
+            )
+            .annotate(day=TruncDate("date_tracked", tzinfo=users_timezone))
+            .values_list("day")
+            .annotate(total=Sum("quantity"))
+        )
+        today = get_users_localtime(self.user).date()
+        for day, hours in sorted(new_hours.items()):
+            if saved_hours.get(day, 0) + hours > 24:
+                date_str = "today" if day == today else day.strftime("%b %-d, %Y")
+                raise ValidationError(f"Too many hours logged for {date_str}")
+
+    def save(self):
+        hours = []
+        for form in self.forms:
+            hour = form.save(commit=False)
+            if "recurring_logic" in form.cleaned_data:
+                hour.recurring_logic = form.cleaned_data.get("recurring_logic")
+            hours.append(hour)
+        # At most max_num rows, saving them one by one keeps HoursLineItem.save() and its signals
+        with transaction.atomic():
+            for hour in hours:
+                hour.save()
+        return hours
+
+
+HoursFormSet = forms.formset_factory(
+    HoursLineItemForm,
+    formset=BaseHoursFormSet,
+    extra=0,
+    max_num=100,
+    validate_max=True,
+)
+
+
+class HoursImportForm(forms.ModelForm):
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(
+            attrs={
+                "accept": ".csv,.xlsx",
+                "class": "file-input file-input-bordered border-2 bg-base-300 w-full",
+            }
+        ),
+    )
+
+    class Meta:
+        model = HoursImport
+        fields = ["file"]
+
+    def clean_file(self):
+        file = self.cleaned_data.get("file")
+        if not file.name.lower().endswith((".csv", ".xlsx")):
+            raise ValidationError("Only CSV and XLSX files can be imported.")
+        if file.size > settings.HOURS_IMPORT_MAX_FILE_SIZE:
+            raise ValidationError("File is too large, split it into smaller files.")
+        return file
+
+
 def today():
     return timezone.now().date()
 
@@ -0,0 +1,320 @@
+import codecs
+import csv
+import datetime
+import zipfile
+import zoneinfo
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from timary.forms import InvoiceChoices
+from timary.models import HoursImport, HoursLineItem
+from timary.task_queue import record_rows
+from timary.utils import get_users_localtime
+
+# Header names other trackers export, mapped to the HoursLineItem field they fill
+COLUMNS = {
+    "date": "date_tracked",
+    "date_tracked": "date_tracked",
+    "day": "date_tracked",
+    "hours": "quantity",
+    "quantity": "quantity",
+    "duration": "quantity",
+    "invoice": "invoice",
+    "invoice_title": "invoice",
+    "project": "invoice",
+    "invoice_id": "email_id",
+    "email_id": "email_id",
+    "description": "description",
+    "notes": "description",
+}
+DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y"]
+
+
+def normalize_header(header):
+    return str(header or "").strip().lower().replace(" ", "_")
+
+
+class HoursImporter:
+    """
+    Streams the rows of a HoursImport's file, validates them a chunk at a time and
+    bulk inserts each chunk's valid rows. Rows that fail are stored on the import
+    with their row number so the user can fix and import just those.
+    """
+
+    def __init__(self, hours_import):
+        self.hours_import = hours_import
+        self.user = hours_import.user
+        self.timezone = zoneinfo.ZoneInfo(self.user.timezone)
+        self.now = get_users_localtime(self.user)
+        self.invoices_by_title = {}
+        self.invoices_by_email_id = {}
+        for invoice in InvoiceChoices(self.user).get(include_paused=True):
+            title = invoice.title.strip().lower()
+            # Titles aren't unique, those used twice have to be matched by invoice id
+            self.invoices_by_title[title] = (
+                None if title in self.invoices_by_title else invoice
+            )
+            self.invoices_by_email_id[invoice.email_id] = invoice
+
+    @staticmethod
+    def read_rows(file, name):
+        """Yield (row number, {field: value}) without loading the whole file into memory"""
+        if Path(name).suffix.lower() == ".xlsx":
+            workbook = load_workbook(file, read_only=True, data_only=True)
+            try:
+                yield from HoursImporter.map_rows(
+                    workbook.active.iter_rows(values_only=True)
+                )
+            finally:
+                workbook.close()
+        else:
+            yield from HoursImporter.map_rows(
+                csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+            )
+
+    @staticmethod
+    def map_rows(rows):
+        fields = [COLUMNS.get(normalize_header(header)) for header in next(rows, [])]
+        missing = []
+        if "date_tracked" not in fields:
+            missing.append("date")
+        if "quantity" not in fields:
+            missing.append("hours")
+        if "invoice" not in fields and "email_id" not in fields:
+            missing.append("invoice or invoice_id")
+        if missing:
+            raise ValidationError(f"Missing columns: {', '.join(missing)}")
+
+        for number, values in enumerate(rows, start=2):
+            row = {field: value for field, value in zip(fields, values) if field}
+            if any(value not in [None, ""] for value in row.values()):
+                yield number, row
+
+    @staticmethod
+    def count_rows(file, name):
+        """Rows to import, None if an xlsx file doesn't store its dimensions"""
+        if Path(name).suffix.lower() == ".xlsx":
+            workbook = load_workbook(file, read_only=True, data_only=True)
+            max_row = workbook.active.max_row
+            workbook.close()
+            return max_row - 1 if max_row else None
+        return sum(1 for _ in HoursImporter.read_rows(file, name))
+
+    @staticmethod
+    def parse_quantity(value):
+        if isinstance(value, datetime.timedelta):
+            return round(Decimal(value.total_seconds()) / 3600, 2)
+        if isinstance(value, datetime.time):
+            return round(Decimal(value.hour) + Decimal(value.minute) / 60, 2)
+        value = str(value if value is not None else "").strip()
+        try:
+            if ":" in value:
+                # Durations like 1:30 or 01:30:00
+                hours, minutes = value.split(":")[:2]
+                return round(Decimal(hours) + Decimal(minutes) / 60, 2)
+            return round(Decimal(value), 2)
+        except InvalidOperation:
+            return None
+
+    def parse_date(self, value):
+        if isinstance(value, datetime.datetime):
+            if timezone.is_aware(value):
+                value = value.astimezone(self.timezone)
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        value = str(value if value is not None else "").strip()
+        try:
+            return datetime.datetime.fromisoformat(value).date()
+        except ValueError:
+            pass
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        return None
+
+    def find_invoice(self, row):
+        email_id = str(row.get("email_id") or "").strip()
+        if email_id:
+            return self.invoices_by_email_id.get(email_id)
+        return self.invoices_by_title.get(str(row.get("invoice") or "").strip().lower())
+
+    def build_hour(self, row):
+        """Validate a row the same way HoursLineItemForm does, returns the unsaved hour or its errors"""
+        errors = []
+        invoice = self.find_invoice(row)
+        if not invoice:
+            errors.append(
+                f"No invoice found for '{row.get('email_id') or row.get('invoice') or ''}'"
+            )
+
+        quantity = self.parse_quantity(row.get("quantity"))
+        if quantity is None or not 0 < quantity <= 24:
+            errors.append("Invalid hours logged. Please log between 0 and 24 hours")
+
+        day = self.parse_date(row.get("date_tracked"))
+        if not day:
+            errors.append(f"Invalid date '{row.get('date_tracked') or ''}'")
+        elif day > self.now.date():
+            errors.append("Cannot set date into the future!")
+        elif (
+            invoice
+            and getattr(invoice, "last_date", None)
+            and day < invoice.last_date.astimezone(self.timezone).date()
+        ):
+            errors.append("Cannot set date since your last invoice's cutoff date.")
+
+        description = str(row.get("description") or "").strip()
+        if len(description) > 200:
+            errors.append("Description can't be longer than 200 characters")
+
+        if errors:
+            return None, errors
+        return (
+            HoursLineItem(
+                invoice=invoice,
+                quantity=quantity,
+                date_tracked=datetime.datetime.combine(
+                    day, self.now.timetz().replace(tzinfo=None), tzinfo=self.timezone
+                ),
+                description=description or None,
+            ),
+            [],
+        )
+
+    def check_daily_totals(self, hours):
+        """Drop rows that would take a day over 24 hours, one query for the chunk"""
+        if not hours:
+            return hours
+        days = [hour.date_tracked.date() for _, hour in hours]
+        day_totals = defaultdict(
+            Decimal,
+            HoursLineItem.objects.filter(
+                invoice__user=self.user,
+                date_tracked__range=(
+                    datetime.datetime.combine(
+                        min(days), datetime.time.min, tzinfo=self.timezone
+                    ),
+                    datetime.datetime.combine(
+                        max(days), datetime.time.max, tzinfo=self.timezone
+                    ),
+                ),
+            )
+            .annotate(day=TruncDate("date_tracked", tzinfo=self.timezone))
+            .values_list("day")
+            .annotate(total=Sum("quantity")),
+        )
+        valid_hours = []
+        for number, hour in hours:
+            day = hour.date_tracked.date()
+            if day_totals[day] + hour.quantity > 24:
+                self.add_error(
+                    number, [f"Too many hours logged for {day.strftime('%b %-d, %Y')}"]
+                )
+                continue
+            day_totals[day] += hour.quantity
+            valid_hours.append((number, hour))
+        return valid_hours
+
+    def add_error(self, number, errors):
+        self.hours_import.error_count += 1
+        if len(self.hours_import.errors) < settings.HOURS_IMPORT_MAX_ERRORS:
+            self.hours_import.errors.append({"row": number, "errors": errors})
+
+    def import_chunk(self, chunk):
+        hours = []
+        for number, row in chunk:
+            hour, errors = self.build_hour(row)
+            if errors:
+                self.add_error(number, errors)
+            else:
+                hours.append((number, hour))
+        hours = self.check_daily_totals(hours)
+
+        self.hours_import.processed_rows += len(chunk)
+        self.hours_import.imported_rows += len(hours)
+        # The hours and the progress commit together, a resumed import starts after processed_rows
+        with transaction.atomic():
+            HoursLineItem.bulk_create_hours([hour for _, hour in hours])
+            self.hours_import.save(
+                update_fields=[
+                    "processed_rows",
+                    "imported_rows",
+                    "error_count",
+                    "errors",
+                    "updated_at",
+                ]
+            )
+        record_rows(len(chunk))
+
+    def claim(self):
+        """
+        Mark the import as running, False if it's finished or another worker is running it.
+        A running import that hasn't saved progress for HOURS_IMPORT_STALE_SECONDS lost its worker,
+        e.g. to the task timeout, and is resumed.
+        """
+        stale = timezone.now() - datetime.timedelta(
+            seconds=settings.HOURS_IMPORT_STALE_SECONDS
+        )
+        claimed = HoursImport.objects.filter(
+            Q(status=HoursImport.Status.PENDING)
+            | Q(status=HoursImport.Status.RUNNING, updated_at__lt=stale),
+            id=self.hours_import.id,
+        ).update(status=HoursImport.Status.RUNNING, updated_at=timezone.now())
+        self.hours_import.refresh_from_db()
+        return bool(claimed)
+
+    def run(self):
+        hours_import = self.hours_import
+        if not self.claim():
+            return hours_import
+        try:
+            with hours_import.file.open("rb") as file:
+                hours_import.total_rows = self.count_rows(file, file.name)
+                hours_import.save(update_fields=["total_rows", "updated_at"])
+                file.seek(0)
+                # Skip the rows a previous run already committed
+                rows = islice(
+                    self.read_rows(file, file.name), hours_import.processed_rows, None
+                )
+                while chunk := list(islice(rows, settings.HOURS_IMPORT_CHUNK_SIZE)):
+                    self.import_chunk(chunk)
+            hours_import.status = HoursImport.Status.COMPLETED
+        except ValidationError as e:
+            hours_import.status = HoursImport.Status.FAILED
+            hours_import.error_count += 1
+            hours_import.errors.append({"row": 1, "errors": e.messages})
+        except (
+            csv.Error,
+            UnicodeDecodeError,
+            zipfile.BadZipFile,
+            InvalidFileException,
+        ):
+            hours_import.status = HoursImport.Status.FAILED
+            hours_import.error_count += 1
+            hours_import.errors.append(
+                {
+                    "row": 1,
+                    "errors": ["Unable to read the file, upload a CSV or XLSX file"],
+                }
+            )
+        except Exception:
+            hours_import.status = HoursImport.Status.FAILED
+            raise
+        finally:
+            hours_import.finished_at = timezone.now()
+            hours_import.save()
+        return hours_import
@@ -4,6 +4,7 @@ from django.db.models import CharField, Count, F, IntegerField, Q, Value
 from django.db.models.functions import Cast, Concat
 from django.utils import timezone
 
+from timary.cache import HOURS_TRACKED, cached_for_user
 from timary.models import HoursLineItem, Invoice, InvoiceManager, MilestoneInvoice
 from timary.querysets import HourStats
 from timary.utils import get_users_localtime
@@ -110,10 +111,17 @@ class HoursManager:
             for hour in hour_forms_to_offer
         ]
 
+    def get_hours_page(self, cursor=None):
+        hours, next_cursor = self.hours.page(cursor)
+        return {"hours": hours, "next_cursor": next_cursor}
+
     def get_hours_tracked(self):
-        hour_stats = HourStats(user=self.user)
-        context = {
-            "current_month": hour_stats.get_current_month_stats(),
-            "last_month": hour_stats.get_last_month_stats(),
-        }
-        return context
+        def hours_tracked():
+            hour_stats = HourStats(user=self.user)
+            return {
+                "current_month": hour_stats.get_current_month_stats(),
+                "last_month": hour_stats.get_last_month_stats(),
+            }
+
+        current_month = get_users_localtime(self.user).strftime("%Y-%m")
+        return cached_for_user(self.user, HOURS_TRACKED, hours_tracked, current_month)
@@ -0,0 +1,65 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from timary.models import StripeEvent
+from timary.services.stripe_service import StripeService
+from timary.stripe_events import process_stripe_event, store_stripe_event
+
+
+class Command(BaseCommand):
+    help = "Re-process stored Stripe webhook events, optionally backfilling them from Stripe first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_ids", nargs="*", help="Only replay these event ids")
+        parser.add_argument(
+            "--since", help="Only replay events received since this date, YYYY-MM-DD"
+        )
+        parser.add_argument("--type", action="append", dest="types", default=[])
+        parser.add_argument(
+            "--fetch",
+            action="store_true",
+            help="Pull events from Stripe since --since and store any that were missed",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Also replay events that were already processed",
+        )
+
+    # To backfill missed webhooks: python manage.py replay_stripe_events --fetch --since 2023-08-01
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = timezone.make_aware(
+                datetime.datetime.strptime(options["since"], "%Y-%m-%d")
+            )
+
+        if options["fetch"]:
+            if not since:
+                self.stderr.write("--fetch requires --since")
+                return
+            stored = 0
+            for event in StripeService.list_events(since, options["types"] or None):
+                if store_stripe_event(event):
+                    stored += 1
+            self.stdout.write(f"Stored {stored} missed event(s) from Stripe")
+
+        stripe_events = StripeEvent.objects.order_by("created_at")
+        if options["event_ids"]:
+            stripe_events = stripe_events.filter(event_id__in=options["event_ids"])
+        if since:
+            stripe_events = stripe_events.filter(created_at__gte=since)
+        if options["types"]:
+            stripe_events = stripe_events.filter(event_type__in=options["types"])
+        if not options["force"]:
+            stripe_events = stripe_events.filter(processed_at__isnull=True)
+
+        processed = 0
+        for stripe_event in stripe_events:
+            if process_stripe_event(stripe_event, force=options["force"]):
+                processed += 1
+            else:
+                self.stdout.write(f"Failed to process {stripe_event.event_id}")
+        self.stdout.write(f"Replayed {processed} of {stripe_events.count()} event(s)")
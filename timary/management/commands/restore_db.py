@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from timary.services.backup_service import BackupService
+
+
+class Command(BaseCommand):
+    help = "Restore the database from a backup uploaded by backup_db_file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "key", nargs="?", help="Backup to restore, defaults to the latest"
+        )
+        parser.add_argument(
+            "--list", action="store_true", help="List the available backups"
+        )
+        parser.add_argument(
+            "--noinput",
+            action="store_false",
+            dest="interactive",
+            help="Don't ask before replacing the database",
+        )
+
+    # To restore the latest backup: python manage.py restore_db
+    def handle(self, *args, **options):
+        backups = BackupService.list_backups()
+        if options["list"]:
+            for key in backups:
+                self.stdout.write(key)
+            return
+
+        key = options["key"] or (backups[0] if backups else None)
+        if not key or key not in backups:
+            raise CommandError(f"No backup found{f' for {key}' if key else ''}")
+
+        if options["interactive"]:
+            confirm = input(
+                f"This will replace the current database with {key}. Type 'yes' to continue: "
+            )
+            if confirm != "yes":
+                self.stdout.write("Restore cancelled")
+                return
+
+        BackupService.restore(key)
+        self.stdout.write(self.style.SUCCESS(f"Restored database from {key}"))
@@ -1,7 +1,32 @@
+import re
+import sys
+import threading
+import time
 import zoneinfo
+from collections import Counter
+from contextvars import ContextVar
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 
+from timary.cache import incr_counter, set_max
+
+VIEW_METRIC_FIELDS = [
+    "requests",
+    "duration_ms",
+    "max_duration_ms",
+    "queries",
+    "max_queries",
+    "template_ms",
+    "over_budget",
+    "conditional",
+    "not_modified",
+]
+
+_active_request = ContextVar("active_request", default=None)
+
 
 class TimezoneMiddleware:
     def __init__(self, get_response):
@@ -15,3 +40,205 @@ class TimezoneMiddleware:
             else:
                 timezone.deactivate()
         return self.get_response(request)
+
+
+def query_signature(sql):
+    """Same statement with a different number of parameters in an IN (...) shares a signature"""
+    return re.sub(r"\((?:%s, )+%s\)", "(%s)", sql)
+
+
+def duplicate_queries(queries, threshold=None):
+    """Signatures run at least `threshold` times, usually a query inside a loop (N+1)"""
+    threshold = threshold or settings.REQUEST_DUPLICATE_QUERY_THRESHOLD
+    counts = Counter(query_signature(sql) for sql in queries)
+    return {sql: count for sql, count in counts.items() if count >= threshold}
+
+
+def query_budget(view_name):
+    return settings.REQUEST_QUERY_BUDGETS.get(view_name, settings.REQUEST_QUERY_BUDGET)
+
+
+def record_template_render(seconds):
+    recorder = _active_request.get()
+    if recorder:
+        recorder.template_time += seconds
+
+
+class RequestRecorder:
+    """Collects a request's queries and template render time, installed as a connection execute wrapper"""
+
+    def __init__(self):
+        self.queries = []
+        self.query_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(sql)
+            self.query_time += time.perf_counter() - start
+
+
+def _view_key(view_name, field):
+    return f"view_metrics:{view_name}:{field}"
+
+
+def register_view(view_name):
+    """
+    Give a view its own slot in the list view_metrics reads, only the first process to see the view takes one.
+    Guarded by cache.add so concurrent processes never overwrite each other's views.
+    """
+    if not cache.add(_view_key(view_name, "registered"), True, timeout=None):
+        return
+    cache.add("view_metrics:view_count", 0, timeout=None)
+    slot = cache.incr("view_metrics:view_count")
+    cache.set(f"view_metrics:view:{slot}", view_name, timeout=None)
+
+
+def registered_views():
+    count = cache.get("view_metrics:view_count") or 0
+    slots = cache.get_many(
+        [f"view_metrics:view:{slot}" for slot in range(1, count + 1)]
+    )
+    return list(dict.fromkeys(slots.values()))
+
+
+class ViewMetricsBuffer:
+    """
+    Per process totals of the view counters, written to the cache at most every REQUEST_METRICS_FLUSH_SECONDS
+    instead of on every request.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, view_name, counts, maxes):
+        with self.lock:
+            totals = self.pending.setdefault(view_name, (Counter(), {}))
+            totals[0].update(counts)
+            for field, value in maxes.items():
+                totals[1][field] = max(totals[1].get(field, 0), value)
+            due = (
+                time.monotonic() - self.flushed_at
+                >= settings.REQUEST_METRICS_FLUSH_SECONDS
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        for view_name, (counts, maxes) in pending.items():
+            register_view(view_name)
+            for field, amount in counts.items():
+                if amount:
+                    incr_counter(_view_key(view_name, field), amount)
+            for field, value in maxes.items():
+                set_max(_view_key(view_name, field), value)
+
+
+_view_metrics_buffer = ViewMetricsBuffer()
+
+
+def view_metrics():
+    """Average and worst latency and queries for each view seen since the counters started"""
+    _view_metrics_buffer.flush()
+    view_names = registered_views()
+    values = cache.get_many(
+        [_view_key(name, field) for name in view_names for field in VIEW_METRIC_FIELDS]
+    )
+    metrics = {}
+    for name in view_names:
+        stats = {
+            field: values.get(_view_key(name, field), 0) for field in VIEW_METRIC_FIELDS
+        }
+        if not stats["requests"]:
+            continue
+        metrics[name] = {
+            "requests": stats["requests"],
+            "avg_duration_ms": stats["duration_ms"] // stats["requests"],
+            "max_duration_ms": stats["max_duration_ms"],
+            "avg_queries": stats["queries"] // stats["requests"],
+            "max_queries": stats["max_queries"],
+            "avg_template_ms": stats["template_ms"] // stats["requests"],
+            "over_budget": stats["over_budget"],
+            "query_budget": query_budget(name),
+            # Share of requests with an ETag answered with 304 Not Modified
+            "not_modified_rate": round(
+                stats["not_modified"] / stats["conditional"] * 100
+            )
+            if stats["conditional"]
+            else None,
+        }
+    return dict(sorted(metrics.items(), key=lambda item: -item[1]["avg_duration_ms"]))
+
+
+class RequestPerformanceMiddleware:
+    """
+    Times each request, its queries and template rendering, and keeps per view counters (see view_metrics).
+    Views that go over their query budget or repeat a query are logged,
+    with REQUEST_SERVER_TIMING on the numbers are sent back in a Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = RequestRecorder()
+        token = _active_request.set(recorder)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            _active_request.reset(token)
+        duration = time.perf_counter() - start
+
+        if request.resolver_match:
+            self.record(request.resolver_match.view_name, recorder, duration, response)
+        if settings.REQUEST_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={recorder.query_time * 1000:.1f};desc="{len(recorder.queries)} queries"',
+                    f"tpl;dur={recorder.template_time * 1000:.1f}",
+                    f"total;dur={duration * 1000:.1f}",
+                ]
+            )
+        return response
+
+    @staticmethod
+    def record(view_name, recorder, duration, response=None):
+        duration_ms = int(duration * 1000)
+        query_count = len(recorder.queries)
+
+        counts = Counter(
+            requests=1,
+            duration_ms=duration_ms,
+            queries=query_count,
+            template_ms=int(recorder.template_time * 1000),
+        )
+        if response is not None and response.has_header("ETag"):
+            counts["conditional"] += 1
+            counts["not_modified"] += response.status_code == 304
+
+        budget = query_budget(view_name)
+        duplicates = duplicate_queries(recorder.queries)
+        counts["over_budget"] += query_count > budget
+        _view_metrics_buffer.add(
+            view_name,
+            counts,
+            {"max_duration_ms": duration_ms, "max_queries": query_count},
+        )
+        if query_count > budget:
+            # Let Sentry catch this error
+            print(
+                f"Query budget exceeded: {view_name=}, {query_count=}, {budget=}, {duration_ms=}",
+                file=sys.stderr,
+            )
+        for sql, count in duplicates.items():
+            print(f"Repeated query: {view_name=}, {count=}, {sql=}", file=sys.stderr)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-19 18:59
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0056_alter_user_timer_is_active"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountingRateLimit",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("provider", models.CharField(max_length=50)),
+                ("org_id", models.CharField(max_length=200)),
+                ("tokens", models.FloatField()),
+                ("last_refill", models.DateTimeField()),
+            ],
+            options={
+                "unique_together": {("provider", "org_id")},
+            },
+        ),
+    ]
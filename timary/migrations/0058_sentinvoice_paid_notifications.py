@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0057_accountingratelimit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sentinvoice",
+            name="paid_notifications",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
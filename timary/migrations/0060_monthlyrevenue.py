@@ -0,0 +1,93 @@
+# Generated by Django 4.2.4 on 2026-10-19 19:11
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_revenue(apps, schema_editor):
+    SentInvoice = apps.get_model("timary", "SentInvoice")
+    MonthlyRevenue = apps.get_model("timary", "MonthlyRevenue")
+    totals = (
+        SentInvoice.objects.filter(invoice__isnull=False)
+        .exclude(paid_status__in=[3, 4])  # Failed, cancelled
+        .annotate(month=TruncMonth("date_sent", output_field=DateField()))
+        .values("invoice_id", "invoice__user_id", "month")
+        .annotate(total=Sum("total_price"))
+        .order_by()
+    )
+    MonthlyRevenue.objects.bulk_create(
+        [
+            MonthlyRevenue(
+                user_id=row["invoice__user_id"],
+                invoice_id=row["invoice_id"],
+                month=row["month"],
+                total=row["total"],
+            )
+            for row in totals
+            if row["invoice__user_id"]
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0059_stripeevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRevenue",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("month", models.DateField()),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_revenue",
+                        to="timary.invoice",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_revenue",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "month"], name="timary_mont_user_id_a788d2_idx"
+                    )
+                ],
+                "unique_together": {("invoice", "month")},
+            },
+        ),
+        migrations.RunPython(
+            code=backfill_monthly_revenue,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
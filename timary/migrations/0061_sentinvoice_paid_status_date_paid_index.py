@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-19 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0060_monthlyrevenue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sentinvoice",
+            index=models.Index(
+                fields=["paid_status", "date_paid"],
+                name="timary_sent_paid_st_43aca7_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.4 on 2026-10-19 19:33
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0061_sentinvoice_paid_status_date_paid_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskRun",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("task", models.CharField(max_length=100)),
+                ("started_at", models.DateTimeField()),
+                ("duration_ms", models.PositiveIntegerField(default=0)),
+                ("query_count", models.PositiveIntegerField(default=0)),
+                ("query_time_ms", models.PositiveIntegerField(default=0)),
+                ("external_calls", models.JSONField(blank=True, default=dict)),
+                ("rows_processed", models.PositiveIntegerField(default=0)),
+                ("success", models.BooleanField(default=True)),
+                ("result", models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["task", "-duration_ms"],
+                        name="timary_task_task_547ec5_idx",
+                    ),
+                    models.Index(
+                        fields=["-duration_ms"], name="timary_task_duratio_b54508_idx"
+                    ),
+                    models.Index(
+                        fields=["started_at"], name="timary_task_started_2e2e9c_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-19 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0063_hoursimport"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lineitem",
+            index=models.Index(
+                fields=["invoice", "-date_tracked", "-id"],
+                name="timary_line_invoice_726338_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.4 on 2026-10-19 20:03
+
+import datetime
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_user_timers(apps, schema_editor):
+    User = apps.get_model("timary", "User")
+    Timer = apps.get_model("timary", "Timer")
+    timers = []
+    for user_id, timer in User.objects.exclude(timer_is_active=None).values_list(
+        "id", "timer_is_active"
+    ):
+        elapsed = sum(timer.get("running_times") or [])
+        running = timer.get("timer_running") and "time_started" in timer
+        if not elapsed and not running:
+            continue
+        timers.append(
+            Timer(
+                user_id=user_id,
+                elapsed=datetime.timedelta(seconds=elapsed),
+                started_at=datetime.datetime.fromtimestamp(
+                    int(timer["time_started"]), tz=datetime.timezone.utc
+                )
+                if running
+                else None,
+            )
+        )
+    Timer.objects.bulk_create(timers, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0064_lineitem_invoice_date_tracked_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Timer",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("elapsed", models.DurationField(default=datetime.timedelta)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timer",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunPython(
+            code=copy_user_timers,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.RemoveField(
+            model_name="user",
+            name="timer_is_active",
+        ),
+    ]
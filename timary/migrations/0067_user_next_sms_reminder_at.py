@@ -0,0 +1,46 @@
+# Generated by Django 4.2.4 on 2026-10-19 20:12
+
+import datetime
+import zoneinfo
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_next_sms_reminder_at(apps, schema_editor):
+    User = apps.get_model("timary", "User")
+    now = timezone.now()
+    users = list(
+        User.objects.exclude(phone_number__isnull=True)
+        .exclude(phone_number__exact="")
+        .exclude(phone_number_availability__isnull=True)
+    )
+    for user in users:
+        user_timezone = zoneinfo.ZoneInfo(user.timezone)
+        today = now.astimezone(user_timezone).date()
+        for days in range(8):
+            day = today + datetime.timedelta(days=days)
+            reminder_at = datetime.datetime.combine(
+                day, datetime.time(17), tzinfo=user_timezone
+            )
+            if reminder_at > now and day.strftime("%a") in (
+                user.phone_number_availability or []
+            ):
+                user.next_sms_reminder_at = reminder_at
+                break
+    User.objects.bulk_update(users, ["next_sms_reminder_at"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0066_smsconversation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="next_sms_reminder_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(set_next_sms_reminder_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.4 on 2026-10-19 21:02
+
+import zoneinfo
+
+from django.db import migrations
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def rebucket_monthly_revenue(apps, schema_editor):
+    User = apps.get_model("timary", "User")
+    SentInvoice = apps.get_model("timary", "SentInvoice")
+    MonthlyRevenue = apps.get_model("timary", "MonthlyRevenue")
+    MonthlyRevenue.objects.all().delete()
+    timezones = User.objects.values_list("timezone", flat=True).distinct().order_by()
+    for user_timezone in timezones:
+        totals = (
+            SentInvoice.objects.filter(
+                invoice__isnull=False, invoice__user__timezone=user_timezone
+            )
+            .exclude(paid_status__in=[3, 4])  # Failed, cancelled
+            .annotate(
+                month=TruncMonth(
+                    "date_sent",
+                    output_field=DateField(),
+                    tzinfo=zoneinfo.ZoneInfo(user_timezone),
+                )
+            )
+            .values("invoice_id", "invoice__user_id", "month")
+            .annotate(total=Sum("total_price"))
+            .order_by()
+        )
+        MonthlyRevenue.objects.bulk_create(
+            [
+                MonthlyRevenue(
+                    user_id=row["invoice__user_id"],
+                    invoice_id=row["invoice_id"],
+                    month=row["month"],
+                    total=row["total"],
+                )
+                for row in totals
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0067_user_next_sms_reminder_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebucket_monthly_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-19 21:20
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def schedule_prune_task_runs(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        name="prune_task_runs",
+        defaults={
+            "func": "timary.tasks.prune_task_runs",
+            "schedule_type": "D",
+            "repeats": -1,
+            "next_run": timezone.now().replace(hour=4, minute=0, second=0),
+        },
+    )
+
+
+def unschedule_prune_task_runs(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(name="prune_task_runs").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_q", "0017_task_cluster_alter"),
+        ("timary", "0068_rebucket_monthly_revenue"),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_prune_task_runs, unschedule_prune_task_runs),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-19 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timary", "0070_stripeevent_claimed_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="lineitem",
+            name="timary_line_invoice_726338_idx",
+        ),
+        migrations.AddIndex(
+            model_name="lineitem",
+            index=models.Index(
+                fields=["-date_tracked", "-id"], name="timary_line_date_tr_cef98f_idx"
+            ),
+        ),
+    ]
@@ -1,17 +1,18 @@
 import random
 import uuid
 import zoneinfo
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import DateField, F, Q, Sum
-from django.db.models.functions import TruncMonth
+from django.db import connection, models, transaction
+from django.db.models import F, Q, Sum
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
@@ -21,11 +22,13 @@ from django.utils.text import slugify
 from django_q.tasks import async_task
 from multiselectfield import MultiSelectField
 from phonenumber_field.modelfields import PhoneNumberField
+from polymorphic.managers import PolymorphicManager
 from polymorphic.models import PolymorphicModel
 
+from timary.cache import invalidate_user_cache
 from timary.custom_errors import AccountingError
 from timary.invoice_builder import InvoiceBuilder
-from timary.querysets import HoursQuerySet
+from timary.querysets import HoursQuerySet, InvoiceQuerySet, RevenueSeries
 from timary.services.accounting_service import AccountingService
 from timary.services.email_service import EmailService
 from timary.services.stripe_service import StripeService
@@ -60,6 +63,134 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class AccountingRateLimit(BaseModel):
+    """Token bucket shared by all workers calling an accounting provider for one org"""
+
+    provider = models.CharField(max_length=50)
+    org_id = models.CharField(max_length=200)
+    tokens = models.FloatField()
+    last_refill = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("provider", "org_id")
+
+    def __str__(self):
+        return f"{self.provider} - {self.org_id}: {self.tokens:.1f}"
+
+
+class StripeEvent(BaseModel):
+    """Verified Stripe webhook event, stored once per event id and processed by a worker"""
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField()
+    # Set while a worker handles the event, a claim older than STRIPE_EVENT_CLAIM_SECONDS was abandoned
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} - {self.event_id}"
+
+
+class MonthlyRevenue(BaseModel):
+    """Rollup of an invoice's sent invoice totals per month, kept up to date as sent invoices change"""
+
+    user = models.ForeignKey(
+        "timary.User", on_delete=models.CASCADE, related_name="monthly_revenue"
+    )
+    invoice = models.ForeignKey(
+        "timary.Invoice", on_delete=models.CASCADE, related_name="monthly_revenue"
+    )
+    month = models.DateField()
+    total = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+
+    class Meta:
+        unique_together = ("invoice", "month")
+        indexes = [models.Index(fields=["user", "month"])]
+
+    def __str__(self):
+        return f"{self.invoice_id} - {self.month:%b %Y}: {self.total}"
+
+    @staticmethod
+    def month_of(date_sent, user_timezone):
+        if date_sent.tzinfo:
+            date_sent = date_sent.astimezone(zoneinfo.ZoneInfo(user_timezone))
+        return date_sent.date().replace(day=1)
+
+    @classmethod
+    def refresh(cls, invoice_id, date_sent):
+        """Re-total the invoice month date_sent falls in, bucketed in the invoice owner's timezone"""
+        owner = (
+            Invoice.objects.filter(id=invoice_id)
+            .values_list("user_id", "user__timezone")
+            .first()
+        )
+        if not owner:
+            return
+        user_id, user_timezone = owner
+        month = cls.month_of(date_sent, user_timezone)
+        start = datetime.combine(
+            month, datetime.min.time(), tzinfo=zoneinfo.ZoneInfo(user_timezone)
+        )
+        total = (
+            SentInvoice.objects.filter(
+                invoice_id=invoice_id,
+                date_sent__gte=start,
+                date_sent__lt=start + relativedelta(months=1),
+            )
+            .exclude(paid_status=SentInvoice.PaidStatus.FAILED)
+            .exclude(paid_status=SentInvoice.PaidStatus.CANCELLED)
+            .aggregate(total=Sum("total_price"))["total"]
+        )
+        if total is None:
+            cls.objects.filter(invoice_id=invoice_id, month=month).delete()
+        else:
+            cls.objects.update_or_create(
+                invoice_id=invoice_id,
+                month=month,
+                defaults={"user_id": user_id, "total": total},
+            )
+
+
+class TaskRun(BaseModel):
+    """One run of a task in timary.tasks, recorded by task_queue.instrument_task"""
+
+    task = models.CharField(max_length=100)
+    started_at = models.DateTimeField()
+    duration_ms = models.PositiveIntegerField(default=0)
+    query_count = models.PositiveIntegerField(default=0)
+    query_time_ms = models.PositiveIntegerField(default=0)
+    external_calls = models.JSONField(default=dict, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    success = models.BooleanField(default=True)
+    result = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "-duration_ms"]),
+            models.Index(fields=["-duration_ms"]),
+            models.Index(fields=["started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task} - {self.started_at:%Y-%m-%d %H:%M}: {self.duration_ms}ms"
+
+    @property
+    def external_call_count(self):
+        return sum(self.external_calls.values())
+
+    @classmethod
+    def prune(cls, days=None):
+        """Delete runs older than settings.TASK_RUN_RETENTION_DAYS"""
+        days = days or settings.TASK_RUN_RETENTION_DAYS
+        deleted, _ = cls.objects.filter(
+            started_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        return deleted
+
+
 class Contract(BaseModel):
     email = models.CharField(max_length=200, null=True, blank=True)
     name = models.CharField(max_length=200, null=True, blank=True)
@@ -83,6 +214,11 @@ class LineItem(PolymorphicModel, BaseModel):
     )
     sent_invoice_id = models.CharField(max_length=200, null=True, blank=True)
 
+    class Meta(PolymorphicModel.Meta):
+        # Hours lists span all of a user's invoices, newest first, a page at a time (see HoursQuerySet.page).
+        # Leading with the ordering lets a page stop after HOURS_PAGE_SIZE rows instead of sorting every match.
+        indexes = [models.Index(fields=["-date_tracked", "-id"])]
+
     @property
     def slug_id(self):
         return f"{slugify(self.invoice.title)}-{str(self.id.int)[:6]}"
@@ -98,6 +234,25 @@ class LineItem(PolymorphicModel, BaseModel):
             pass
         return False
 
+    def invalidate_user_cache(self):
+        if LineItem.invoice.is_cached(self):
+            invalidate_user_cache(self.invoice.user_id)
+        elif self.invoice_id:
+            invalidate_user_cache(
+                Invoice.objects.filter(id=self.invoice_id)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_user_cache()
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        self.invalidate_user_cache()
+        return deleted
+
 
 class HoursLineItem(LineItem):
     recurring_logic = models.JSONField(blank=True, null=True, default=dict)
@@ -119,6 +274,56 @@ class HoursLineItem(LineItem):
         self.full_clean()
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def bulk_create_hours(cls, hours):
+        """
+        Insert many new hours with one statement per table, in a single transaction. Only for hours imports,
+        where saving tens of thousands of rows one by one is too slow, other callers should save() each hour.
+        QuerySet.bulk_create() doesn't support multi-table inheritance, so the LineItem rows are inserted
+        first and the HoursLineItem rows pointing at them after through the manager's _insert().
+        This skips HoursLineItem.save() and the post_save signal and sets polymorphic_ctype by hand,
+        TestHoursImport.test_imported_hours_are_polymorphic covers it across Django/polymorphic upgrades.
+        """
+        hours = list(hours)
+        if not hours:
+            return hours
+        ctype = ContentType.objects.get_for_model(cls, for_concrete_model=False)
+        parent_fields = LineItem._meta.concrete_fields
+        for hour in hours:
+            # Invoices are validated by the form and ids are new uuids, skip their per row queries
+            hour.full_clean(exclude=["invoice", "lineitem_ptr"], validate_unique=False)
+            hour.polymorphic_ctype = ctype
+            hour.lineitem_ptr_id = hour.id
+
+        parents = [
+            LineItem(
+                **{
+                    field.attname: getattr(hour, field.attname)
+                    for field in parent_fields
+                }
+            )
+            for hour in hours
+        ]
+        with transaction.atomic():
+            LineItem.objects.bulk_create(parents)
+            child_fields = [
+                cls._meta.get_field("lineitem_ptr"),
+                cls._meta.get_field("recurring_logic"),
+            ]
+            batch_size = max(connection.ops.bulk_batch_size(child_fields, hours), 1)
+            for start in range(0, len(hours), batch_size):
+                cls._base_manager._insert(
+                    hours[start:][:batch_size], fields=child_fields
+                )
+
+        for hour, parent in zip(hours, parents):
+            hour.created_at, hour.updated_at = parent.created_at, parent.updated_at
+            hour._state.adding = False
+            hour._state.db = cls.objects.db
+        for user_id in {hour.invoice.user_id for hour in hours}:
+            invalidate_user_cache(user_id)
+        return hours
+
     def is_recurring_date_today(self):
         """
         Checks if recurring_logic has a 'type' either 'recurring' or 'repeating'
@@ -183,6 +388,189 @@ class HoursLineItem(LineItem):
         self.save(update_fields=["recurring_logic"])
 
 
+class HoursImport(BaseModel):
+    """A CSV or XLSX file of hours imported in the background, see timary.hours_import"""
+
+    class Status(models.IntegerChoices):
+        PENDING = 0, "PENDING"
+        RUNNING = 1, "RUNNING"
+        COMPLETED = 2, "COMPLETED"
+        FAILED = 3, "FAILED"
+
+    user = models.ForeignKey(
+        "timary.User", on_delete=models.CASCADE, related_name="hours_imports"
+    )
+    file = models.FileField(upload_to="hours_imports/")
+    status = models.PositiveSmallIntegerField(
+        default=Status.PENDING, choices=Status.choices
+    )
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # [{"row": 2, "errors": ["..."]}], only the first settings.HOURS_IMPORT_MAX_ERRORS rows are kept
+    errors = models.JSONField(default=list, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.file.name}: {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in [self.Status.COMPLETED, self.Status.FAILED]
+
+    @property
+    def progress(self):
+        if self.is_finished:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.processed_rows / self.total_rows * 100), 100)
+
+
+class Timer(BaseModel):
+    """
+    A user's stopwatch, kept off the User row so starting and pausing it doesn't rewrite the user.
+    Its state is cached so pages rendered while no timer runs don't query it.
+    """
+
+    user = models.OneToOneField(
+        "timary.User", on_delete=models.CASCADE, related_name="timer"
+    )
+    # Set while the timer is running
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Time banked by the runs before the last pause
+    elapsed = models.DurationField(default=timedelta)
+
+    def __str__(self):
+        return f"{self.user} - {'running' if self.started_at else 'paused'}"
+
+    @staticmethod
+    def cache_key(user_id):
+        return f"timer:{user_id}"
+
+    @classmethod
+    def state(cls, user_id):
+        """{"elapsed": seconds, "started_at": timestamp or None}, only queried when the cache lost it"""
+
+        def load():
+            timer = cls.objects.filter(user_id=user_id).first()
+            return (timer or cls(user_id=user_id)).to_state()
+
+        return cache.get_or_set(cls.cache_key(user_id), load, timeout=None)
+
+    def to_state(self):
+        return {
+            "elapsed": self.elapsed.total_seconds(),
+            "started_at": self.started_at.timestamp() if self.started_at else None,
+        }
+
+    def cache_state(self):
+        """Written once the lock's transaction commits, a rollback leaves the cache alone"""
+        state = self.to_state()
+        key = self.cache_key(self.user_id)
+        transaction.on_commit(lambda: cache.set(key, state, timeout=None))
+        return state
+
+    def running_time(self, now):
+        if self.started_at:
+            return self.elapsed + max(now - self.started_at, timedelta())
+        return self.elapsed
+
+    @classmethod
+    def lock(cls, user_id):
+        return cls.objects.select_for_update().get_or_create(user_id=user_id)[0]
+
+    @classmethod
+    def start(cls, user_id):
+        """Start counting from zero, also resets a running timer"""
+        with transaction.atomic():
+            timer = cls.lock(user_id)
+            timer.started_at, timer.elapsed = timezone.now(), timedelta()
+            timer.save(update_fields=["started_at", "elapsed", "updated_at"])
+            return timer.cache_state()
+
+    @classmethod
+    def pause(cls, user_id):
+        with transaction.atomic():
+            timer = cls.lock(user_id)
+            if timer.started_at:
+                timer.elapsed = timer.running_time(timezone.now())
+                timer.started_at = None
+                timer.save(update_fields=["started_at", "elapsed", "updated_at"])
+            return timer.cache_state()
+
+    @classmethod
+    def resume(cls, user_id):
+        with transaction.atomic():
+            timer = cls.lock(user_id)
+            if not timer.started_at:
+                timer.started_at = timezone.now()
+                timer.save(update_fields=["started_at", "updated_at"])
+            return timer.cache_state()
+
+    @classmethod
+    def stop(cls, user_id):
+        """Reset the timer, returns the seconds it ran"""
+        with transaction.atomic():
+            timer = cls.lock(user_id)
+            total = timer.running_time(timezone.now())
+            timer.started_at, timer.elapsed = None, timedelta()
+            timer.save(update_fields=["started_at", "elapsed", "updated_at"])
+            timer.cache_state()
+        return total.total_seconds()
+
+
+class SMSConversation(BaseModel):
+    """
+    The invoice the last hours prompt texted to a phone number asked about,
+    so the reply webhook finds it without reading the message history back from Twilio.
+    """
+
+    phone_number = models.CharField(max_length=20, unique=True)
+    user = models.ForeignKey(
+        "timary.User", on_delete=models.CASCADE, related_name="sms_conversations"
+    )
+    # Nothing is pending once every invoice is logged for the day
+    invoice = models.ForeignKey(
+        "timary.RecurringInvoice",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    prompted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.phone_number} - {self.invoice_id}"
+
+    @classmethod
+    def record_prompt(cls, user, invoice):
+        cls.objects.update_or_create(
+            phone_number=user.phone_number.as_e164,
+            defaults={"user": user, "invoice": invoice, "prompted_at": timezone.now()},
+        )
+
+    @classmethod
+    def pending(cls, phone_number):
+        """The number's conversation, only while it's still the user's phone number"""
+        return (
+            cls.objects.select_related("user", "invoice")
+            .filter(phone_number=phone_number, user__phone_number=phone_number)
+            .first()
+        )
+
+    @property
+    def pending_invoice(self):
+        """The invoice prompted for, None once it's logged for the day, paused or archived"""
+        invoice = self.invoice
+        if invoice and not (
+            invoice.sms_ping_today or invoice.is_paused or invoice.is_archived
+        ):
+            return invoice
+        return None
+
+
 class Expenses(BaseModel):
     invoice = models.ForeignKey(
         "timary.Invoice", on_delete=models.CASCADE, related_name="expenses"
@@ -222,7 +610,14 @@ class Client(BaseModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        return super().save(*args, **kwargs)
+        saved = super().save(*args, **kwargs)
+        invalidate_user_cache(self.user_id)
+        return saved
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        invalidate_user_cache(self.user_id)
+        return deleted
 
     @property
     def formatted_phone_number(self):
@@ -264,6 +659,15 @@ class Proposal(BaseModel):
     def __str__(self):
         return f"{self.title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_user_cache(self.client.user_id)
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        invalidate_user_cache(self.client.user_id)
+        return deleted
+
     @property
     def slug_id(self):
         return f"{slugify(self.client.name)}-{str(self.id.int)[:6]}"
@@ -303,6 +707,8 @@ class Invoice(PolymorphicModel, BaseModel):
 
     feedback = models.TextField(blank=True, null=True)
 
+    objects = PolymorphicManager.from_queryset(InvoiceQuerySet)()
+
     def __str__(self):
         return f"{self.title}"
 
@@ -318,7 +724,13 @@ class Invoice(PolymorphicModel, BaseModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        return super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
+        invalidate_user_cache(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        invalidate_user_cache(self.user_id)
+        return deleted
 
     @property
     def slug_title(self):
@@ -355,6 +767,8 @@ class Invoice(PolymorphicModel, BaseModel):
         if self.invoice_type() == "single":
             if self.installments == 0:
                 return 0
+        if hasattr(self, "card_invoices_pending"):
+            return self.card_invoices_pending or 0
         return self.invoice_snapshots.filter(
             Q(paid_status=0) | Q(paid_status=1)
         ).count()
@@ -604,30 +1018,12 @@ class RecurringInvoice(Invoice):
         )
 
     def get_last_six_months(self):
-        tz = zoneinfo.ZoneInfo(self.user.timezone)
-        today = timezone.now().astimezone(tz=tz)
-        date_times = [
-            (today - relativedelta(months=m)).astimezone(tz=tz).date().replace(day=1)
-            for m in range(0, 6)
-        ]
-        six_months_qs = (
-            self.invoice_snapshots.exclude(paid_status=SentInvoice.PaidStatus.FAILED)
-            .exclude(paid_status=SentInvoice.PaidStatus.CANCELLED)
-            .annotate(month=TruncMonth("date_sent", output_field=DateField()))
-            .distinct()
-            .values("month")
-            .order_by("month")
-            .annotate(totals=Sum("total_price"))
-            .values("month", "totals")
-        )
-        months = []
-        totals = []
-        for m in date_times:
-            datum = list(filter(lambda x: m == x["month"], six_months_qs))
-            months.insert(0, m.strftime("%b"))
-            total_count = float(datum[0]["totals"]) if datum else 0
-            totals.insert(0, total_count)
-        return months, totals
+        # Called more than once per render, only look it up once
+        if not hasattr(self, "_last_six_months"):
+            tz = zoneinfo.ZoneInfo(self.user.timezone)
+            today = timezone.now().astimezone(tz=tz).date()
+            self._last_six_months = RevenueSeries([self], today).for_invoice(self)
+        return self._last_six_months
 
     def get_hours_stats(self):
         hours_tracked = self.get_hours_tracked()
@@ -641,10 +1037,15 @@ class RecurringInvoice(Invoice):
         if not self.total_budget:
             return 0
 
-        total_hours = self.line_items.filter().aggregate(total_hours=Sum("quantity"))
+        if hasattr(self, "card_total_hours"):
+            total_hours = self.card_total_hours
+        else:
+            total_hours = self.line_items.aggregate(total_hours=Sum("quantity"))[
+                "total_hours"
+            ]
         total_cost_amount = 0
-        if total_hours["total_hours"]:
-            total_cost_amount = total_hours["total_hours"] * self.rate
+        if total_hours:
+            total_cost_amount = total_hours * self.rate
 
         return round((total_cost_amount / self.total_budget), ndigits=2) * 100
 
@@ -747,10 +1148,13 @@ class WeeklyInvoice(RecurringInvoice):
         if not self.total_budget:
             return 0
 
-        total_price = self.invoice_snapshots.filter(
-            paid_status=SentInvoice.PaidStatus.PAID
-        ).aggregate(total_cost=Sum("total_price"))
-        if total_cost := total_price["total_cost"]:
+        if hasattr(self, "card_total_paid"):
+            total_cost = self.card_total_paid
+        else:
+            total_cost = self.invoice_snapshots.filter(
+                paid_status=SentInvoice.PaidStatus.PAID
+            ).aggregate(total_cost=Sum("total_price"))["total_cost"]
+        if total_cost:
             return (
                 round(
                     float(total_cost) / float(self.total_budget),
@@ -908,6 +1312,12 @@ class SentInvoice(BaseModel):
     # Accounting
     accounting_invoice_id = models.CharField(max_length=200, blank=True, null=True)
 
+    # Payment notifications already delivered, keyed by name, so queued tasks don't repeat them
+    paid_notifications = models.JSONField(blank=True, default=dict)
+
+    class Meta:
+        indexes = [models.Index(fields=["paid_status", "date_paid"])]
+
     def __str__(self):
         return (
             f"SentInvoice(invoice={self.invoice.title if self.invoice else 'Deleted Invoice'}, "
@@ -922,6 +1332,46 @@ class SentInvoice(BaseModel):
             f"paid_status={self.get_paid_status_display()})"
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_revenue = instance.revenue_state()
+        return instance
+
+    def revenue_state(self):
+        """What this sent invoice adds to MonthlyRevenue: (invoice id, date sent, total, status)"""
+        invoice_id = self.__dict__.get("invoice_id")
+        date_sent = self.__dict__.get("date_sent")
+        if not invoice_id or not date_sent:
+            return None
+        return (
+            invoice_id,
+            date_sent,
+            self.__dict__.get("total_price"),
+            self.__dict__.get("paid_status"),
+        )
+
+    def refresh_monthly_revenue(self):
+        loaded, current = getattr(self, "_loaded_revenue", None), self.revenue_state()
+        if loaded == current:
+            return
+        for invoice_month in {state[:2] for state in (loaded, current) if state}:
+            MonthlyRevenue.refresh(*invoice_month)
+        self._loaded_revenue = current
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.refresh_monthly_revenue()
+        invalidate_user_cache(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_revenue", None) or self.revenue_state()
+        deleted = super().delete(*args, **kwargs)
+        if loaded:
+            MonthlyRevenue.refresh(*loaded[:2])
+        invalidate_user_cache(self.user_id)
+        return deleted
+
     @classmethod
     def create(cls, invoice):
         hours_tracked, total_cost = invoice.get_hours_stats()
@@ -943,14 +1393,29 @@ class SentInvoice(BaseModel):
     def get_rendered_line_items(self):
         return self.invoice.render_line_items(sent_invoice_id=self.id)
 
+    # Side effects of a successful payment, each one runs as its own queued task
+    PAID_NOTIFICATIONS = ["payment_sms", "receipt_email", "payment_email"]
+
     def success_notification(self):
         """
+        Queue the side effects of a successful payment so the webhook returns right away.
         1) Sends a notification using Twilio to user, if phone number is found
         2) Sends email receipt to invoice recipient
-        3) Pushes updates to available accounting services.
+        3) Sends payment confirmation email to user
+        4) Pushes updates to available accounting services.
         """
+        for notification in SentInvoice.PAID_NOTIFICATIONS:
+            _ = async_task(
+                "timary.tasks.send_paid_notification", str(self.id), notification
+            )
+
+        if self.user.accounting_org_id:
+            _ = async_task("timary.tasks.sync_sent_invoice", str(self.id))
+
+    def send_payment_sms(self):
         TwilioClient.sent_payment_success(self)
 
+    def send_receipt_email(self):
         msg_body = InvoiceBuilder(self.user).send_invoice_receipt(
             {
                 "sent_invoice": self,
@@ -962,6 +1427,8 @@ class SentInvoice(BaseModel):
             msg_body,
             self.invoice.client.email,
         )
+
+    def send_payment_email(self):
         EmailService.send_plain(
             "Success! Your getting paid!",
             f"""
@@ -976,13 +1443,25 @@ ari@usetimary.com
             self.user.email,
         )
 
-        if self.user.accounting_org_id:
-            try:
-                AccountingService(
-                    {"user": self.user, "sent_invoice": self}
-                ).create_invoice()
-            except AccountingError as ae:
-                ae.log()
+    def claim_notification(self, notification):
+        """Mark the notification as sent before sending it, False if another task already did."""
+        with transaction.atomic():
+            sent_invoice = SentInvoice.objects.select_for_update().get(id=self.id)
+            claimed = notification not in sent_invoice.paid_notifications
+            if claimed:
+                sent_invoice.paid_notifications[
+                    notification
+                ] = timezone.now().isoformat()
+                sent_invoice.save(update_fields=["paid_notifications"])
+        self.paid_notifications = sent_invoice.paid_notifications
+        return claimed
+
+    def release_notification(self, notification):
+        with transaction.atomic():
+            sent_invoice = SentInvoice.objects.select_for_update().get(id=self.id)
+            sent_invoice.paid_notifications.pop(notification, None)
+            sent_invoice.save(update_fields=["paid_notifications"])
+        self.paid_notifications = sent_invoice.paid_notifications
 
     def send_sms_message(self, msg_subject):
         """Send a sms link to clients that have valid phone numbers to pay"""
@@ -1093,7 +1572,13 @@ def default_tasks():
     }
 
 
+# Local time reminders to log hours are texted at, and the User fields it's computed from
+SMS_REMINDER_TIME = time(17)
+SMS_REMINDER_FIELDS = {"phone_number", "phone_number_availability", "timezone"}
+
+
 def default_timer():
+    # Default of the removed User.timer_is_active, old migrations still reference it
     return {"timer_running": False, "running_times": []}
 
 
@@ -1135,6 +1620,8 @@ class User(AbstractUser, BaseModel):
         choices=WEEK_DAYS, null=True, blank=True
     )
     phone_number_repeat_sms = models.BooleanField(default=False)
+    # When send_reminder_sms texts the user next, kept in sync by save()
+    next_sms_reminder_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     timezone = models.CharField(
         default="America/New_York", max_length=100, null=False, blank=False
@@ -1159,15 +1646,63 @@ class User(AbstractUser, BaseModel):
     # Onboarding tasks to be done
     onboarding_tasks = models.JSONField(blank=True, null=True, default=default_tasks)
 
-    # Keep track of active timer
-    timer_is_active = models.JSONField(null=True, blank=True, default=default_timer)
-
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
 
     def __repr__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_sms_reminder = instance.sms_reminder_state()
+        return instance
+
+    def sms_reminder_state(self):
+        """The SMS_REMINDER_FIELDS values, next_sms_reminder_at only changes along with them"""
+        return tuple(
+            str(value) if value else None
+            for value in (
+                self.__dict__.get(field) for field in sorted(SMS_REMINDER_FIELDS)
+            )
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # Saving unrelated fields after 5pm must not push today's pending reminder to the next day
+        sms_reminder_changed = (
+            self._state.adding
+            or self.sms_reminder_state() != getattr(self, "_loaded_sms_reminder", None)
+        )
+        if sms_reminder_changed and (
+            update_fields is None or SMS_REMINDER_FIELDS & set(update_fields)
+        ):
+            self.next_sms_reminder_at = self.get_next_sms_reminder_at()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "next_sms_reminder_at"}
+        super().save(*args, **kwargs)
+        self._loaded_sms_reminder = self.sms_reminder_state()
+
+    def get_next_sms_reminder_at(self, after=None):
+        """
+        5pm in the user's timezone on the next day they want reminders, after the given time (now by default).
+        Built from the local date so it stays at 5pm across DST changes.
+        """
+        if not self.phone_number or not self.phone_number_availability:
+            return None
+        user_timezone = zoneinfo.ZoneInfo(self.timezone)
+        after = after or timezone.now()
+        today = after.astimezone(user_timezone).date()
+        for days in range(8):
+            day = today + timedelta(days=days)
+            reminder_at = datetime.combine(day, SMS_REMINDER_TIME, tzinfo=user_timezone)
+            if (
+                reminder_at > after
+                and day.strftime("%a") in self.phone_number_availability
+            ):
+                return reminder_at
+        return None
+
     @property
     def settings(self):
         return {
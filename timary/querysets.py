@@ -1,15 +1,57 @@
 import calendar
+import uuid
 import zoneinfo
-from datetime import timedelta
+from datetime import datetime, timedelta
 
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.db import models
-from django.db.models import Q, Sum
+from django.db.models import (
+    Count,
+    DecimalField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
 from django.utils import timezone
+from polymorphic.query import PolymorphicQuerySet
 
 from timary.utils import get_users_localtime
 
 
+def encode_hours_cursor(hour):
+    return f"{hour.date_tracked.isoformat()}_{hour.id.hex}"
+
+
+def decode_hours_cursor(cursor):
+    """(date_tracked, id) of the last hour on the previous page, raises ValueError if it's invalid"""
+    date_tracked, _, hour_id = cursor.rpartition("_")
+    return datetime.fromisoformat(date_tracked), uuid.UUID(hour_id)
+
+
 class HoursQuerySet(models.QuerySet):
+    def page(self, cursor=None, size=None):
+        """
+        Keyset pagination on (date_tracked, id), newest first. Returns the hours after the
+        cursor and the cursor for the next page, None on the last page.
+        """
+        size = size or settings.HOURS_PAGE_SIZE
+        hours = self.order_by("-date_tracked", "-id")
+        if cursor:
+            date_tracked, hour_id = decode_hours_cursor(cursor)
+            hours = hours.filter(
+                Q(date_tracked__lt=date_tracked)
+                | Q(date_tracked=date_tracked, id__lt=hour_id)
+            )
+        # One extra row tells if there's another page without a count query
+        hours = list(hours[: size + 1])
+        if len(hours) <= size:
+            return hours, None
+        hours = hours[:size]
+        return hours, encode_hours_cursor(hours[-1])
+
     def current_month(self, user):
         beginning_of_month = get_users_localtime(user).replace(
             day=1,
@@ -60,6 +102,54 @@ class HoursQuerySet(models.QuerySet):
         )
 
 
+class InvoiceQuerySet(PolymorphicQuerySet):
+    def with_card_stats(self):
+        """
+        Annotate what the invoice cards display so budget_percentage and invoices_pending
+        don't run their own aggregate for every card.
+        """
+        from timary.models import LineItem, SentInvoice
+
+        per_invoice = {"invoice_id": OuterRef("pk")}
+        total_hours = (
+            LineItem.objects.non_polymorphic()
+            .filter(**per_invoice)
+            .order_by()
+            .values("invoice_id")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        total_paid = (
+            SentInvoice.objects.filter(
+                paid_status=SentInvoice.PaidStatus.PAID, **per_invoice
+            )
+            .order_by()
+            .values("invoice_id")
+            .annotate(total=Sum("total_price"))
+            .values("total")
+        )
+        pending_count = (
+            SentInvoice.objects.filter(
+                Q(paid_status=SentInvoice.PaidStatus.NOT_STARTED)
+                | Q(paid_status=SentInvoice.PaidStatus.PENDING),
+                **per_invoice,
+            )
+            .order_by()
+            .values("invoice_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return self.select_related("client").annotate(
+            card_total_hours=Subquery(
+                total_hours, output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            card_total_paid=Subquery(
+                total_paid, output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            card_invoices_pending=Subquery(pending_count, output_field=IntegerField()),
+        )
+
+
 def get_last_month(tz):
     """Easier for testing"""
     return (
@@ -141,3 +231,48 @@ class HourStats:
             self.current_month.replace(day=1) - timedelta(days=1),
         )
         return self.get_stats(date_range)
+
+
+def month_starts(end, months):
+    """First day of each of the months ending with the month of `end`, oldest first"""
+    first = end.replace(day=1)
+    return [first - relativedelta(months=m) for m in reversed(range(months))]
+
+
+class RevenueSeries:
+    """
+    Monthly sent invoice totals for one or many invoices over any window of months.
+    Read from the MonthlyRevenue rollup in a single query and kept for the lifetime of the object.
+    """
+
+    def __init__(self, invoices, end, months=6):
+        self.invoice_ids = [invoice.id for invoice in invoices]
+        self.months = month_starts(end, months)
+        self._totals = None
+
+    @property
+    def labels(self):
+        return [month.strftime("%b") for month in self.months]
+
+    @property
+    def totals(self):
+        if self._totals is None:
+            from timary.models import MonthlyRevenue
+
+            rows = MonthlyRevenue.objects.filter(
+                invoice_id__in=self.invoice_ids,
+                month__range=(self.months[0], self.months[-1]),
+            ).values_list("invoice_id", "month", "total")
+            by_month = {
+                (invoice_id, month): float(total) for invoice_id, month, total in rows
+            }
+            self._totals = {
+                invoice_id: [
+                    by_month.get((invoice_id, month), 0) for month in self.months
+                ]
+                for invoice_id in self.invoice_ids
+            }
+        return self._totals
+
+    def for_invoice(self, invoice):
+        return self.labels, self.totals[invoice.id]
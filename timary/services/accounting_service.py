@@ -1,4 +1,13 @@
 import importlib
+from datetime import timedelta
+
+from django.utils import timezone
+from django_q.models import Schedule
+from django_q.tasks import schedule
+
+from timary.custom_errors import AccountingError, AccountingRateLimitError
+from timary.services.rate_limiter import AccountingRateLimiter
+from timary.task_queue import record_external_call
 
 
 def class_for_name(class_name):
@@ -47,25 +56,65 @@ class AccountingService:
         if self.service_klass:
             return self.service_klass().get_refreshed_tokens(user)
 
+    def call_with_rate_limit(self, user, action, *args, retry_task=None, retry_id=None):
+        """
+        Spend the org's request quota before calling the provider.
+        If the quota is used up, or the provider returns a 429, schedule retry_task to run once it refills.
+        """
+        rate_limiter = AccountingRateLimiter(user)
+        try:
+            rate_limiter.acquire(
+                getattr(self.service_klass, "API_CALLS", {}).get(action, 1)
+            )
+            record_external_call("accounting")
+            return getattr(self.service_klass(), action)(*args)
+        except AccountingError as ae:
+            if not ae.is_rate_limited:
+                raise
+            if not isinstance(ae, AccountingRateLimitError):
+                rate_limiter.drain()
+            retry_name = f"accounting_retry_{retry_id}"
+            if retry_task and not Schedule.objects.filter(name=retry_name).exists():
+                schedule(
+                    retry_task,
+                    str(retry_id),
+                    name=retry_name,
+                    schedule_type=Schedule.ONCE,
+                    next_run=timezone.now() + timedelta(seconds=ae.retry_after),
+                )
+            raise
+
     def create_customer(self):
         client = self.kwargs.get("client")
         if self.service_klass and client.user.settings["subscription_active"]:
-            self.service_klass().create_customer(client)
+            self.call_with_rate_limit(
+                client.user,
+                "create_customer",
+                client,
+                retry_task="timary.tasks.sync_client",
+                retry_id=client.id,
+            )
 
     def get_customers(self):
         user = self.kwargs.get("user")
         if self.service_klass and user.settings["subscription_active"]:
-            return self.service_klass().get_customers(user)
+            return self.call_with_rate_limit(user, "get_customers", user)
 
     def update_customer(self):
         client = self.kwargs.get("client")
         if self.service_klass and client.user.settings["subscription_active"]:
-            self.service_klass().update_customer(client)
+            self.call_with_rate_limit(client.user, "update_customer", client)
 
     def create_invoice(self):
         sent_invoice = self.kwargs.get("sent_invoice")
         if self.service_klass and sent_invoice.user.settings["subscription_active"]:
-            self.service_klass().create_invoice(sent_invoice)
+            self.call_with_rate_limit(
+                sent_invoice.user,
+                "create_invoice",
+                sent_invoice,
+                retry_task="timary.tasks.sync_sent_invoice",
+                retry_id=sent_invoice.id,
+            )
 
     def test_integration(self):
         user = self.kwargs.get("user")
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from pathlib import Path
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+from django.utils import timezone
+
+POSTGRES_ENGINE = "django.db.backends.postgresql"
+
+
+class BackupService:
+    PREFIX = "db_backups/"
+
+    @staticmethod
+    def s3_client():
+        return boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+            config=Config(s3={"addressing_style": "path"}),
+        )
+
+    @staticmethod
+    def transfer_config():
+        # Files over the chunk size are streamed from disk in parts with a multipart upload
+        return TransferConfig(
+            multipart_threshold=settings.DB_BACKUP_MULTIPART_CHUNKSIZE,
+            multipart_chunksize=settings.DB_BACKUP_MULTIPART_CHUNKSIZE,
+        )
+
+    @staticmethod
+    def snapshot_sqlite(db_path, snapshot_path):
+        """
+        Copy the live database with SQLite's online backup API. Pages are copied in steps
+        so web and worker writes aren't blocked, and the snapshot is a consistent copy.
+        """
+        source = sqlite3.connect(db_path)
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(snapshot, pages=1024, sleep=0.005)
+        finally:
+            snapshot.close()
+            source.close()
+
+    @staticmethod
+    def dump_postgres(db, path):
+        """pg_dump in the compressed custom format, restore it with pg_restore"""
+        subprocess.run(
+            ["pg_dump", "--format=custom", "--no-owner", f"--file={path}"]
+            + BackupService.postgres_args(db),
+            env={**os.environ, "PGPASSWORD": db.get("PASSWORD") or ""},
+            check=True,
+            capture_output=True,
+        )
+
+    @staticmethod
+    def postgres_args(db):
+        args = []
+        if db.get("HOST"):
+            args.append(f"--host={db['HOST']}")
+        if db.get("PORT"):
+            args.append(f"--port={db['PORT']}")
+        if db.get("USER"):
+            args.append(f"--username={db['USER']}")
+        return args + [f"--dbname={db['NAME']}"]
+
+    @staticmethod
+    def compress(path):
+        compressed = Path(f"{path}.gz")
+        with open(path, "rb") as source, gzip.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        return compressed
+
+    @staticmethod
+    def decompress(path, target):
+        with gzip.open(path, "rb") as source, open(target, "wb") as decompressed:
+            shutil.copyfileobj(source, decompressed)
+
+    @staticmethod
+    def checksum(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def list_backups(cls):
+        """Backup keys, newest first"""
+        paginator = cls.s3_client().get_paginator("list_objects_v2")
+        keys = [
+            obj["Key"]
+            for page in paginator.paginate(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=cls.PREFIX
+            )
+            for obj in page.get("Contents", [])
+            if Path(obj["Key"]).name.startswith("backup-")
+        ]
+        # Keys are timestamped so they sort by age
+        return sorted(keys, reverse=True)
+
+    @classmethod
+    def latest_checksum(cls):
+        backups = cls.list_backups()
+        if not backups:
+            return None, None
+        head = cls.s3_client().head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=backups[0]
+        )
+        return backups[0], head["Metadata"].get("sha256")
+
+    @classmethod
+    def backup(cls):
+        """
+        Snapshot the database, compress and upload it, then rotate old backups. Returns the uploaded key.
+        Every backup is a full snapshot, one whose checksum matches the latest backup is skipped and None returned.
+        """
+        db = settings.DATABASES["default"]
+        timestamp = timezone.now().strftime("%Y%m%dT%H%M%SZ")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if db["ENGINE"] == POSTGRES_ENGINE:
+                file = Path(tmp_dir) / "backup.dump"
+                cls.dump_postgres(db, file)
+                checksum = cls.checksum(file)
+                key = f"{cls.PREFIX}backup-{timestamp}.dump"
+            else:
+                snapshot = Path(tmp_dir) / "backup.sqlite3"
+                cls.snapshot_sqlite(db["NAME"], snapshot)
+                checksum = cls.checksum(snapshot)
+                file = cls.compress(snapshot)
+                key = f"{cls.PREFIX}backup-{timestamp}.sqlite3.gz"
+
+            _, latest_checksum = cls.latest_checksum()
+            if latest_checksum == checksum:
+                return None
+
+            cls.s3_client().upload_file(
+                str(file),
+                settings.AWS_STORAGE_BUCKET_NAME,
+                key,
+                ExtraArgs={"Metadata": {"sha256": checksum}},
+                Config=cls.transfer_config(),
+            )
+        cls.rotate()
+        return key
+
+    @classmethod
+    def rotate(cls, keep=None):
+        """Delete all but the newest `keep` backups"""
+        keep = keep or settings.DB_BACKUP_RETENTION
+        expired = cls.list_backups()[keep:]
+        # delete_objects takes up to 1000 keys per call
+        batches = [expired[i:][:1000] for i in range(0, len(expired), 1000)]
+        for batch in batches:
+            cls.s3_client().delete_objects(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Delete={"Objects": [{"Key": key} for key in batch]},
+            )
+        return expired
+
+    @classmethod
+    def restore(cls, key):
+        """Replace the database's contents with a backup"""
+        db = settings.DATABASES["default"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = Path(tmp_dir) / Path(key).name
+            cls.s3_client().download_file(
+                settings.AWS_STORAGE_BUCKET_NAME,
+                key,
+                str(file),
+                Config=cls.transfer_config(),
+            )
+            if db["ENGINE"] == POSTGRES_ENGINE:
+                subprocess.run(
+                    ["pg_restore", "--clean", "--if-exists", "--no-owner"]
+                    + cls.postgres_args(db)
+                    + [str(file)],
+                    env={**os.environ, "PGPASSWORD": db.get("PASSWORD") or ""},
+                    check=True,
+                    capture_output=True,
+                )
+                return
+
+            snapshot = Path(tmp_dir) / "restore.sqlite3"
+            cls.decompress(file, snapshot)
+            source = sqlite3.connect(snapshot)
+            target = sqlite3.connect(db["NAME"])
+            try:
+                (result,) = source.execute("PRAGMA integrity_check").fetchone()
+                if result != "ok":
+                    raise sqlite3.DatabaseError(f"Backup {key} is corrupt: {result}")
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
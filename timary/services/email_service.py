@@ -1,9 +1,12 @@
 from django.core.mail import send_mail
 
+from timary.task_queue import record_external_call
+
 
 class EmailService:
     @staticmethod
     def send_email(subject, body=None, recipients=None, is_html=False):
+        record_external_call("email")
         send_mail(
             subject,
             body if not is_html else None,
@@ -9,6 +9,9 @@ from timary.custom_errors import AccountingError
 
 
 class FreshbooksService:
+    # Api requests made per action (excluding token refreshes), used by the rate limiter
+    API_CALLS = {"create_invoice": 2}
+
     @staticmethod
     def get_domain():
         ngrok_local_url = "https://8675-71-11-23-55.ngrok.io"
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from timary.custom_errors import AccountingRateLimitError
+
+
+class AccountingRateLimiter:
+    """Token bucket per accounting provider + org id.
+
+    Buckets live in the database so every django-q worker draws from the same quota.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.provider = user.accounting_org
+        self.org_id = user.accounting_org_id or ""
+        # Requests allowed per minute, refilled continuously
+        self.capacity = settings.ACCOUNTING_RATE_LIMITS.get(self.provider)
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket or raise AccountingRateLimitError with the seconds to wait."""
+        if not self.capacity:
+            return
+        from timary.models import AccountingRateLimit
+
+        refill_rate = self.capacity / 60
+        now = timezone.now()
+        with transaction.atomic():
+            bucket, _ = AccountingRateLimit.objects.select_for_update().get_or_create(
+                provider=self.provider,
+                org_id=self.org_id,
+                defaults={"tokens": self.capacity, "last_refill": now},
+            )
+            elapsed = max((now - bucket.last_refill).total_seconds(), 0)
+            bucket.tokens = min(self.capacity, bucket.tokens + elapsed * refill_rate)
+            bucket.last_refill = now
+            wait = 0
+            if bucket.tokens >= tokens:
+                bucket.tokens -= tokens
+            else:
+                wait = (tokens - bucket.tokens) / refill_rate
+            bucket.save(update_fields=["tokens", "last_refill"])
+
+        if wait:
+            raise AccountingRateLimitError(user=self.user, retry_after=wait)
+
+    def drain(self):
+        """Provider told us we're over quota, stop spending until the bucket refills."""
+        if not self.capacity:
+            return
+        from timary.models import AccountingRateLimit
+
+        AccountingRateLimit.objects.update_or_create(
+            provider=self.provider,
+            org_id=self.org_id,
+            defaults={"tokens": 0, "last_refill": timezone.now()},
+        )
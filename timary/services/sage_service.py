@@ -9,6 +9,9 @@ from timary.custom_errors import AccountingError
 
 
 class SageService:
+    # Api requests made per action (excluding token refreshes), used by the rate limiter
+    API_CALLS = {"create_invoice": 5}
+
     @staticmethod
     def get_auth_url():
         client_redirect = f"{settings.SITE_URL}{reverse('timary:accounting_redirect')}"
@@ -4,10 +4,27 @@ import time
 
 import stripe
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django_q.tasks import schedule
 
 from timary.services.email_service import EmailService
+from timary.task_queue import record_external_call
+
+
+class InstrumentedRequestsClient(stripe.http_client.RequestsClient):
+    def request(self, method, url, headers, post_data=None):
+        # Counts every attempt, including network retries
+        record_external_call("stripe")
+        return super().request(method, url, headers, post_data)
+
+
+# Configure the client once, every call shares the same pooled http session per thread
+stripe.api_key = settings.STRIPE_SECRET_API_KEY
+stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+stripe.default_http_client = InstrumentedRequestsClient(
+    timeout=settings.STRIPE_HTTP_TIMEOUT
+)
 
 
 def get_client_ip(request):
@@ -22,6 +39,12 @@ def get_client_ip(request):
 class StripeService:
     stripe_api_key = settings.STRIPE_SECRET_API_KEY
     stripe_public_api_key = settings.STRIPE_PUBLIC_API_KEY
+    # Payment intents that haven't been paid yet and can be shown on the pay page again
+    reusable_intent_statuses = [
+        "requires_payment_method",
+        "requires_confirmation",
+        "requires_action",
+    ]
 
     @classmethod
     def frontend_ui(cls):
@@ -55,7 +78,6 @@ class StripeService:
 
     @classmethod
     def create_new_account(cls, request, user, first_token, second_token):
-        stripe.api_key = cls.stripe_api_key
         stripe_connect_account = stripe.Account.create(
             country="US",
             type="custom",
@@ -97,7 +119,6 @@ class StripeService:
 
     @classmethod
     def create_customer_for_invoice(cls, client):
-        stripe.api_key = cls.stripe_api_key
         stripe_customer = stripe.Customer.create(
             email=client.email,
             name=client.name,
@@ -107,7 +128,6 @@ class StripeService:
 
     @classmethod
     def update_customer(cls, client):
-        stripe.api_key = cls.stripe_api_key
         stripe.Customer.modify(
             client.stripe_customer_id,
             email=client.email,
@@ -117,23 +137,33 @@ class StripeService:
 
     @classmethod
     def retrieve_customer(cls, customer_id):
-        stripe.api_key = cls.stripe_api_key
         stripe_customer = stripe.Customer.retrieve(customer_id)
         return stripe_customer
 
     @classmethod
     def retrieve_customer_payment_method(cls, customer_id):
-        stripe.api_key = cls.stripe_api_key
-        payment_methods = stripe.Customer.list_payment_methods(
-            customer_id, type="us_bank_account"
+        """Cached for a few minutes so refreshing the pay page doesn't hit Stripe again"""
+
+        def get_payment_method():
+            payment_methods = stripe.Customer.list_payment_methods(
+                customer_id, type="us_bank_account"
+            )
+            if len(payment_methods["data"]) > 0:
+                return payment_methods["data"][0].to_dict_recursive()
+            return None
+
+        return cache.get_or_set(
+            f"stripe_payment_method_{customer_id}",
+            get_payment_method,
+            settings.STRIPE_PAYMENT_METHOD_CACHE_TTL,
         )
-        if len(payment_methods["data"]) > 0:
-            return payment_methods["data"][0]
-        return None
+
+    @classmethod
+    def clear_customer_payment_method(cls, customer_id):
+        cache.delete(f"stripe_payment_method_{customer_id}")
 
     @classmethod
     def create_payment_intent(cls):
-        stripe.api_key = cls.stripe_api_key
         intent = stripe.SetupIntent.create(
             payment_method_types=["card"],
         )
@@ -141,7 +171,6 @@ class StripeService:
 
     @classmethod
     def update_payment_method(cls, user, first_token, second_token):
-        stripe.api_key = cls.stripe_api_key
         customer_source = stripe.Customer.create_source(
             user.stripe_customer_id,
             source=first_token,
@@ -168,26 +197,51 @@ class StripeService:
 
     @classmethod
     def create_payment_intent_for_payout(cls, sent_invoice):
-        stripe.api_key = cls.stripe_api_key
+        """Reuse the intent from a previous visit to the pay page while it can still be paid"""
         application_fee, invoice_amount = StripeService.calculate_application_fee(
             sent_invoice
         )
+        customer_id = sent_invoice.invoice.client.stripe_customer_id
+        destination = sent_invoice.user.stripe_connect_id
+
+        if sent_invoice.stripe_payment_intent_id:
+            try:
+                intent = stripe.PaymentIntent.retrieve(
+                    sent_invoice.stripe_payment_intent_id
+                )
+            except stripe.error.InvalidRequestError:
+                intent = None
+            if (
+                intent
+                and intent["status"] in cls.reusable_intent_statuses
+                and intent["customer"] == customer_id
+                and (intent.get("transfer_data") or {}).get("destination")
+                == destination
+            ):
+                if intent["amount"] != invoice_amount:
+                    # Late penalties or installments changed the total since the last visit
+                    intent = stripe.PaymentIntent.modify(
+                        intent["id"],
+                        amount=invoice_amount,
+                        application_fee_amount=application_fee,
+                    )
+                return intent
+
         intent = stripe.PaymentIntent.create(
             payment_method_types=["us_bank_account"],
-            customer=sent_invoice.invoice.client.stripe_customer_id,
+            customer=customer_id,
             amount=invoice_amount,
             setup_future_usage="off_session",
             currency="usd",
             application_fee_amount=application_fee,
             transfer_data={
-                "destination": sent_invoice.user.stripe_connect_id,
+                "destination": destination,
             },
         )
         return intent
 
     @classmethod
     def confirm_payment(cls, sent_invoice):
-        stripe.api_key = cls.stripe_api_key
         application_fee, invoice_amount = StripeService.calculate_application_fee(
             sent_invoice
         )
@@ -215,8 +269,6 @@ class StripeService:
     def create_new_subscription(cls, user):
         from timary.models import User
 
-        stripe.api_key = cls.stripe_api_key
-
         subscription = stripe.Subscription.create(
             customer=user.stripe_customer_id,
             items=[
@@ -264,8 +316,6 @@ ari@usetimary.com
         """Difference from create_new_subscription is no trial"""
         from timary.models import User
 
-        stripe.api_key = cls.stripe_api_key
-
         try:
             subscription = stripe.Subscription.create(
                 customer=user.stripe_customer_id,
@@ -290,19 +340,23 @@ ari@usetimary.com
 
     @classmethod
     def get_connect_account(cls, account_id):
-        stripe.api_key = cls.stripe_api_key
         return stripe.Account.retrieve(account_id)
 
     @classmethod
     def get_subscription(cls, subscription_id):
-        stripe.api_key = cls.stripe_api_key
         return stripe.Subscription.retrieve(subscription_id)
 
+    @classmethod
+    def list_events(cls, created_after, event_types=None):
+        params = {"created": {"gte": int(created_after.timestamp())}, "limit": 100}
+        if event_types:
+            params["types"] = event_types
+        return stripe.Event.list(**params).auto_paging_iter()
+
     @classmethod
     def cancel_subscription(cls, user):
         from timary.models import User
 
-        stripe.api_key = cls.stripe_api_key
         try:
             stripe.Subscription.delete(user.stripe_subscription_id)
         except stripe.error.InvalidRequestError as e:
@@ -336,7 +390,6 @@ ari@usetimary.com
 
     @classmethod
     def update_connect_account(cls, user_id, account_id):
-        stripe.api_key = cls.stripe_api_key
         account_link = stripe.AccountLink.create(
             account=account_id,
             refresh_url=f"{settings.SITE_URL}/update_connect/",
@@ -347,7 +400,6 @@ ari@usetimary.com
 
     @classmethod
     def close_stripe_account(cls, user):
-        stripe.api_key = cls.stripe_api_key
         if user.stripe_subscription_id and stripe.Subscription.retrieve(
             user.stripe_subscription_id
         ):
@@ -363,7 +415,6 @@ ari@usetimary.com
 
     @classmethod
     def create_subscription_discount(cls, user, amount, discount_to_delete=None):
-        stripe.api_key = cls.stripe_api_key
         if discount_to_delete:
             stripe.Subscription.delete_discount(discount_to_delete)
         coupon = stripe.Coupon.create(
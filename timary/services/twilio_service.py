@@ -1,13 +1,14 @@
-import datetime
-
 from django.conf import settings
 from django_twilio.client import twilio_client
 
+from timary.task_queue import record_external_call
+
 
 class TwilioClient:
     @staticmethod
     def sent_payment_success(sent_invoice):
         if sent_invoice.invoice.user.phone_number:
+            record_external_call("twilio")
             _ = twilio_client.messages.create(
                 to=sent_invoice.invoice.user.formatted_phone_number,
                 from_=settings.TWILIO_PHONE_NUMBER,
@@ -17,14 +18,19 @@ class TwilioClient:
 
     @staticmethod
     def log_hours(invoice):
+        from timary.models import SMSConversation
+
+        record_external_call("twilio")
         _ = twilio_client.messages.create(
             to=invoice.user.formatted_phone_number,
             from_=settings.TWILIO_PHONE_NUMBER,
             body=f"How many hours to log for: {invoice.title}. Reply 'S' to skip",
         )
+        SMSConversation.record_prompt(invoice.user, invoice)
 
     @staticmethod
     def send_message(user, message):
+        record_external_call("twilio")
         _ = twilio_client.messages.create(
             to=user.formatted_phone_number,
             from_=settings.TWILIO_PHONE_NUMBER,
@@ -33,6 +39,7 @@ class TwilioClient:
 
     @staticmethod
     def send_generic_message(phone_number, message):
+        record_external_call("twilio")
         _ = twilio_client.messages.create(
             to=phone_number,
             from_=settings.TWILIO_PHONE_NUMBER,
@@ -41,20 +48,9 @@ class TwilioClient:
 
     @staticmethod
     def invite_user(phone_number, message):
+        record_external_call("twilio")
         _ = twilio_client.messages.create(
             to=f"{phone_number.country_code}{phone_number.national_number}",
             from_=settings.TWILIO_PHONE_NUMBER,
             body=message,
         )
-
-    @staticmethod
-    def get_user_messages(user_number):
-        recent_messages = twilio_client.messages.list(
-            to=user_number, limit=1, date_sent=datetime
-        )
-        if recent_messages and len(recent_messages) == 1:
-            recent_message = recent_messages[0]
-            if hasattr(recent_message, "body"):
-                if ":" in recent_message.body:
-                    return recent_message
-        return None
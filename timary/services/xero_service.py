@@ -11,6 +11,9 @@ from timary.utils import simulate_requests_response
 
 
 class XeroService:
+    # Api requests made per action (excluding token refreshes), used by the rate limiter
+    API_CALLS = {"create_invoice": 2}
+
     @staticmethod
     def get_auth_url():
         redirect_uri = f"{settings.SITE_URL}{reverse('timary:accounting_redirect')}"
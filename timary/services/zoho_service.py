@@ -10,6 +10,9 @@ from timary.custom_errors import AccountingError
 
 
 class ZohoService:
+    # Api requests made per action (excluding token refreshes), used by the rate limiter
+    API_CALLS = {"create_invoice": 4}
+
     @staticmethod
     def get_auth_url():
         client_redirect = f"{settings.SITE_URL}{reverse('timary:accounting_redirect')}"
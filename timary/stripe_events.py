@@ -0,0 +1,170 @@
+import sys
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from timary.invoice_builder import InvoiceBuilder
+from timary.models import SentInvoice, StripeEvent, User
+from timary.services.email_service import EmailService
+from timary.services.stripe_service import StripeService
+
+
+def payment_failed(data_object):
+    sent_invoice = SentInvoice.objects.filter(
+        stripe_payment_intent_id=data_object["id"]
+    ).first()
+    if not sent_invoice:
+        return
+
+    sent_invoice.paid_status = SentInvoice.PaidStatus.FAILED
+    sent_invoice.save()
+
+    msg_body = InvoiceBuilder(sent_invoice.user).send_invoice(
+        {
+            "sent_invoice": sent_invoice,
+            "line_items": sent_invoice.get_rendered_line_items(),
+        }
+    )
+    EmailService.send_html(
+        f"Unable to process {sent_invoice.invoice.user.first_name}'s invoice. "
+        f"An error occurred while trying to "
+        f"transfer the funds for this invoice. Please give it another try.",
+        msg_body,
+        sent_invoice.invoice.client.email,
+    )
+
+
+def payment_succeeded(data_object):
+    sent_invoice = SentInvoice.objects.filter(
+        stripe_payment_intent_id=data_object["id"]
+    ).first()
+    if not sent_invoice or sent_invoice.paid_status == SentInvoice.PaidStatus.PAID:
+        return
+
+    sent_invoice.paid_status = SentInvoice.PaidStatus.PAID
+    sent_invoice.date_paid = timezone.now()
+    sent_invoice.save()
+    # The payment may have saved a new bank account for the client
+    StripeService.clear_customer_payment_method(
+        sent_invoice.invoice.client.stripe_customer_id
+    )
+    sent_invoice.success_notification()
+
+
+def account_updated(data_object):
+    user = User.objects.filter(stripe_connect_id=data_object["id"]).first()
+    if user:
+        user.update_payouts_enabled(data_object["requirements"]["disabled_reason"])
+
+
+def subscription_invoice_created(data_object):
+    user = User.objects.filter(stripe_subscription_id=data_object["id"]).first()
+    if not user:
+        return
+    user.stripe_subscription_status = User.StripeSubscriptionStatus.ACTIVE
+    user.save()
+
+    if user.referrer_id:
+        referred_user = User.objects.get(referral_id=user.referral_id)
+        if referred_user:
+            referred_user.add_referral_discount()
+
+
+def subscription_payment_failed(data_object):
+    # Could be any reason, but subscription has failed
+    user = User.objects.filter(stripe_subscription_id=data_object["id"]).first()
+    if not user:
+        return
+    user.stripe_subscription_status = User.StripeSubscriptionStatus.INACTIVE
+    user.save()
+    EmailService.send_plain(
+        "Oops, something went wrong over here at Timary",
+        f"""
+Hello {user.first_name.capitalize()},
+
+Looks like Stripe had trouble charging your card.
+
+Nothing to worry about, just head to your profile page and update your payment method.
+
+Once that succeeds, then re-activate the subscription and you should be good to go.
+
+If there are any questions, please do not hesitate to reply to this email.
+
+Otherwise, enjoy the rest of your day.
+Aristotel F
+ari@usetimary.com
+            """,
+        user.email,
+    )
+    if not settings.DEBUG:
+        print(f"Subscription failed: user_id={user.id}", file=sys.stderr)
+
+
+STRIPE_EVENT_HANDLERS = {
+    "payment_intent.payment_failed": payment_failed,
+    "payment_intent.succeeded": payment_succeeded,
+    "charge.succeeded": payment_succeeded,
+    "transfer.created": payment_succeeded,
+    "account.updated": account_updated,
+    "invoice.created": subscription_invoice_created,
+    "invoice.finalization_failed": subscription_payment_failed,
+    "invoice.payment_action_required": subscription_payment_failed,
+    "invoice.payment_failed": subscription_payment_failed,
+}
+
+
+def store_stripe_event(event):
+    """Save a verified event once, returns None if Stripe already delivered it"""
+    stripe_event, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={"event_type": event["type"], "payload": dict(event)},
+    )
+    return stripe_event if created else None
+
+
+def unprocessed_stripe_event(event):
+    return StripeEvent.objects.filter(
+        event_id=event["id"], processed_at__isnull=True
+    ).first()
+
+
+def process_stripe_event(stripe_event, force=False):
+    """
+    Run the handler for a stored event. Events are claimed before they're handled,
+    so concurrent workers or a retried delivery never process the same event twice.
+    A claim left behind by a killed worker expires after STRIPE_EVENT_CLAIM_SECONDS.
+    """
+    now = timezone.now()
+    claimed = StripeEvent.objects.filter(
+        Q(claimed_at__isnull=True)
+        | Q(
+            claimed_at__lt=now - timedelta(seconds=settings.STRIPE_EVENT_CLAIM_SECONDS)
+        ),
+        id=stripe_event.id,
+    )
+    if not force:
+        claimed = claimed.filter(processed_at__isnull=True)
+    if not claimed.update(claimed_at=now, attempts=F("attempts") + 1):
+        return False
+
+    handler = STRIPE_EVENT_HANDLERS.get(stripe_event.event_type)
+    if not handler:
+        print(f"Unhandled event type {stripe_event.event_type}")
+    else:
+        try:
+            handler(stripe_event.payload["data"]["object"])
+        except Exception:
+            # Release it so it can be replayed, let Sentry catch this error
+            error = traceback.format_exc()
+            StripeEvent.objects.filter(id=stripe_event.id).update(
+                claimed_at=None, error=error
+            )
+            print(f"{stripe_event.event_id=}, {error}", file=sys.stderr)
+            return False
+    StripeEvent.objects.filter(id=stripe_event.id).update(
+        claimed_at=None, processed_at=timezone.now(), error=None
+    )
+    return True
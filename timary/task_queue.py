@@ -0,0 +1,240 @@
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from django_q.brokers import Broker
+from django_q.utils import get_func_repr
+
+from timary.cache import incr_counter, set_max
+
+METRIC_FIELDS = [
+    "enqueued",
+    "started",
+    "succeeded",
+    "failed",
+    "latency_ms",
+    "duration_ms",
+    "max_latency_ms",
+    "max_duration_ms",
+]
+
+# Recorders for the tasks running in this thread, outer tasks also count their nested tasks' work
+_active_runs = ContextVar("active_runs", default=())
+
+
+class InMemoryBroker(Broker):
+    """
+    Keeps the queue in process memory, for tests and local runs that don't need a database or redis.
+    Set Q_CLUSTER["broker_class"] = "timary.task_queue.InMemoryBroker".
+    """
+
+    queues = defaultdict(deque)
+    in_flight = {}
+    ids = count(1)
+    lock = threading.Lock()
+
+    def enqueue(self, task):
+        with self.lock:
+            task_id = next(self.ids)
+            self.queues[self.list_key].append((task_id, task))
+        return task_id
+
+    def dequeue(self):
+        with self.lock:
+            if self.queues[self.list_key]:
+                task_id, task = self.queues[self.list_key].popleft()
+                self.in_flight[task_id] = (self.list_key, task)
+                return [(task_id, task)]
+
+    def queue_size(self):
+        return len(self.queues[self.list_key])
+
+    def lock_size(self):
+        return len(self.in_flight)
+
+    def delete_queue(self):
+        self.purge_queue()
+
+    def purge_queue(self):
+        with self.lock:
+            self.queues[self.list_key].clear()
+
+    def acknowledge(self, task_id):
+        self.in_flight.pop(task_id, None)
+
+    def delete(self, task_id):
+        self.acknowledge(task_id)
+
+    def fail(self, task_id):
+        # Put it back on the queue to be retried
+        with self.lock:
+            list_key, task = self.in_flight.pop(task_id, (None, None))
+            if task:
+                self.queues[list_key].append((task_id, task))
+
+    def ping(self):
+        return True
+
+    def info(self):
+        return "In memory"
+
+
+def _key(func, field):
+    return f"task_metrics:{func}:{field}"
+
+
+def _incr(func, field, amount=1):
+    incr_counter(_key(func, field), amount)
+
+
+def _max(func, field, value):
+    set_max(_key(func, field), value)
+
+
+def _ms(delta):
+    return int(delta.total_seconds() * 1000)
+
+
+def record_enqueue(sender, task, **kwargs):
+    _incr(get_func_repr(task["func"]), "enqueued")
+
+
+def record_execute(sender, func, task, **kwargs):
+    """Runs in the worker right before the task, `started` is set by django-q when it's enqueued"""
+    func = get_func_repr(task["func"])
+    task["executed"] = timezone.now()
+    latency = _ms(task["executed"] - task["started"])
+    _incr(func, "started")
+    _incr(func, "latency_ms", latency)
+    _max(func, "max_latency_ms", latency)
+
+
+def record_result(sender, task, **kwargs):
+    func = get_func_repr(task["func"])
+    _incr(func, "succeeded" if task.get("success") else "failed")
+    if task.get("executed") and task.get("stopped"):
+        duration = _ms(task["stopped"] - task["executed"])
+        _incr(func, "duration_ms", duration)
+        _max(func, "max_duration_ms", duration)
+
+
+def task_functions():
+    from timary import tasks
+
+    return [
+        f"{tasks.__name__}.{name}"
+        for name, func in inspect.getmembers(tasks, inspect.isfunction)
+        if func.__module__ == tasks.__name__
+    ]
+
+
+def task_metrics(funcs=None):
+    """
+    Queue depth, enqueue to start latency and run time for each task function.
+    Depth counts tasks enqueued that a worker hasn't picked up yet.
+    """
+    funcs = funcs or task_functions()
+    values = cache.get_many(
+        [_key(func, field) for func in funcs for field in METRIC_FIELDS]
+    )
+    metrics = {}
+    for func in funcs:
+        stats = {field: values.get(_key(func, field), 0) for field in METRIC_FIELDS}
+        if not stats["enqueued"]:
+            continue
+        finished = stats["succeeded"] + stats["failed"]
+        metrics[func] = {
+            "queue_depth": max(stats["enqueued"] - stats["started"], 0),
+            "enqueued": stats["enqueued"],
+            "succeeded": stats["succeeded"],
+            "failed": stats["failed"],
+            "avg_latency_ms": stats["latency_ms"] // stats["started"]
+            if stats["started"]
+            else 0,
+            "max_latency_ms": stats["max_latency_ms"],
+            "avg_duration_ms": stats["duration_ms"] // finished if finished else 0,
+            "max_duration_ms": stats["max_duration_ms"],
+        }
+    return metrics
+
+
+class TaskRecorder:
+    """Counts a task run's queries, external calls and rows, installed as a connection execute wrapper"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.external_calls = Counter()
+        self.rows_processed = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - start
+
+
+def record_external_call(service):
+    """Count a call to email, Twilio, Stripe or an accounting provider against the running tasks"""
+    for recorder in _active_runs.get():
+        recorder.external_calls[service] += 1
+
+
+def record_rows(rows):
+    for recorder in _active_runs.get():
+        recorder.rows_processed += rows
+
+
+def instrument_task(func):
+    """
+    Store a TaskRun for every call with its wall time, database queries and time,
+    external calls and the rows it processed (see record_rows).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from timary.models import TaskRun
+
+        recorder = TaskRecorder()
+        token = _active_runs.set(_active_runs.get() + (recorder,))
+        started_at = timezone.now()
+        start = time.perf_counter()
+        success, result = False, ""
+        try:
+            with connection.execute_wrapper(recorder):
+                result = func(*args, **kwargs)
+            success = True
+            return result
+        except Exception as e:
+            result = repr(e)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _active_runs.reset(token)
+            try:
+                TaskRun.objects.create(
+                    task=get_func_repr(func),
+                    started_at=started_at,
+                    duration_ms=int(duration * 1000),
+                    query_count=recorder.query_count,
+                    query_time_ms=int(recorder.query_time * 1000),
+                    external_calls=dict(recorder.external_calls),
+                    rows_processed=recorder.rows_processed,
+                    success=success,
+                    result=str(result)[:255],
+                )
+            except Exception as e:
+                # Never hide the task's own result or error behind a failed metrics write
+                print(f"Unable to record task run: {e=}", file=sys.stderr)
+
+    return wrapper
@@ -1,9 +1,9 @@
 import datetime
+import subprocess
+import sys
 import zoneinfo
 from datetime import date, timedelta
-from pathlib import Path
 
-import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.db.models import Q, Sum
@@ -11,8 +11,11 @@ from django.template.loader import render_to_string
 from django.utils import timezone
 from django_q.tasks import async_task, schedule
 
+from timary.hours_import import HoursImporter
 from timary.invoice_builder import InvoiceBuilder
 from timary.models import (
+    Client,
+    HoursImport,
     HoursLineItem,
     IntervalInvoice,
     Invoice,
@@ -20,14 +23,20 @@ from timary.models import (
     RecurringInvoice,
     SentInvoice,
     SingleInvoice,
+    StripeEvent,
+    TaskRun,
     User,
     WeeklyInvoice,
 )
+from timary.services.backup_service import BackupService
 from timary.services.email_service import EmailService
 from timary.services.twilio_service import TwilioClient
+from timary.stripe_events import process_stripe_event as handle_stripe_event
+from timary.task_queue import instrument_task, record_rows
 from timary.utils import get_users_localtime
 
 
+@instrument_task
 def gather_recurring_hours():
     all_recurring_hours = HoursLineItem.objects.exclude(
         Q(recurring_logic__exact={}) | Q(recurring_logic__isnull=True)
@@ -68,9 +77,11 @@ def gather_recurring_hours():
         if is_today_saturday and recurring_hour.recurring_logic:
             recurring_hour.update_recurring_starting_weeks()
 
+    record_rows(len(all_recurring_hours))
     return f"{len(new_hours_added)} hours added."
 
 
+@instrument_task
 def gather_invoices():
     today = timezone.now().replace(hour=23, minute=59, second=59, microsecond=59)
     tomorrow = today + timedelta(days=1)
@@ -102,12 +113,14 @@ def gather_invoices():
         _ = async_task(send_invoice_preview, invoice.id)
 
     invoices_sent = len(list(invoices_sent_today) + list(invoices_sent_tomorrow))
+    record_rows(invoices_sent)
 
     if today.weekday() == 0:
         invoices_sent_only_on_mondays = WeeklyInvoice.objects.filter(
             paused_query & archived_query
         ).exclude(user_active_query)
 
+        record_rows(len(invoices_sent_only_on_mondays))
         for invoice in invoices_sent_only_on_mondays:
             if invoice.end_date and invoice.end_date.date() <= today.date():
                 # Pause invoice if passed end date
@@ -127,6 +140,7 @@ def previous_week_range(date):
     return start_date, end_date
 
 
+@instrument_task
 def gather_invoices_summary():
     updates_sent = 0
     users = User.objects.filter(
@@ -184,9 +198,11 @@ def gather_invoices_summary():
             )
 
             updates_sent += 1
+    record_rows(updates_sent)
     return f"Invoice updates sent: {updates_sent}"
 
 
+@instrument_task
 def gather_invoice_installments():
     today = timezone.now()
     user_active_query = Q(
@@ -207,6 +223,7 @@ def gather_invoice_installments():
     return f"Installments sent: {installments_sent}"
 
 
+@instrument_task
 def send_invoice_installment(invoice_id):
     today = timezone.now()
     installment = SingleInvoice.objects.get(id=invoice_id)
@@ -238,6 +255,7 @@ def send_invoice_installment(invoice_id):
     return True
 
 
+@instrument_task
 def gather_single_invoices_before_due_date():
     today = timezone.now()
     one_day_before = today + timedelta(days=1)
@@ -273,6 +291,7 @@ def gather_single_invoices_before_due_date():
     return f"Invoices sent: {invoices_sent}"
 
 
+@instrument_task
 def send_invoice_reminder(invoice_id):
     single_invoice_obj = SingleInvoice.objects.get(id=invoice_id)
     if single_invoice_obj.installments != 1:
@@ -320,6 +339,7 @@ def send_invoice_reminder(invoice_id):
     sent_invoice.send_sms_message(msg_subject)
 
 
+@instrument_task
 def send_invoice(invoice_id):
     invoice = Invoice.objects.get(id=invoice_id)
     if not invoice.user.settings["subscription_active"]:
@@ -354,6 +374,7 @@ def send_invoice(invoice_id):
     invoice.update()
 
 
+@instrument_task
 def send_invoice_preview(invoice_id):
     invoice = Invoice.objects.get(id=invoice_id)
     if not invoice.user.settings["subscription_active"]:
@@ -377,22 +398,27 @@ def send_invoice_preview(invoice_id):
     )
 
 
+@instrument_task
 def send_reminder_sms():
-    users = User.objects.exclude(
-        Q(phone_number__isnull=True) | Q(phone_number__exact="")
-    ).prefetch_related("invoices")
+    # A late run still texts users due within SMS_REMINDER_WINDOW, older reminders are only rescheduled
+    now = timezone.now()
+    users = list(
+        User.objects.filter(next_sms_reminder_at__lte=now)
+        .exclude(Q(phone_number__isnull=True) | Q(phone_number__exact=""))
+        .prefetch_related("invoices")
+    )
 
     invoices_sent_count = 0
     for user in users:
-        now = get_users_localtime(user)
-        weekday = now.strftime("%a")
-        if (
-            weekday not in user.settings.get("phone_number_availability")
-            or not user.settings["subscription_active"]
-        ):
+        due_at = user.next_sms_reminder_at
+        # Claim the reminder before texting, so an overlapping run or a failed send doesn't text the user again
+        claimed = User.objects.filter(id=user.id, next_sms_reminder_at=due_at).update(
+            next_sms_reminder_at=user.get_next_sms_reminder_at(after=now)
+        )
+        is_late = now - due_at > timedelta(seconds=settings.SMS_REMINDER_WINDOW)
+        if not claimed or is_late or not user.settings["subscription_active"]:
             continue
-        five_pm_localtime = now.replace(hour=17, minute=0, second=0, microsecond=0)
-        if now.replace(second=0, microsecond=0) == five_pm_localtime:
+        try:
             RecurringInvoice.objects.filter(user=user).update(sms_ping_today=False)
             remaining_invoices = user.invoices_not_logged()
             if remaining_invoices:
@@ -406,9 +432,14 @@ def send_reminder_sms():
                         schedule_type="O",
                         next_run=timezone.now() + timedelta(hours=1),
                     )
+        except Exception as e:
+            # Let Sentry catch this error
+            print(f"Unable to send reminder sms: {user.id=}, {e=}", file=sys.stderr)
+    record_rows(len(users))
     return f"{invoices_sent_count} message(s) sent."
 
 
+@instrument_task
 def remind_sms_again(user_email):
     user = User.objects.get(email=user_email)
     remaining_invoices = user.invoices_not_logged()
@@ -420,6 +451,7 @@ def remind_sms_again(user_email):
     return f"{invoices_sent_count} message(s) resent."
 
 
+@instrument_task
 def send_weekly_updates():
     paused_query = Q(is_paused=False)
     archived_query = Q(is_archived=False)
@@ -436,6 +468,7 @@ def send_weekly_updates():
         .astimezone(tz=zoneinfo.ZoneInfo("America/New_York"))
     )
 
+    record_rows(len(all_recurring_invoices))
     for invoice in all_recurring_invoices:
         if not invoice.user.settings["subscription_active"]:
             continue
@@ -465,6 +498,7 @@ def send_weekly_updates():
         )
 
 
+@instrument_task
 def remind_users_to_log_hours():
     users = User.objects.exclude(
         stripe_subscription_status=User.StripeSubscriptionStatus.INACTIVE
@@ -478,6 +512,7 @@ def remind_users_to_log_hours():
     )
     hours_date_range = (week_start, today)
 
+    record_rows(len(users))
     for user in users:
         if user.get_invoices.filter(is_paused=False).count() == 0:
             continue
@@ -508,19 +543,91 @@ Timary
             )
 
 
+@instrument_task
 def backup_db_file():
-    base_dir = Path(__file__).resolve().parent.parent
-    file = base_dir / "db.sqlite3"
-    # Upload the file
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    )
     try:
-        _ = s3_client.upload_file(
-            file.name, settings.AWS_STORAGE_BUCKET_NAME, "db_backups/backup.sqlite3"
-        )
-    except ClientError:
-        return False
-    return True
+        key = BackupService.backup()
+    except (subprocess.CalledProcessError, FileNotFoundError, ClientError) as e:
+        # Let Sentry catch this error
+        print(f"Database backup failed: {e=}", file=sys.stderr)
+        return "Database backup failed"
+    if not key:
+        return "Backup skipped, database unchanged since the latest backup"
+    return f"Database backed up to {key}"
+
+
+def prune_task_runs():
+    deleted = TaskRun.prune()
+    return f"Task runs deleted: {deleted}"
+
+
+@instrument_task
+def sync_client(client_id):
+    """Retry a customer sync that was deferred by the accounting rate limiter"""
+    client = Client.objects.filter(id=client_id).first()
+    if not client:
+        return "Client not found"
+    customer_synced, error_raised = client.sync_customer()
+    return f"Client synced: {customer_synced}, {error_raised or ''}"
+
+
+@instrument_task
+def sync_sent_invoice(sent_invoice_id):
+    """Retry an invoice sync that was deferred by the accounting rate limiter"""
+    sent_invoice = SentInvoice.objects.filter(id=sent_invoice_id).first()
+    if not sent_invoice:
+        return "Sent invoice not found"
+    invoice_synced, error_raised = sent_invoice.sync_invoice()
+    return f"Sent invoice synced: {invoice_synced}, {error_raised or ''}"
+
+
+@instrument_task
+def send_paid_notification(sent_invoice_id, notification, attempt=1):
+    """
+    Send one of a paid invoice's notifications, at most once per sent invoice.
+    Failures are retried with a backoff without repeating the notifications already sent.
+    """
+    sent_invoice = SentInvoice.objects.filter(id=sent_invoice_id).first()
+    if not sent_invoice or notification not in SentInvoice.PAID_NOTIFICATIONS:
+        return f"Unable to send {notification}"
+    if not sent_invoice.claim_notification(notification):
+        return f"{notification} already sent"
+
+    try:
+        getattr(sent_invoice, f"send_{notification}")()
+    except Exception as e:
+        sent_invoice.release_notification(notification)
+        # Let Sentry catch this error
+        print(f"{sent_invoice_id=}, {notification=}, {attempt=}, {e=}", file=sys.stderr)
+        if attempt < 3:
+            _ = schedule(
+                "timary.tasks.send_paid_notification",
+                sent_invoice_id,
+                notification,
+                attempt + 1,
+                schedule_type="O",
+                next_run=timezone.now() + timedelta(minutes=5 * attempt),
+            )
+        return f"Failed to send {notification}"
+    return f"{notification} sent"
+
+
+@instrument_task
+def process_stripe_event(stripe_event_id):
+    stripe_event = StripeEvent.objects.filter(id=stripe_event_id).first()
+    if not stripe_event:
+        return "Stripe event not found"
+    processed = handle_stripe_event(stripe_event)
+    return f"{stripe_event.event_type} processed: {processed}"
+
+
+@instrument_task
+def import_hours(hours_import_id):
+    hours_import = HoursImport.objects.filter(id=hours_import_id).first()
+    if not hours_import:
+        return "Hours import not found"
+    HoursImporter(hours_import).run()
+    return (
+        f"Hours imported: {hours_import.imported_rows}, "
+        f"rows with errors: {hours_import.error_count}"
+    )
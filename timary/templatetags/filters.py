@@ -4,6 +4,7 @@ from django import template
 from django.template.defaultfilters import date as template_date
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
+from waffle import switch_is_active
 
 register = template.Library()
 
@@ -50,3 +51,20 @@ def python_any(values):
 @register.filter(name="format_str")
 def format_str(value):
     return value.replace("_", " ").title()
+
+
+@register.simple_tag(takes_context=True)
+def fragment_version(context, *switches):
+    """
+    What a cached fragment renders besides its own objects: the user's settings, the timezone and day
+    its dates are shown in and the waffle switches it checks.
+    """
+    request = context.get("request")
+    user = getattr(request, "user", None)
+    parts = [
+        user.updated_at.isoformat() if user and user.is_authenticated else "",
+        timezone.get_current_timezone_name(),
+        timezone.localdate(),
+        *[switch_is_active(switch) for switch in switches],
+    ]
+    return ":".join(map(str, parts))
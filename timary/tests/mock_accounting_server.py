@@ -0,0 +1,547 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+# Hosts used by the accounting services, mapped to the provider name used in `User.accounting_org`
+PROVIDER_HOSTS = {
+    "oauth.platform.intuit.com": "quickbooks",
+    "quickbooks.api.intuit.com": "quickbooks",
+    "sandbox-quickbooks.api.intuit.com": "quickbooks",
+    "identity.xero.com": "xero",
+    "api.xero.com": "xero",
+    "accounts.zoho.com": "zoho",
+    "invoice.zoho.com": "zoho",
+    "oauth.accounting.sage.com": "sage",
+    "api.accounting.sage.com": "sage",
+    "api.freshbooks.com": "freshbooks",
+}
+
+
+def new_id():
+    return uuid.uuid4().hex[:12]
+
+
+def token_response():
+    return {
+        "access_token": new_id(),
+        "refresh_token": new_id(),
+        "requested_by_id": new_id(),
+    }
+
+
+# (host, method, path regex, response builder)
+ROUTES = [
+    # QUICKBOOKS
+    (
+        "oauth.platform.intuit.com",
+        "POST",
+        r"^/oauth2/v1/tokens/bearer$",
+        lambda m: token_response(),
+    ),
+    (
+        "*quickbooks.api.intuit.com",
+        "POST",
+        r"^/v3/company/[^/]+/customer$",
+        lambda m: {"Customer": {"Id": new_id()}},
+    ),
+    (
+        "*quickbooks.api.intuit.com",
+        "POST",
+        r"^/v3/company/[^/]+/invoice$",
+        lambda m: {"Invoice": {"Id": new_id()}},
+    ),
+    (
+        "*quickbooks.api.intuit.com",
+        "POST",
+        r"^/v3/company/[^/]+/payment$",
+        lambda m: {"Payment": {"Id": new_id()}},
+    ),
+    (
+        "*quickbooks.api.intuit.com",
+        "GET",
+        r"^/v3/company/[^/]+/query$",
+        lambda m: {
+            "QueryResponse": {
+                "Customer": [
+                    {
+                        "Id": new_id(),
+                        "DisplayName": "Bob Smith",
+                        "PrimaryEmailAddr": {"Address": "bob@example.com"},
+                    }
+                ]
+            }
+        },
+    ),
+    # XERO
+    ("identity.xero.com", "POST", r"^/connect/token$", lambda m: token_response()),
+    ("api.xero.com", "GET", r"^/connections$", lambda m: [{"tenantId": new_id()}]),
+    (
+        "api.xero.com",
+        "POST",
+        r"^/api\.xro/2\.0/Contacts$",
+        lambda m: {"Contacts": [{"ContactID": new_id()}]},
+    ),
+    (
+        "api.xero.com",
+        "GET",
+        r"^/api\.xro/2\.0/Contacts$",
+        lambda m: {
+            "Contacts": [
+                {
+                    "ContactID": new_id(),
+                    "Name": "Bob Smith",
+                    "EmailAddress": "bob@example.com",
+                }
+            ]
+        },
+    ),
+    (
+        "api.xero.com",
+        "POST",
+        r"^/api\.xro/2\.0/Invoices$",
+        lambda m: {"Invoices": [{"InvoiceID": new_id()}]},
+    ),
+    (
+        "api.xero.com",
+        "PUT",
+        r"^/api\.xro/2\.0/Payments$",
+        lambda m: {"Payments": [{"PaymentID": new_id()}]},
+    ),
+    # ZOHO
+    ("accounts.zoho.com", "POST", r"^/oauth/v2/token$", lambda m: token_response()),
+    (
+        "invoice.zoho.com",
+        "GET",
+        r"^/api/v3/organizations$",
+        lambda m: {
+            "message": "success",
+            "organizations": [{"organization_id": new_id()}],
+        },
+    ),
+    (
+        "invoice.zoho.com",
+        "POST",
+        r"^/api/v3/contacts$",
+        lambda m: {"code": 0, "contact": {"contact_id": new_id()}},
+    ),
+    (
+        "invoice.zoho.com",
+        "PUT",
+        r"^/api/v3/contacts/(?P<id>[^/]+)$",
+        lambda m: {"code": 0, "contact": {"contact_id": m["id"]}},
+    ),
+    (
+        "invoice.zoho.com",
+        "DELETE",
+        r"^/api/v3/contacts/[^/]+$",
+        lambda m: {"code": 0, "message": "The contact has been deleted."},
+    ),
+    (
+        "invoice.zoho.com",
+        "GET",
+        r"^/api/v3/contacts$",
+        lambda m: {
+            "code": 0,
+            "contacts": [
+                {
+                    "contact_id": new_id(),
+                    "first_name": "Bob",
+                    "last_name": "Smith",
+                    "email": "bob@example.com",
+                }
+            ],
+        },
+    ),
+    (
+        "invoice.zoho.com",
+        "POST",
+        r"^/api/v3/items$",
+        lambda m: {"code": 0, "item": {"item_id": new_id()}},
+    ),
+    (
+        "invoice.zoho.com",
+        "POST",
+        r"^/api/v3/items/[^/]+/active$",
+        lambda m: {"code": 0, "message": "The item has been marked as active."},
+    ),
+    (
+        "invoice.zoho.com",
+        "POST",
+        r"^/api/v3/invoices$",
+        lambda m: {"code": 0, "invoice": {"invoice_id": new_id()}},
+    ),
+    (
+        "invoice.zoho.com",
+        "POST",
+        r"^/api/v3/customerpayments$",
+        lambda m: {"code": 0, "payment": {"payment_id": new_id()}},
+    ),
+    # SAGE
+    ("oauth.accounting.sage.com", "POST", r"^/token$", lambda m: token_response()),
+    (
+        "api.accounting.sage.com",
+        "GET",
+        r"^/v3\.1/ledger_accounts$",
+        lambda m: {
+            "$items": [
+                {"id": new_id(), "displayed_as": "Sales (4000)"},
+                {"id": new_id(), "displayed_as": "Professional Fees (4020)"},
+            ]
+        },
+    ),
+    (
+        "api.accounting.sage.com",
+        "GET",
+        r"^/v3\.1/bank_accounts$",
+        lambda m: {"$items": [{"id": new_id()}]},
+    ),
+    (
+        "api.accounting.sage.com",
+        "GET",
+        r"^/v3\.1/tax_rates$",
+        lambda m: {"$items": [{"id": new_id()}]},
+    ),
+    (
+        "api.accounting.sage.com",
+        "GET",
+        r"^/v3\.1/contacts$",
+        lambda m: {
+            "$items": [
+                {"id": new_id(), "name": "Bob Smith", "email": "bob@example.com"}
+            ]
+        },
+    ),
+    (
+        "api.accounting.sage.com",
+        "POST",
+        r"^/v3\.1/(contacts|sales_invoices|contact_payments)$",
+        lambda m: {"id": new_id()},
+    ),
+    (
+        "api.accounting.sage.com",
+        "PUT",
+        r"^/v3\.1/contacts/(?P<id>[^/]+)$",
+        lambda m: {"id": m["id"]},
+    ),
+    (
+        "api.accounting.sage.com",
+        "DELETE",
+        r"^/v3\.1/contacts/[^/]+$",
+        lambda m: {},
+    ),
+    # FRESHBOOKS
+    ("api.freshbooks.com", "POST", r"^/auth/oauth/token$", lambda m: token_response()),
+    (
+        "api.freshbooks.com",
+        "GET",
+        r"^/auth/api/v1/users/me$",
+        lambda m: {
+            "response": {
+                "business_memberships": [{"business": {"account_id": new_id()}}]
+            }
+        },
+    ),
+    (
+        "api.freshbooks.com",
+        "POST",
+        r"^/accounting/account/[^/]+/users/clients(/(?P<id>[^/]+))?$",
+        lambda m: {"response": {"result": {"client": {"id": m["id"] or new_id()}}}},
+    ),
+    (
+        "api.freshbooks.com",
+        "GET",
+        r"^/accounting/account/[^/]+/users/clients?$",
+        lambda m: {
+            "response": {
+                "result": {
+                    "clients": [
+                        {
+                            "id": new_id(),
+                            "fname": "Bob",
+                            "lname": "Smith",
+                            "email": "bob@example.com",
+                        }
+                    ]
+                }
+            }
+        },
+    ),
+    (
+        "api.freshbooks.com",
+        "POST",
+        r"^/accounting/account/[^/]+/invoices/invoices$",
+        lambda m: {"response": {"result": {"invoice": {"id": new_id()}}}},
+    ),
+    (
+        "api.freshbooks.com",
+        "POST",
+        r"^/accounting/account/[^/]+/payments/payments$",
+        lambda m: {"response": {"result": {"payment": {"id": new_id()}}}},
+    ),
+]
+
+
+def error_body(provider, status):
+    """Error payloads shaped like each provider's, so AccountingError.log can parse them"""
+    if provider == "quickbooks":
+        return {"Fault": {"Error": [{"code": str(status), "Message": "Mock error"}]}}
+    if provider == "freshbooks":
+        return {"response": {"errors": [{"errno": status, "message": "Mock error"}]}}
+    if provider == "zoho":
+        return {"code": status, "message": "Mock error"}
+    if provider == "sage":
+        return [{"$dataCode": "MockError", "$message": "Mock error"}]
+    return {"Type": "MockError", "Message": "Mock error"}
+
+
+class MockAccountingServer:
+    """
+    In-process stand-in for the accounting providers' APIs.
+
+    Used as a context manager, it starts a local HTTP server and redirects any
+    `requests` call made to a provider's host to it:
+
+        with MockAccountingServer(latency=0.01, rate_limits={"xero": 60}) as server:
+            XeroService.create_invoice(sent_invoice)
+            server.stats()
+
+    - latency: seconds added to each response, either a float or a dict keyed by provider
+    - rate_limits: max requests per `rate_limit_window` seconds, keyed by provider.
+        Limits are tracked per provider + org (tenant id, realm, or token), 429 is returned when exceeded.
+    - error_rate: chance (0-1) that any request returns `error_status`
+    """
+
+    def __init__(
+        self,
+        latency=0,
+        rate_limits=None,
+        rate_limit_window=60,
+        error_rate=0,
+        error_status=500,
+        seed=None,
+    ):
+        self.latency = latency
+        self.rate_limits = rate_limits or {}
+        self.rate_limit_window = rate_limit_window
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._forced_errors = defaultdict(deque)
+        self._rate_windows = defaultdict(deque)
+        self._httpd = None
+        self._thread = None
+        self._real_session_send = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            do_POST = do_PUT = do_DELETE = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        self._patch_requests()
+        return self
+
+    def stop(self):
+        self._unpatch_requests()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _patch_requests(self):
+        self._real_session_send = requests.Session.send
+        real_send = self._real_session_send
+        base_url = urlsplit(self.base_url)
+
+        def _send(session, request, **kwargs):
+            url = urlsplit(request.url)
+            if url.hostname in PROVIDER_HOSTS:
+                request.url = urlunsplit(
+                    (
+                        base_url.scheme,
+                        base_url.netloc,
+                        f"/{url.hostname}{url.path}",
+                        url.query,
+                        "",
+                    )
+                )
+            return real_send(session, request, **kwargs)
+
+        requests.Session.send = _send
+
+    def _unpatch_requests(self):
+        if self._real_session_send:
+            requests.Session.send = self._real_session_send
+            self._real_session_send = None
+
+    def fail_next(self, provider, count=1, status=500, body=None):
+        """Force the next `count` requests to `provider` to fail."""
+        with self.lock:
+            for _ in range(count):
+                self._forced_errors[provider].append((status, body))
+
+    def reset(self):
+        with self.lock:
+            self.requests_log = []
+            self._forced_errors.clear()
+            self._rate_windows.clear()
+            self.max_in_flight = 0
+
+    def stats(self):
+        with self.lock:
+            log = list(self.requests_log)
+        by_provider = defaultdict(int)
+        by_status = defaultdict(int)
+        for entry in log:
+            by_provider[entry["provider"]] += 1
+            by_status[entry["status"]] += 1
+        return {
+            "total": len(log),
+            "by_provider": dict(by_provider),
+            "by_status": dict(by_status),
+            "rate_limited": by_status.get(429, 0),
+            "max_in_flight": self.max_in_flight,
+        }
+
+    def _latency_for(self, provider):
+        if isinstance(self.latency, dict):
+            return self.latency.get(provider, 0)
+        return self.latency
+
+    def _org_key(self, handler, path):
+        """Rate limits are tracked per tenant, the same way the providers do it."""
+        if tenant_id := handler.headers.get("Xero-tenant-id"):
+            return tenant_id
+        if realm := re.match(r"^/v3/company/([^/]+)/", path):
+            return realm.group(1)
+        if account := re.match(r"^/accounting/account/([^/]+)/", path):
+            return account.group(1)
+        if "organization_id=" in handler.path:
+            return handler.path.split("organization_id=")[1].split("&")[0]
+        return handler.headers.get("Authorization", "anonymous")
+
+    def _is_rate_limited(self, provider, org_key):
+        limit = self.rate_limits.get(provider)
+        if not limit:
+            return False
+        now = time.monotonic()
+        window = self._rate_windows[(provider, org_key)]
+        while window and now - window[0] > self.rate_limit_window:
+            window.popleft()
+        if len(window) >= limit:
+            return True
+        window.append(now)
+        return False
+
+    def _route(self, host, method, path):
+        for route_host, route_method, pattern, builder in ROUTES:
+            if route_method != method:
+                continue
+            if route_host.startswith("*"):
+                if not host.endswith(route_host[1:]):
+                    continue
+            elif route_host != host:
+                continue
+            if match := re.match(pattern, path):
+                return builder, match.groupdict()
+        return None, None
+
+    def handle(self, handler):
+        url = urlsplit(handler.path)
+        _, host, path = url.path.split("/", 2)
+        path = f"/{path}"
+        provider = PROVIDER_HOSTS.get(host, "unknown")
+        if length := int(handler.headers.get("Content-Length") or 0):
+            handler.rfile.read(length)
+
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        status = 500
+        try:
+            if latency := self._latency_for(provider):
+                time.sleep(latency)
+
+            with self.lock:
+                forced = (
+                    self._forced_errors[provider].popleft()
+                    if self._forced_errors[provider]
+                    else None
+                )
+                rate_limited = self._is_rate_limited(
+                    provider, self._org_key(handler, path)
+                )
+                random_error = (
+                    self.error_rate and self.random.random() < self.error_rate
+                )
+
+            headers = {}
+            if forced:
+                status, body = forced
+                body = body if body is not None else error_body(provider, status)
+            elif rate_limited:
+                status = 429
+                body = error_body(provider, status)
+                headers["Retry-After"] = str(self.rate_limit_window)
+            elif random_error:
+                status = self.error_status
+                body = error_body(provider, status)
+            else:
+                builder, params = self._route(host, handler.command, path)
+                if builder:
+                    status, body = 200, builder(params)
+                else:
+                    status, body = 404, error_body(provider, 404)
+
+            content = json.dumps(body).encode("utf-8")
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(content)))
+            for header, value in headers.items():
+                handler.send_header(header, value)
+            handler.end_headers()
+            handler.wfile.write(content)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                self.requests_log.append(
+                    {
+                        "provider": provider,
+                        "method": handler.command,
+                        "path": path,
+                        "status": status,
+                    }
+                )
@@ -0,0 +1,233 @@
+import hashlib
+import threading
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from django.test import override_settings
+
+
+class MockS3Server:
+    """
+    In-process stand-in for the slice of S3 the database backups use: put/get/head object,
+    multipart uploads, list objects v2 and batch deletes, all with path style addressing.
+
+        with MockS3Server() as s3:
+            BackupService.backup()
+            s3.keys()
+
+    While running, settings.AWS_S3_ENDPOINT_URL points boto3 at it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.requests_log = []
+        self._uploads = {}
+        self._httpd = None
+        self._settings = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self)
+
+            do_HEAD = do_POST = do_PUT = do_DELETE = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self._settings = override_settings(AWS_S3_ENDPOINT_URL=self.base_url)
+        self._settings.enable()
+        return self
+
+    def stop(self):
+        if self._settings:
+            self._settings.disable()
+            self._settings = None
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def keys(self, prefix=""):
+        return sorted(key for _, key in self.objects if key.startswith(prefix))
+
+    def operations(self):
+        return [operation for operation, _ in self.requests_log]
+
+    def handle(self, handler):
+        url = urlsplit(handler.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        method = handler.command
+
+        if method == "PUT" and "uploadId" in query:
+            operation = self.upload_part(query, body)
+        elif method == "PUT":
+            operation = self.put_object(bucket, key, body, handler.headers)
+        elif method == "POST" and "uploads" in query:
+            operation = self.create_multipart_upload(bucket, key, handler.headers)
+        elif method == "POST" and "uploadId" in query:
+            operation = self.complete_multipart_upload(bucket, key, query)
+        elif method == "POST" and "delete" in query:
+            operation = self.delete_objects(bucket, body)
+        elif method == "DELETE" and "uploadId" in query:
+            self._uploads.pop(query["uploadId"][0], None)
+            operation = ("AbortMultipartUpload", 204, {}, b"")
+        elif method == "GET" and not key:
+            operation = self.list_objects(bucket, query)
+        elif method in ["GET", "HEAD"]:
+            operation = self.get_object(bucket, key, handler.headers)
+        else:
+            operation = ("Unknown", 400, {}, b"")
+
+        name, status, headers, response_body = operation
+        with self.lock:
+            self.requests_log.append((name, status))
+        handler.send_response(status)
+        for header, value in headers.items():
+            handler.send_header(header, value)
+        handler.send_header("Content-Length", str(len(response_body)))
+        handler.end_headers()
+        if method != "HEAD":
+            handler.wfile.write(response_body)
+
+    @staticmethod
+    def metadata(headers):
+        return {
+            header.lower(): value
+            for header, value in headers.items()
+            if header.lower().startswith("x-amz-meta-")
+        }
+
+    def store(self, bucket, key, data, metadata):
+        etag = f'"{hashlib.md5(data, usedforsecurity=False).hexdigest()}"'
+        with self.lock:
+            self.objects[(bucket, key)] = {
+                "data": data,
+                "etag": etag,
+                "metadata": metadata,
+                "last_modified": formatdate(usegmt=True),
+            }
+        return etag
+
+    def put_object(self, bucket, key, body, headers):
+        etag = self.store(bucket, key, body, self.metadata(headers))
+        return "PutObject", 200, {"ETag": etag}, b""
+
+    def create_multipart_upload(self, bucket, key, headers):
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = {"parts": {}, "metadata": self.metadata(headers)}
+        return (
+            "CreateMultipartUpload",
+            200,
+            {},
+            (
+                f"<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>"
+                f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            ).encode(),
+        )
+
+    def upload_part(self, query, body):
+        upload = self._uploads[query["uploadId"][0]]
+        upload["parts"][int(query["partNumber"][0])] = body
+        return (
+            "UploadPart",
+            200,
+            {"ETag": f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'},
+            b"",
+        )
+
+    def complete_multipart_upload(self, bucket, key, query):
+        upload = self._uploads.pop(query["uploadId"][0])
+        data = b"".join(upload["parts"][part] for part in sorted(upload["parts"]))
+        etag = self.store(bucket, key, data, upload["metadata"])
+        return (
+            "CompleteMultipartUpload",
+            200,
+            {},
+            (
+                f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>"
+                f"<ETag>{escape(etag)}</ETag></CompleteMultipartUploadResult>"
+            ).encode(),
+        )
+
+    def list_objects(self, bucket, query):
+        prefix = query.get("prefix", [""])[0]
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>2023-01-01T00:00:00.000Z</LastModified>"
+            f"<ETag>{escape(obj['etag'])}</ETag><Size>{len(obj['data'])}</Size>"
+            "<StorageClass>STANDARD</StorageClass></Contents>"
+            for (obj_bucket, key), obj in sorted(self.objects.items())
+            if obj_bucket == bucket and key.startswith(prefix)
+        )
+        return (
+            "ListObjectsV2",
+            200,
+            {},
+            (
+                f"<ListBucketResult><Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix>"
+                f"<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+            ).encode(),
+        )
+
+    def delete_objects(self, bucket, body):
+        deleted = ""
+        for key in ElementTree.fromstring(body).iter():
+            if key.tag.endswith("Key"):
+                with self.lock:
+                    self.objects.pop((bucket, key.text), None)
+                deleted += f"<Deleted><Key>{escape(key.text)}</Key></Deleted>"
+        return (
+            "DeleteObjects",
+            200,
+            {},
+            f"<DeleteResult>{deleted}</DeleteResult>".encode(),
+        )
+
+    def get_object(self, bucket, key, headers):
+        obj = self.objects.get((bucket, key))
+        if not obj:
+            return (
+                "GetObject",
+                404,
+                {},
+                b"<Error><Code>NoSuchKey</Code><Message>Not found</Message></Error>",
+            )
+        data, status = obj["data"], 200
+        response_headers = {
+            "ETag": obj["etag"],
+            "Last-Modified": obj["last_modified"],
+            "Content-Type": "binary/octet-stream",
+            **obj["metadata"],
+        }
+        if headers.get("Range"):
+            start, _, end = headers["Range"].removeprefix("bytes=").partition("-")
+            start, end = int(start), int(end) if end else len(data) - 1
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            data, status = data[start:][: end - start + 1], 206
+        return "GetObject", status, response_headers, data
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from timary.analytics import AdminAnalytics
+from timary.cache import ADMIN_ANALYTICS, cache_stats, cached
+from timary.models import SentInvoice, User
+from timary.tests.factories import SentInvoiceFactory, UserFactory
+
+
+class TestAdminAnalytics(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        statuses = User.StripeSubscriptionStatus
+        self.user = UserFactory(
+            stripe_subscription_status=statuses.ACTIVE,
+            stripe_subscription_recurring_price=29,
+        )
+        UserFactory(
+            stripe_subscription_status=statuses.ACTIVE,
+            stripe_subscription_recurring_price=24,
+        )
+        UserFactory(
+            stripe_subscription_status=statuses.TRIAL,
+            stripe_subscription_recurring_price=29,
+        )
+        UserFactory(
+            stripe_subscription_status=statuses.INACTIVE,
+            stripe_subscription_recurring_price=29,
+        )
+
+    def test_user_stats_use_real_mrr(self):
+        with self.assertNumQueries(1):
+            users = AdminAnalytics.get_user_stats()
+        self.assertEqual(users, {"total": 3, "active": 2, "trial": 1, "mrr": 53})
+
+    def test_sent_invoice_breakdown_in_one_query(self):
+        for paid_status in [
+            SentInvoice.PaidStatus.PENDING,
+            SentInvoice.PaidStatus.PAID,
+            SentInvoice.PaidStatus.PAID,
+            SentInvoice.PaidStatus.FAILED,
+        ]:
+            SentInvoiceFactory(user=self.user, paid_status=paid_status)
+
+        with self.assertNumQueries(1):
+            sent_invoices = AdminAnalytics.get_sent_invoice_stats()
+        self.assertEqual(
+            sent_invoices,
+            {"total": 4, "pending": 1, "paid": 2, "failed": 1, "cancelled": 0},
+        )
+
+    def test_weekly_series(self):
+        now = timezone.now()
+        SentInvoiceFactory(
+            user=self.user,
+            total_price=100,
+            paid_status=SentInvoice.PaidStatus.PAID,
+            date_paid=now,
+        )
+        SentInvoiceFactory(
+            user=self.user,
+            total_price=50,
+            paid_status=SentInvoice.PaidStatus.PAID,
+            date_paid=now - timedelta(weeks=1),
+        )
+        SentInvoiceFactory(
+            user=self.user,
+            total_price=75,
+            paid_status=SentInvoice.PaidStatus.PENDING,
+            date_paid=now,
+        )
+
+        series = AdminAnalytics.get_weekly_series(weeks=4)
+        self.assertEqual(len(series), 4)
+        self.assertEqual(series[-1]["week"].weekday(), 0)
+        self.assertEqual(series[-1]["signups"], User.objects.count())
+        self.assertEqual(series[-1]["paid_volume"], 100)
+        self.assertEqual(series[-2]["paid_volume"], 50)
+        self.assertEqual(series[0]["paid_volume"], 0)
+
+    def test_stats_are_cached_until_refreshed(self):
+        stats = cached(ADMIN_ANALYTICS, AdminAnalytics.get_stats)
+        self.assertEqual(stats["money_stats"]["recurring"], 53)
+
+        UserFactory(
+            stripe_subscription_status=User.StripeSubscriptionStatus.ACTIVE,
+            stripe_subscription_recurring_price=29,
+        )
+        with self.assertNumQueries(0):
+            stats = cached(ADMIN_ANALYTICS, AdminAnalytics.get_stats)
+        self.assertEqual(stats["money_stats"]["recurring"], 53)
+
+        stats = cached(ADMIN_ANALYTICS, AdminAnalytics.get_stats, refresh=True)
+        self.assertEqual(stats["money_stats"]["recurring"], 82)
+        self.assertEqual(cache_stats()[ADMIN_ANALYTICS], {"hits": 1, "misses": 2})
@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, tag
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from timary.models import SentInvoice
+from timary.tests.factories import (
+    ClientFactory,
+    HoursLineItemFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+from timary.tests.mock_accounting_server import MockAccountingServer
+from timaryproject.database import apply_sqlite_pragmas
+
+# To run: make bench, tweak the sizes with BENCH_CLIENTS=50 BENCH_SENT_INVOICES=200 make bench
+BENCH_CLIENTS = int(os.environ.get("BENCH_CLIENTS", 10))
+BENCH_SENT_INVOICES = int(os.environ.get("BENCH_SENT_INVOICES", 50))
+BENCH_LATENCY = float(os.environ.get("BENCH_LATENCY", 0.005))
+BENCH_WRITERS = int(os.environ.get("BENCH_WRITERS", 4))
+BENCH_QUEUE_WORKERS = int(os.environ.get("BENCH_QUEUE_WORKERS", 4))
+BENCH_SECONDS = float(os.environ.get("BENCH_SECONDS", 3))
+BENCH_REQUESTS = int(os.environ.get("BENCH_REQUESTS", 200))
+
+
+@tag("benchmark")
+class BenchmarkAccountingSync(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory(
+            accounting_org_id="abc123", accounting_refresh_token="abc123"
+        )
+        clients = [
+            ClientFactory(user=self.user, name=f"Client {i}")
+            for i in range(BENCH_CLIENTS)
+        ]
+        for i in range(BENCH_SENT_INVOICES):
+            SentInvoiceFactory(
+                user=self.user,
+                invoice=IntervalInvoiceFactory(
+                    user=self.user, client=clients[i % BENCH_CLIENTS]
+                ),
+                paid_status=SentInvoice.PaidStatus.PAID,
+            )
+        self.client.force_login(self.user)
+
+    def reset_synced_ids(self):
+        self.user.my_clients.update(accounting_customer_id=None)
+        self.user.sent_invoices.update(accounting_invoice_id=None)
+
+    def test_accounting_sync_throughput(self):
+        print(
+            f"\naccounting_sync: {BENCH_CLIENTS} clients, {BENCH_SENT_INVOICES} sent invoices, "
+            f"{BENCH_LATENCY * 1000:.1f}ms provider latency"
+        )
+        for provider in ["quickbooks", "freshbooks", "zoho", "xero", "sage"]:
+            self.user.accounting_org = provider
+            self.user.save()
+            self.reset_synced_ids()
+            with MockAccountingServer(latency=BENCH_LATENCY) as server:
+                start = time.perf_counter()
+                response = self.client.get(reverse("timary:accounting_sync"))
+                elapsed = time.perf_counter() - start
+                stats = server.stats()
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                self.user.sent_invoices.filter(
+                    accounting_invoice_id__isnull=True
+                ).count(),
+                0,
+            )
+            print(
+                f"{provider:>10}: {stats['total']} requests in {elapsed:.2f}s, "
+                f"{stats['total'] / elapsed:.1f} req/s, "
+                f"{BENCH_SENT_INVOICES / elapsed:.1f} invoices/s"
+            )
+
+
+@tag("benchmark")
+class BenchmarkSqliteConcurrency(SimpleTestCase):
+    """
+    Web processes logging hours while django-q workers churn through the ORM broker's queue table,
+    all on one SQLite file, with SQLite's defaults versus settings.SQLITE_PRAGMAS.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def connect(self, path, pragmas):
+        # Same 5s python side timeout django gives sqlite3 connections
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        apply_sqlite_pragmas(db, pragmas)
+        return db
+
+    def run_workload(self, name, pragmas):
+        path = Path(self.tmp_dir.name) / f"{name}.sqlite3"
+        db = self.connect(path, pragmas)
+        db.execute(
+            "CREATE TABLE hours (id INTEGER PRIMARY KEY, invoice_id INTEGER, quantity REAL, date_tracked TEXT)"
+        )
+        db.execute(
+            "CREATE TABLE queue (id INTEGER PRIMARY KEY, payload TEXT, lock TEXT)"
+        )
+        db.commit()
+        db.close()
+
+        counts = {"hours": 0, "tasks": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = time.perf_counter() + BENCH_SECONDS
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def log_hours():
+            db = self.connect(path, pragmas)
+            while time.perf_counter() < stop:
+                try:
+                    db.execute(
+                        "INSERT INTO hours (invoice_id, quantity, date_tracked) VALUES (1, 1.5, datetime('now'))"
+                    )
+                    db.commit()
+                    count("hours")
+                except sqlite3.OperationalError:
+                    db.rollback()
+                    count("locked")
+            db.close()
+
+        def process_tasks():
+            db = self.connect(path, pragmas)
+            while time.perf_counter() < stop:
+                try:
+                    # Enqueue, claim and delete a task like the ORM broker does
+                    db.execute("INSERT INTO queue (payload) VALUES ('task')")
+                    db.commit()
+                    task_id = db.execute(
+                        "SELECT id FROM queue WHERE lock IS NULL LIMIT 1"
+                    ).fetchone()
+                    if task_id:
+                        db.execute(
+                            "UPDATE queue SET lock = datetime('now') WHERE id = ?",
+                            task_id,
+                        )
+                        db.execute("DELETE FROM queue WHERE id = ?", task_id)
+                        db.commit()
+                        count("tasks")
+                except sqlite3.OperationalError:
+                    db.rollback()
+                    count("locked")
+            db.close()
+
+        threads = [threading.Thread(target=log_hours) for _ in range(BENCH_WRITERS)]
+        threads += [
+            threading.Thread(target=process_tasks) for _ in range(BENCH_QUEUE_WORKERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(
+            f"{name:>8}: {counts['hours'] / BENCH_SECONDS:.0f} hours/s, "
+            f"{counts['tasks'] / BENCH_SECONDS:.0f} tasks/s, {counts['locked']} 'database is locked' errors"
+        )
+        return counts
+
+    def test_sqlite_pragmas_concurrent_writes(self):
+        print(
+            f"\nsqlite: {BENCH_WRITERS} hour writers, {BENCH_QUEUE_WORKERS} queue workers, {BENCH_SECONDS}s each"
+        )
+        before = self.run_workload("defaults", {})
+        after = self.run_workload("pragmas", settings.SQLITE_PRAGMAS)
+        self.assertGreater(after["hours"] + after["tasks"], 0)
+        self.assertLessEqual(after["locked"], before["locked"])
+
+
+@tag("benchmark")
+class BenchmarkContextProcessors(TestCase):
+    """
+    Time the context processors add to each render of the main HTMX endpoints and the landing page,
+    with every value computed up front like they used to be (before) versus lazily (after).
+    """
+
+    endpoints = [
+        "timary:dashboard_stats",
+        "timary:calendar",
+        "timary:get_invoices",
+        "timary:get_clients",
+    ]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        for _ in range(20):
+            HoursLineItemFactory(invoice=invoice)
+        self.client.force_login(self.user)
+        self.processors = [
+            import_string(path)
+            for path in settings.TEMPLATES[0]["OPTIONS"]["context_processors"]
+        ]
+
+    def run_processors(self, request, force):
+        context = {}
+        for processor in self.processors:
+            context.update(processor(request))
+        if force:
+            for value in context.values():
+                str(value)
+
+    def processor_time(self, request, force):
+        start = time.perf_counter()
+        for _ in range(BENCH_REQUESTS):
+            # Every request starts with a cold cache, like the first render after a deploy
+            cache.clear()
+            self.run_processors(request, force)
+        return (time.perf_counter() - start) / BENCH_REQUESTS * 1000
+
+    def request_time(self, url, headers):
+        start = time.perf_counter()
+        for _ in range(BENCH_REQUESTS):
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return (time.perf_counter() - start) / BENCH_REQUESTS * 1000
+
+    def test_context_processor_overhead(self):
+        print(f"\ncontext processors: {BENCH_REQUESTS} renders each, per request")
+        requests = [
+            (
+                name,
+                RequestFactory().get(reverse(name), headers={"HX-Request": "true"}),
+                {"HX-Request": "true"},
+                self.user,
+            )
+            for name in self.endpoints
+        ]
+        requests.append(
+            ("landing_page", RequestFactory().get("/"), {}, AnonymousUser())
+        )
+        for name, request, headers, user in requests:
+            request.user = user
+            before = self.processor_time(request, force=True)
+            after = self.processor_time(request, force=False)
+            total = self.request_time(request.path, headers)
+            print(
+                f"{name:>24}: {before:.3f}ms before, {after:.3f}ms after, {total:.2f}ms whole request"
+            )
+
+            cache.clear()
+            with self.assertNumQueries(0):
+                self.run_processors(request, force=False)
@@ -0,0 +1,264 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+from waffle.testutils import override_switch
+
+from timary.cache import (
+    HOURS_CALENDAR,
+    HOURS_TRACKED,
+    PENDING_SENT_INVOICES,
+    cache_stats,
+    cached_for_user,
+    invalidate_user_cache,
+)
+from timary.hours_manager import HoursManager
+from timary.models import HoursLineItem, Invoice, SentInvoice, Timer
+from timary.tests.factories import (
+    ClientFactory,
+    HoursLineItemFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+from timary.utils import Calendar, get_users_localtime
+from timary.views.main import get_pending_sent_invoices
+
+
+class TestCache(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.user = UserFactory()
+        self.invoice = IntervalInvoiceFactory(user=self.user, rate=50)
+
+    def test_cached_for_user_counts_hits_and_misses(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cached_for_user(self.user, HOURS_TRACKED, compute), 1)
+        self.assertEqual(cached_for_user(self.user, HOURS_TRACKED, compute), 1)
+        self.assertEqual(cache_stats()[HOURS_TRACKED], {"hits": 1, "misses": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(self.user.id)
+        self.assertEqual(cached_for_user(self.user, HOURS_TRACKED, compute), 2)
+
+    def test_version_is_bumped_on_commit(self):
+        cached_for_user(self.user, HOURS_TRACKED, lambda: "old")
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_user_cache(self.user.id)
+            # Until the write commits, reads still get the committed rows' entry
+            self.assertEqual(
+                cached_for_user(self.user, HOURS_TRACKED, lambda: "new"), "old"
+            )
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            cached_for_user(self.user, HOURS_TRACKED, lambda: "new"), "new"
+        )
+
+    def test_keys_are_per_user(self):
+        other_user = UserFactory()
+        cached_for_user(self.user, HOURS_TRACKED, lambda: "mine")
+        self.assertEqual(
+            cached_for_user(other_user, HOURS_TRACKED, lambda: "theirs"), "theirs"
+        )
+
+    def test_evicted_version_does_not_serve_old_entries(self):
+        cached_for_user(self.user, HOURS_TRACKED, lambda: "old")
+        cache.delete(f"user_cache_version:{self.user.id}")
+        self.assertEqual(
+            cached_for_user(self.user, HOURS_TRACKED, lambda: "new"), "new"
+        )
+
+    def test_hours_tracked_refreshes_when_hours_logged(self):
+        HoursLineItemFactory(invoice=self.invoice, quantity=1)
+        hours_manager = HoursManager(self.user)
+        self.assertEqual(
+            hours_manager.get_hours_tracked()["current_month"]["total_hours"], 1
+        )
+
+        with self.assertNumQueries(0):
+            hours_manager.get_hours_tracked()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hour = HoursLineItemFactory(invoice=self.invoice, quantity=2)
+        self.assertEqual(
+            hours_manager.get_hours_tracked()["current_month"]["total_hours"], 3
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hour.delete()
+        self.assertEqual(
+            hours_manager.get_hours_tracked()["current_month"]["total_hours"], 1
+        )
+
+    def test_pending_sent_invoices_refresh_when_paid(self):
+        sent_invoice = SentInvoiceFactory(
+            invoice=self.invoice,
+            user=self.user,
+            total_price=100,
+            paid_status=SentInvoice.PaidStatus.PENDING,
+        )
+        self.assertEqual(
+            get_pending_sent_invoices(self.user)["pending_invoices"]["balance"], 100
+        )
+        with self.assertNumQueries(0):
+            get_pending_sent_invoices(self.user)
+
+        sent_invoice.paid_status = SentInvoice.PaidStatus.PAID
+        with self.captureOnCommitCallbacks(execute=True):
+            sent_invoice.save()
+        self.assertEqual(
+            get_pending_sent_invoices(self.user)["pending_invoices"]["balance"], 0
+        )
+        self.assertEqual(cache_stats()[PENDING_SENT_INVOICES], {"hits": 1, "misses": 2})
+
+    def test_calendar_is_cached_until_hours_change(self):
+        HoursLineItemFactory(invoice=self.invoice, quantity=1)
+        calendar = Calendar(self.user, get_users_localtime(self.user))
+        html = calendar.formatmonth()
+        with self.assertNumQueries(0):
+            self.assertEqual(calendar.formatmonth(), html)
+
+        self.invoice.title = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice.save()
+        self.assertIn("Renamed", calendar.formatmonth())
+        self.assertEqual(cache_stats()[HOURS_CALENDAR], {"hits": 1, "misses": 2})
+
+    def test_dashboard_stats_view(self):
+        self.client.force_login(self.user)
+        HoursLineItemFactory(invoice=self.invoice, quantity=1)
+        self.client.get(reverse("timary:dashboard_stats"))
+        self.client.get(reverse("timary:dashboard_stats"))
+        self.assertEqual(cache_stats()[HOURS_TRACKED]["hits"], 1)
+
+
+class TestConditionalPartials(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.user = UserFactory()
+        self.invoice = IntervalInvoiceFactory(user=self.user)
+        self.client.force_login(self.user)
+
+    def get(self, url, response=None):
+        headers = {"HTTP_IF_NONE_MATCH": response["ETag"]} if response else {}
+        return self.client.get(url, **headers)
+
+    def test_unchanged_partials_are_not_modified(self):
+        for url in [
+            reverse("timary:dashboard_stats"),
+            f"{reverse('timary:hours_for_month')}?month=Jan. 1, 2023",
+            reverse("timary:calendar"),
+            reverse("timary:get_invoices"),
+            reverse(
+                "timary:sent_invoices_list", kwargs={"invoice_id": self.invoice.id}
+            ),
+            reverse("timary:get_clients"),
+        ]:
+            with self.subTest(url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+
+                # Only the session, user and data version are read
+                with self.assertNumQueries(2):
+                    self.assertEqual(self.get(url, response).status_code, 304)
+
+    def test_writes_change_etag(self):
+        url = reverse("timary:get_clients")
+        writes = [
+            lambda: HoursLineItemFactory(invoice=self.invoice),
+            lambda: self.invoice.save(),
+            lambda: SentInvoiceFactory(invoice=self.invoice, user=self.user),
+            lambda: ClientFactory(user=self.user),
+            lambda: self.user.save(),
+        ]
+        for write in writes:
+            response = self.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            self.assertEqual(self.get(url, response).status_code, 200)
+
+    def test_other_users_writes_keep_etag(self):
+        url = reverse("timary:get_invoices")
+        response = self.get(url)
+        HoursLineItemFactory()
+        ClientFactory()
+        self.assertEqual(self.get(url, response).status_code, 304)
+
+    def test_running_timer_skips_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Timer.start(self.user.id)
+        response = self.get(reverse("timary:dashboard_stats"))
+        self.assertFalse(response.has_header("ETag"))
+
+
+class TestFragmentCache(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.user = UserFactory()
+        self.invoice = IntervalInvoiceFactory(user=self.user, rate=50)
+        self.hour = HoursLineItemFactory(invoice=self.invoice, quantity=1)
+
+    def render_hour(self):
+        hour = HoursLineItem.objects.select_related("invoice").get(id=self.hour.id)
+        return render_to_string("partials/_hour.html", {"hour": hour})
+
+    def render_card(self):
+        invoice = Invoice.objects.get(id=self.invoice.id)
+        return render_to_string("invoices/interval/_card.html", {"invoice": invoice})
+
+    def test_hour_row_cached_until_hour_saved(self):
+        self.assertIn("1.00", self.render_hour())
+        HoursLineItem.objects.filter(id=self.hour.id).update(quantity=3)
+        with self.assertNumQueries(1):
+            self.assertIn("1.00", self.render_hour())
+
+        self.hour.refresh_from_db()
+        self.hour.save()
+        self.assertIn("3.00", self.render_hour())
+
+    def test_hour_row_changes_with_invoice(self):
+        self.assertIn("edit-hours", self.render_hour())
+        self.invoice.is_paused = True
+        self.invoice.save()
+        content = self.render_hour()
+        self.assertNotIn("edit-hours", content)
+        self.assertIn("Unpause invoice to edit.", content)
+
+    def test_hour_row_changes_when_sent(self):
+        self.assertIn("edit-hours", self.render_hour())
+        self.hour.sent_invoice_id = SentInvoiceFactory(invoice=self.invoice).id
+        self.hour.save(update_fields=["sent_invoice_id"])
+        self.assertNotIn("edit-hours", self.render_hour())
+
+    def test_invoice_card_cached_until_invoice_saved(self):
+        self.assertIn(self.invoice.title, self.render_card())
+        old_title = self.invoice.title
+        Invoice.objects.filter(id=self.invoice.id).update(title="Renamed")
+        self.assertIn(old_title, self.render_card())
+
+        self.invoice.refresh_from_db()
+        self.invoice.save()
+        self.assertIn("Renamed", self.render_card())
+
+    def test_invoice_card_changes_with_pending_invoices(self):
+        self.assertNotIn("Invoices pending", self.render_card())
+        SentInvoiceFactory(
+            invoice=self.invoice, paid_status=SentInvoice.PaidStatus.PENDING
+        )
+        self.assertIn("Invoices pending: 1", self.render_card())
+
+    def test_invoice_card_changes_with_switch(self):
+        with override_switch("can_view_expenses", active=False):
+            self.assertNotIn("Manage expenses", self.render_card())
+        with override_switch("can_view_expenses", active=True):
+            self.assertIn("Manage expenses", self.render_card())
@@ -12,6 +12,7 @@ from timary.forms import (
     CreateWeeklyForm,
     HoursLineItemForm,
     InvoiceBrandingSettingsForm,
+    InvoiceChoices,
     LoginForm,
     PayInvoiceForm,
     RegisterForm,
@@ -21,6 +22,7 @@ from timary.forms import (
 )
 from timary.tests.factories import (
     ClientFactory,
+    HoursLineItemFactory,
     IntervalInvoiceFactory,
     MilestoneInvoiceFactory,
     SentInvoiceFactory,
@@ -602,6 +604,31 @@ class TestHoursLineItem(TestCase):
         )
         self.assertQuerysetEqual(list(form.fields["invoice"].queryset), [inv_1, inv_2])
 
+    def test_hours_forms_share_invoice_choices(self):
+        user = UserFactory()
+        invoice = IntervalInvoiceFactory(user=user)
+        sent_invoice = SentInvoiceFactory(invoice=invoice, user=user)
+        hours = [
+            HoursLineItemFactory(invoice=invoice, sent_invoice_id=sent_invoice.id)
+            for _ in range(5)
+        ]
+        invoice_choices = InvoiceChoices(user)
+        with self.assertNumQueries(2):
+            # The invoice choices, and fetching their subclass
+            forms = [
+                HoursLineItemForm(
+                    instance=hour, user=user, invoice_choices=invoice_choices
+                )
+                for hour in hours
+            ]
+            for form in forms:
+                form.as_p()
+
+        for form in forms:
+            self.assertEqual(form.fields["invoice"].widget.attrs["qs_count"], 1)
+            self.assertEqual(form.fields["invoice"].initial, invoice)
+            self.assertIn(str(invoice.id), form.as_p())
+
     def test_hours_all_empty_fields(self):
         form = HoursLineItemForm(data={}, user=self.user)
         self.assertEqual(
@@ -0,0 +1,258 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import Workbook
+
+from timary.hours_import import HoursImporter
+from timary.models import HoursImport, HoursLineItem, LineItem, TaskRun
+from timary.tasks import import_hours
+from timary.tests.factories import (
+    HoursLineItemFactory,
+    IntervalInvoiceFactory,
+    UserFactory,
+)
+from timary.utils import get_users_localtime
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.InMemoryStorage",
+    HOURS_IMPORT_CHUNK_SIZE=2,
+)
+class TestHoursImport(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        self.invoice = IntervalInvoiceFactory(user=self.user, title="Website")
+        self.other_invoice = IntervalInvoiceFactory(user=self.user, title="App")
+        self.today = get_users_localtime(self.user).date()
+
+    def create_import(self, content, name="hours.csv"):
+        return HoursImport.objects.create(
+            user=self.user, file=ContentFile(content, name=name)
+        )
+
+    def csv_import(self, *rows, header="date,hours,invoice,description"):
+        return self.create_import("\n".join([header, *rows]).encode())
+
+    def test_import_csv(self):
+        hours_import = self.csv_import(
+            f"{self.today},1.5,Website,Homepage",
+            f"{self.today:%m/%d/%Y},2,app,",
+            f"{self.today - timedelta(days=1)},1:30,Website,Fixes",
+        )
+        import_hours(hours_import.id)
+
+        hours_import.refresh_from_db()
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.total_rows, 3)
+        self.assertEqual(hours_import.processed_rows, 3)
+        self.assertEqual(hours_import.imported_rows, 3)
+        self.assertEqual(hours_import.progress, 100)
+        self.assertIsNotNone(hours_import.finished_at)
+        self.assertEqual(
+            sorted(
+                HoursLineItem.objects.filter(invoice=self.invoice).values_list(
+                    "quantity", "description"
+                )
+            ),
+            [(Decimal("1.50"), "Fixes"), (Decimal("1.50"), "Homepage")],
+        )
+        self.assertEqual(
+            HoursLineItem.objects.get(invoice=self.other_invoice).date_tracked.date(),
+            self.today,
+        )
+        task_run = TaskRun.objects.get(task="timary.tasks.import_hours")
+        self.assertEqual(task_run.rows_processed, 3)
+
+    def test_imported_hours_are_polymorphic(self):
+        # bulk_create_hours sets the polymorphic ctype itself, the parent rows must still load as hours
+        hours_import = self.csv_import(f"{self.today},1.5,Website,Homepage")
+        import_hours(hours_import.id)
+
+        line_item = LineItem.objects.get(invoice=self.invoice)
+        self.assertEqual(
+            line_item.polymorphic_ctype,
+            ContentType.objects.get_for_model(HoursLineItem),
+        )
+        self.assertIsInstance(line_item, HoursLineItem)
+        self.assertEqual(line_item.description, "Homepage")
+
+    def test_import_xlsx(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Date", "Duration", "Invoice ID", "Notes"])
+        sheet.append([self.today, 3, self.invoice.email_id, "Design"])
+        sheet.append([self.today, 2.25, self.other_invoice.email_id, None])
+        sheet.append([None, None, None, None])
+        file = io.BytesIO()
+        workbook.save(file)
+
+        hours_import = self.create_import(file.getvalue(), name="hours.xlsx")
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.imported_rows, 2)
+        self.assertEqual(hours_import.error_count, 0)
+        self.assertEqual(
+            HoursLineItem.objects.get(invoice=self.invoice).quantity, Decimal("3")
+        )
+        self.assertEqual(
+            HoursLineItem.objects.get(invoice=self.other_invoice).quantity,
+            Decimal("2.25"),
+        )
+
+    def test_row_errors(self):
+        HoursLineItemFactory(
+            invoice=self.invoice,
+            quantity=20,
+            date_tracked=get_users_localtime(self.user),
+        )
+        hours_import = self.csv_import(
+            f"{self.today},1,Website,Valid",
+            f"{self.today},30,Website,Too many",
+            f"{self.today + timedelta(days=1)},1,Website,Future",
+            f"{self.today - timedelta(weeks=10)},1,Website,Before last invoice",
+            f"{self.today},1,Unknown,Missing invoice",
+            "yesterday,1,Website,Bad date",
+            f"{self.today},4,App,Over 24 hours for the day",
+        )
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.imported_rows, 1)
+        self.assertEqual(hours_import.error_count, 6)
+        self.assertEqual(
+            hours_import.errors,
+            [
+                {
+                    "row": 3,
+                    "errors": [
+                        "Invalid hours logged. Please log between 0 and 24 hours"
+                    ],
+                },
+                {"row": 4, "errors": ["Cannot set date into the future!"]},
+                {
+                    "row": 5,
+                    "errors": [
+                        "Cannot set date since your last invoice's cutoff date."
+                    ],
+                },
+                {"row": 6, "errors": ["No invoice found for 'Unknown'"]},
+                {"row": 7, "errors": ["Invalid date 'yesterday'"]},
+                {
+                    "row": 8,
+                    "errors": [
+                        f"Too many hours logged for {self.today.strftime('%b %-d, %Y')}"
+                    ],
+                },
+            ],
+        )
+        self.assertEqual(HoursLineItem.objects.count(), 2)
+
+    def test_duplicate_invoice_titles_need_invoice_id(self):
+        IntervalInvoiceFactory(user=self.user, title="Website")
+        hours_import = self.csv_import(f"{self.today},1,Website,")
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.imported_rows, 0)
+        self.assertEqual(
+            hours_import.errors,
+            [{"row": 2, "errors": ["No invoice found for 'Website'"]}],
+        )
+
+    def test_only_users_invoices_are_matched(self):
+        other_invoice = IntervalInvoiceFactory(title="Website")
+        hours_import = self.csv_import(
+            f"{self.today},1,{other_invoice.email_id}", header="date,hours,invoice_id"
+        )
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.imported_rows, 0)
+        self.assertFalse(HoursLineItem.objects.filter(invoice=other_invoice).exists())
+
+    def test_missing_columns_fails_import(self):
+        hours_import = self.csv_import(f"{self.today},1", header="date,amount")
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.status, HoursImport.Status.FAILED)
+        self.assertEqual(
+            hours_import.errors,
+            [{"row": 1, "errors": ["Missing columns: hours, invoice or invoice_id"]}],
+        )
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+
+    def test_unreadable_xlsx_fails_import(self):
+        hours_import = self.create_import(b"not a workbook", name="hours.xlsx")
+        HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.status, HoursImport.Status.FAILED)
+        self.assertEqual(hours_import.error_count, 1)
+
+    def test_errors_stored_are_capped(self):
+        with self.settings(HOURS_IMPORT_MAX_ERRORS=2):
+            hours_import = self.csv_import(*[f"{self.today},0,Website,"] * 5)
+            HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.error_count, 5)
+        self.assertEqual([error["row"] for error in hours_import.errors], [2, 3])
+
+    def test_importing_twice_does_not_duplicate_hours(self):
+        hours_import = self.csv_import(
+            f"{self.today},1,Website,",
+            f"{self.today},2,App,",
+            f"{self.today - timedelta(days=1)},3,Website,",
+        )
+        import_hours(hours_import.id)
+        import_hours(hours_import.id)
+
+        hours_import.refresh_from_db()
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.processed_rows, 3)
+        self.assertEqual(hours_import.imported_rows, 3)
+        self.assertEqual(HoursLineItem.objects.count(), 3)
+
+    def test_killed_import_resumes_after_committed_rows(self):
+        hours_import = self.csv_import(
+            f"{self.today},1,Website,",
+            f"{self.today},2,App,",
+            f"{self.today - timedelta(days=1)},3,Website,",
+        )
+        import_chunk = HoursImporter.import_chunk
+
+        def killed_after_first_chunk(importer, chunk):
+            if importer.hours_import.processed_rows:
+                raise KeyboardInterrupt("Worker timed out")
+            import_chunk(importer, chunk)
+
+        with patch.object(HoursImporter, "import_chunk", killed_after_first_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                HoursImporter(hours_import).run()
+
+        # The worker is still considered alive until the import goes stale
+        self.assertEqual(HoursImporter(hours_import).run().processed_rows, 2)
+        HoursImport.objects.filter(id=hours_import.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        hours_import = HoursImporter(hours_import).run()
+
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.processed_rows, 3)
+        self.assertEqual(hours_import.imported_rows, 3)
+        self.assertEqual(
+            sorted(HoursLineItem.objects.values_list("quantity", flat=True)),
+            [1, 2, 3],
+        )
+
+    def test_progress(self):
+        hours_import = HoursImport(total_rows=200, processed_rows=50)
+        self.assertEqual(hours_import.progress, 25)
+        hours_import.total_rows = None
+        self.assertEqual(hours_import.progress, 0)
+        hours_import.status = HoursImport.Status.FAILED
+        self.assertEqual(hours_import.progress, 100)
@@ -327,7 +327,9 @@ class TestInvoice(TestCase):
 
     @patch("timary.models.timezone")
     def test_get_last_six_months(self, date_mock):
-        date_mock.now.return_value = timezone.datetime(2023, 2, 5)
+        date_mock.now.return_value = timezone.datetime(
+            2023, 2, 5, tzinfo=zoneinfo.ZoneInfo("America/New_York")
+        )
         tz = zoneinfo.ZoneInfo("America/New_York")
         invoice = IntervalInvoiceFactory()
         hours1 = HoursLineItemFactory(
@@ -375,7 +377,9 @@ class TestInvoice(TestCase):
 
     @patch("timary.models.timezone")
     def test_get_last_six_months_including_weekly(self, date_mock):
-        date_mock.now.return_value = timezone.datetime(2023, 2, 5)
+        date_mock.now.return_value = timezone.datetime(
+            2023, 2, 5, tzinfo=zoneinfo.ZoneInfo("America/New_York")
+        )
         invoice = WeeklyInvoiceFactory(rate=1000)
         tz = zoneinfo.ZoneInfo("America/New_York")
         SentInvoiceFactory(
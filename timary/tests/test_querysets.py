@@ -4,10 +4,12 @@ from unittest.mock import patch
 from django.test import TestCase
 from django.utils import timezone
 
-from timary.querysets import HourStats
+from timary.models import HoursLineItem, Invoice, MonthlyRevenue, SentInvoice
+from timary.querysets import HourStats, RevenueSeries, decode_hours_cursor
 from timary.tests.factories import (
     HoursLineItemFactory,
     IntervalInvoiceFactory,
+    MilestoneInvoiceFactory,
     SentInvoiceFactory,
     UserFactory,
     WeeklyInvoiceFactory,
@@ -151,3 +153,199 @@ class TestHourStats(TestCase):
         last_month_stats = hour_stats.get_last_month_stats()
         self.assertEqual(float(last_month_stats["total_hours"]), 5)
         self.assertEqual(float(last_month_stats["total_amount"]), 400)
+
+
+class TestHoursQuerySetPage(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        now = timezone.now()
+        self.hours = [
+            HoursLineItemFactory(
+                invoice=invoice, date_tracked=now - timezone.timedelta(hours=i // 2)
+            )
+            for i in range(7)
+        ]
+        # Hours from another user aren't paged
+        HoursLineItemFactory()
+
+    def test_pages_cover_every_hour_once(self):
+        hours = HoursLineItem.all_hours.filter(invoice__user=self.user)
+        paged, cursor = [], None
+        with self.assertNumQueries(4):
+            while True:
+                page, cursor = hours.page(cursor, size=2)
+                paged.extend(page)
+                if not cursor:
+                    break
+
+        # Hours tracked at the same time are ordered by id so none are skipped or repeated
+        expected = sorted(
+            self.hours, key=lambda hour: (hour.date_tracked, hour.id.hex), reverse=True
+        )
+        self.assertEqual([hour.id for hour in paged], [hour.id for hour in expected])
+
+    def test_last_page_has_no_cursor(self):
+        page, cursor = HoursLineItem.all_hours.filter(invoice__user=self.user).page(
+            size=7
+        )
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(cursor)
+
+    def test_cursor_is_last_hour(self):
+        page, cursor = HoursLineItem.all_hours.filter(invoice__user=self.user).page(
+            size=3
+        )
+        self.assertEqual(
+            decode_hours_cursor(cursor), (page[-1].date_tracked, page[-1].id)
+        )
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            HoursLineItem.all_hours.page("abc")
+
+
+class TestInvoiceQuerySet(TestCase):
+    def test_card_stats_match_model_methods(self):
+        user = UserFactory()
+        interval = IntervalInvoiceFactory(user=user, rate=50, total_budget=1000)
+        HoursLineItemFactory(invoice=interval, quantity=2)
+        HoursLineItemFactory(invoice=interval, quantity=4)
+        weekly = WeeklyInvoiceFactory(user=user, rate=1200, total_budget=5000)
+        SentInvoiceFactory(
+            invoice=weekly,
+            user=user,
+            total_price=1200,
+            paid_status=SentInvoice.PaidStatus.PAID,
+        )
+        SentInvoiceFactory(
+            invoice=weekly, user=user, paid_status=SentInvoice.PaidStatus.PENDING
+        )
+        SentInvoiceFactory(
+            invoice=weekly, user=user, paid_status=SentInvoice.PaidStatus.NOT_STARTED
+        )
+        milestone = MilestoneInvoiceFactory(user=user, total_budget=None)
+
+        annotated = {
+            invoice.id: invoice
+            for invoice in Invoice.objects.filter(user=user).with_card_stats()
+        }
+        for invoice in [interval, weekly, milestone]:
+            with self.subTest(invoice.invoice_type()):
+                card = annotated[invoice.id]
+                self.assertEqual(card.budget_percentage(), invoice.budget_percentage())
+                self.assertEqual(card.invoices_pending(), invoice.invoices_pending())
+
+        self.assertEqual(annotated[interval.id].budget_percentage(), 30)
+        self.assertEqual(annotated[weekly.id].invoices_pending(), 2)
+
+    def test_card_stats_dont_query_per_invoice(self):
+        user = UserFactory()
+        for _ in range(3):
+            invoice = IntervalInvoiceFactory(user=user, total_budget=1000)
+            HoursLineItemFactory(invoice=invoice)
+            SentInvoiceFactory(invoice=invoice, user=user)
+
+        # Invoices + the interval child table
+        with self.assertNumQueries(2):
+            for invoice in Invoice.objects.filter(user=user).with_card_stats():
+                invoice.budget_percentage()
+                invoice.invoices_pending()
+                invoice.client.name
+
+
+class TestRevenueSeries(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        self.invoice = IntervalInvoiceFactory(user=self.user)
+        self.today = timezone.datetime(2023, 2, 5).date()
+
+    def sent(self, invoice, day, total, **kwargs):
+        return SentInvoiceFactory(
+            invoice=invoice,
+            user=self.user,
+            total_price=total,
+            date_sent=timezone.datetime(
+                *day, tzinfo=zoneinfo.ZoneInfo(self.user.timezone)
+            ),
+            **kwargs,
+        )
+
+    def test_rollup_buckets_by_owners_timezone(self):
+        # 8pm Jan 31st in New York is already February in UTC
+        self.sent(self.invoice, (2023, 1, 31, 20), 50)
+        utc_user = UserFactory(timezone="UTC")
+        utc_invoice = IntervalInvoiceFactory(user=utc_user)
+        SentInvoiceFactory(
+            invoice=utc_invoice,
+            user=utc_user,
+            total_price=30,
+            date_sent=timezone.datetime(2023, 2, 1, 1, tzinfo=zoneinfo.ZoneInfo("UTC")),
+        )
+
+        self.assertEqual(
+            MonthlyRevenue.objects.get(invoice=self.invoice).month,
+            timezone.datetime(2023, 1, 1).date(),
+        )
+        self.assertEqual(
+            MonthlyRevenue.objects.get(invoice=utc_invoice).month,
+            timezone.datetime(2023, 2, 1).date(),
+        )
+
+    def test_rollup_tracks_sent_invoice_changes(self):
+        first = self.sent(self.invoice, (2023, 2, 1), 50)
+        self.sent(self.invoice, (2023, 2, 3), 25)
+        self.sent(self.invoice, (2022, 12, 10), 100)
+        series = RevenueSeries([self.invoice], self.today)
+        self.assertEqual(series.labels, ["Sep", "Oct", "Nov", "Dec", "Jan", "Feb"])
+        self.assertEqual(series.totals[self.invoice.id], [0, 0, 0, 100, 0, 75])
+
+        first.paid_status = SentInvoice.PaidStatus.CANCELLED
+        first.save()
+        self.assertEqual(
+            MonthlyRevenue.objects.get(invoice=self.invoice, month="2023-02-01").total,
+            25,
+        )
+
+        first.paid_status = SentInvoice.PaidStatus.PAID
+        first.date_sent = timezone.datetime(
+            2023, 1, 4, tzinfo=zoneinfo.ZoneInfo(self.user.timezone)
+        )
+        first.save()
+        series = RevenueSeries([self.invoice], self.today)
+        self.assertEqual(series.totals[self.invoice.id], [0, 0, 0, 100, 50, 25])
+
+        first.delete()
+        self.assertFalse(
+            MonthlyRevenue.objects.filter(
+                invoice=self.invoice, month="2023-01-01"
+            ).exists()
+        )
+
+    def test_unrelated_saves_dont_touch_rollup(self):
+        sent_invoice = self.sent(self.invoice, (2023, 2, 1), 50)
+        sent_invoice = SentInvoice.objects.get(id=sent_invoice.id)
+        sent_invoice.accounting_invoice_id = "abc123"
+        with self.assertNumQueries(1):
+            sent_invoice.save()
+
+    def test_many_invoices_in_one_query(self):
+        invoices = [self.invoice] + [
+            IntervalInvoiceFactory(user=self.user) for _ in range(4)
+        ]
+        for i, invoice in enumerate(invoices):
+            self.sent(invoice, (2023, 1, 10), 10 * (i + 1))
+
+        series = RevenueSeries(invoices, self.today)
+        with self.assertNumQueries(1):
+            for i, invoice in enumerate(invoices):
+                self.assertEqual(series.for_invoice(invoice)[1][-2], 10 * (i + 1))
+
+    def test_invoice_last_six_months_is_memoized(self):
+        self.sent(self.invoice, (2023, 2, 1), 50)
+        invoice = Invoice.objects.get(id=self.invoice.id)
+        invoice.get_last_six_months()
+        with self.assertNumQueries(0):
+            invoice.get_last_six_months()
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from timary.services.backup_service import BackupService
+from timary.tasks import backup_db_file
+from timary.tests.mock_s3_server import MockS3Server
+
+POSTGRES_DB = {
+    "ENGINE": "django.db.backends.postgresql",
+    "NAME": "timary",
+    "USER": "timary",
+    "PASSWORD": "secret",
+    "HOST": "db.internal",
+    "PORT": 5432,
+}
+
+
+class TestBackupService(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.db_path = Path(tmp_dir.name) / "db.sqlite3"
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE hours (id INTEGER PRIMARY KEY, quantity REAL)")
+        db.execute("INSERT INTO hours (quantity) VALUES (1.5)")
+        db.commit()
+        db.close()
+
+        database = patch.dict(
+            settings.DATABASES,
+            {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": self.db_path}},
+        )
+        database.start()
+        self.addCleanup(database.stop)
+        self.s3 = MockS3Server().start()
+        self.addCleanup(self.s3.stop)
+
+    def add_hours(self, quantity, data=None):
+        db = sqlite3.connect(self.db_path)
+        if data:
+            db.execute("CREATE TABLE IF NOT EXISTS blobs (data BLOB)")
+            db.execute("INSERT INTO blobs (data) VALUES (?)", (data,))
+        db.execute("INSERT INTO hours (quantity) VALUES (?)", (quantity,))
+        db.commit()
+        db.close()
+
+    def hours(self):
+        db = sqlite3.connect(self.db_path)
+        hours = [row[0] for row in db.execute("SELECT quantity FROM hours ORDER BY id")]
+        db.close()
+        return hours
+
+    def test_backup_is_a_compressed_snapshot(self):
+        key = BackupService.backup()
+
+        self.assertRegex(key, r"^db_backups/backup-\d{8}T\d{6}Z\.sqlite3\.gz$")
+        self.assertEqual(self.s3.keys(), [key])
+        self.assertEqual(self.s3.operations().count("PutObject"), 1)
+
+    def test_unchanged_database_is_not_uploaded_again(self):
+        with patch("timary.services.backup_service.timezone") as timezone_mock:
+            timezone_mock.now.return_value.strftime.side_effect = ["1", "2", "3"]
+            first = BackupService.backup()
+            self.assertIsNone(BackupService.backup())
+            self.add_hours(2)
+            second = BackupService.backup()
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.s3.keys(), [first, second])
+
+    @override_settings(DB_BACKUP_MULTIPART_CHUNKSIZE=5 * 1024 * 1024)
+    def test_large_backups_use_multipart_upload(self):
+        self.add_hours(2, data=os.urandom(6 * 1024 * 1024))
+        key = BackupService.backup()
+
+        operations = self.s3.operations()
+        self.assertIn("CreateMultipartUpload", operations)
+        self.assertEqual(operations.count("UploadPart"), 2)
+        self.assertIn("CompleteMultipartUpload", operations)
+
+        self.add_hours(3)
+        BackupService.restore(key)
+        self.assertEqual(self.hours(), [1.5, 2])
+
+    @override_settings(DB_BACKUP_RETENTION=2)
+    def test_old_backups_are_rotated(self):
+        with patch("timary.services.backup_service.timezone") as timezone_mock:
+            timezone_mock.now.return_value.strftime.side_effect = [
+                f"2023010{day}T000000Z" for day in range(1, 5)
+            ]
+            for quantity in range(4):
+                self.add_hours(quantity)
+                BackupService.backup()
+
+        self.assertEqual(
+            self.s3.keys(),
+            [
+                "db_backups/backup-20230103T000000Z.sqlite3.gz",
+                "db_backups/backup-20230104T000000Z.sqlite3.gz",
+            ],
+        )
+
+    def test_restore_command(self):
+        BackupService.backup()
+        self.add_hours(2)
+
+        call_command("restore_db", "--noinput")
+        self.assertEqual(self.hours(), [1.5])
+
+    def test_backup_task(self):
+        self.assertIn("db_backups/backup-", backup_db_file())
+        self.assertEqual(
+            backup_db_file(),
+            "Backup skipped, database unchanged since the latest backup",
+        )
+
+    @patch("timary.services.backup_service.subprocess.run")
+    def test_postgres_backup_uses_pg_dump(self, run_mock):
+        def pg_dump(command, **kwargs):
+            Path(command[3].removeprefix("--file=")).write_bytes(b"PGDMP")
+
+        run_mock.side_effect = pg_dump
+        with patch.dict(settings.DATABASES, {"default": POSTGRES_DB}):
+            key = BackupService.backup()
+
+        command = run_mock.call_args.args[0]
+        self.assertEqual(command[:3], ["pg_dump", "--format=custom", "--no-owner"])
+        self.assertIn("--host=db.internal", command)
+        self.assertEqual(command[-1], "--dbname=timary")
+        self.assertEqual(run_mock.call_args.kwargs["env"]["PGPASSWORD"], "secret")
+        self.assertTrue(key.endswith(".dump"))
+        self.assertEqual(self.s3.keys(), [key])
+
+    @patch("timary.services.backup_service.subprocess.run")
+    def test_failed_pg_dump_isnt_uploaded(self, run_mock):
+        run_mock.side_effect = subprocess.CalledProcessError(1, "pg_dump")
+        with patch.dict(settings.DATABASES, {"default": POSTGRES_DB}):
+            self.assertEqual(backup_db_file(), "Database backup failed")
+        self.assertEqual(self.s3.keys(), [])
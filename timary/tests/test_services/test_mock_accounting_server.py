@@ -0,0 +1,107 @@
+import time
+
+import requests
+from django.test import TestCase
+from django.urls import reverse
+
+from timary.custom_errors import AccountingError
+from timary.models import SentInvoice
+from timary.services.accounting_service import class_for_name
+from timary.tests.factories import (
+    ClientFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+from timary.tests.mock_accounting_server import MockAccountingServer
+
+PROVIDERS = ["quickbooks", "freshbooks", "zoho", "xero", "sage"]
+
+
+class TestMockAccountingServer(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory(
+            accounting_org_id="abc123", accounting_refresh_token="abc123"
+        )
+        self.client_obj = ClientFactory(user=self.user, name="Bob Smith")
+        self.sent_invoice = SentInvoiceFactory(
+            user=self.user,
+            invoice=IntervalInvoiceFactory(user=self.user, client=self.client_obj),
+            paid_status=SentInvoice.PaidStatus.PAID,
+        )
+
+    def test_create_customer_and_invoice_for_each_provider(self):
+        with MockAccountingServer() as server:
+            for provider in PROVIDERS:
+                self.user.accounting_org = provider
+                self.user.save()
+                service = class_for_name(provider)
+                service.create_customer(self.client_obj)
+                service.create_invoice(self.sent_invoice)
+
+                self.client_obj.refresh_from_db()
+                self.sent_invoice.refresh_from_db()
+                self.assertIsNotNone(self.client_obj.accounting_customer_id)
+                self.assertIsNotNone(self.sent_invoice.accounting_invoice_id)
+
+            stats = server.stats()
+        self.assertEqual(stats["by_status"], {200: stats["total"]})
+        self.assertEqual(set(stats["by_provider"]), set(PROVIDERS))
+
+    def test_get_customers_for_each_provider(self):
+        with MockAccountingServer():
+            for provider in PROVIDERS:
+                self.user.accounting_org = provider
+                customers = class_for_name(provider).get_customers(self.user)
+                self.assertEqual(len(customers), 1)
+                self.assertEqual(customers[0]["name"], "Bob Smith")
+
+    def test_injected_error_raises_accounting_error(self):
+        self.user.accounting_org = "quickbooks"
+        self.user.save()
+        with MockAccountingServer() as server:
+            server.fail_next("quickbooks", status=400)
+            with self.assertRaises(AccountingError):
+                class_for_name("quickbooks").create_customer(self.client_obj)
+            self.assertEqual(server.stats()["by_status"], {400: 1})
+
+    def test_rate_limit_is_per_tenant(self):
+        self.user.accounting_org = "xero"
+        self.user.save()
+        service = class_for_name("xero")
+        with MockAccountingServer(rate_limits={"xero": 2}) as server:
+            service.create_customer(self.client_obj, auth_token="abc123")
+            service.create_customer(self.client_obj, auth_token="abc123")
+            with self.assertRaises(AccountingError):
+                service.create_customer(self.client_obj, auth_token="abc123")
+
+            self.user.accounting_org_id = "def456"
+            self.user.save()
+            service.create_customer(self.client_obj, auth_token="abc123")
+            self.assertEqual(server.stats()["rate_limited"], 1)
+
+    def test_latency_is_applied(self):
+        with MockAccountingServer(latency={"sage": 0.05}) as server:
+            self.user.accounting_org = "sage"
+            start = time.monotonic()
+            class_for_name("sage").get_customers(self.user)
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+            self.assertEqual(server.stats()["total"], 2)
+
+    def test_accounting_sync_view(self):
+        self.user.accounting_org = "zoho"
+        self.user.save()
+        self.client.force_login(self.user)
+        with MockAccountingServer() as server:
+            response = self.client.get(reverse("timary:accounting_sync"))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(server.stats()["by_provider"], {"zoho": 6})
+        self.sent_invoice.refresh_from_db()
+        self.assertIsNotNone(self.sent_invoice.accounting_invoice_id)
+
+    def test_requests_are_not_redirected_after_exit(self):
+        real_send = requests.Session.send
+        with MockAccountingServer():
+            self.assertNotEqual(requests.Session.send, real_send)
+        self.assertEqual(requests.Session.send, real_send)
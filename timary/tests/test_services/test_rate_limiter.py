@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django_q.models import Schedule
+
+from timary.custom_errors import AccountingRateLimitError
+from timary.models import AccountingRateLimit, SentInvoice
+from timary.services.accounting_service import AccountingService
+from timary.services.rate_limiter import AccountingRateLimiter
+from timary.tasks import sync_sent_invoice
+from timary.tests.factories import (
+    ClientFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+from timary.tests.mock_accounting_server import MockAccountingServer
+
+
+@override_settings(ACCOUNTING_RATE_LIMITS={"xero": 6})
+class TestAccountingRateLimiter(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory(
+            accounting_org="xero",
+            accounting_org_id="abc123",
+            accounting_refresh_token="abc123",
+        )
+        self.client_obj = ClientFactory(user=self.user, accounting_customer_id="abc123")
+        self.sent_invoice = SentInvoiceFactory(
+            user=self.user,
+            invoice=IntervalInvoiceFactory(user=self.user, client=self.client_obj),
+            paid_status=SentInvoice.PaidStatus.PAID,
+        )
+
+    def test_acquire_until_quota_used(self):
+        rate_limiter = AccountingRateLimiter(self.user)
+        rate_limiter.acquire(4)
+        rate_limiter.acquire(2)
+        with self.assertRaises(AccountingRateLimitError) as ctx:
+            rate_limiter.acquire(1)
+        # 6 per minute refills a token every 10 seconds
+        self.assertAlmostEqual(ctx.exception.retry_after, 10, delta=0.1)
+
+    def test_bucket_refills_over_time(self):
+        rate_limiter = AccountingRateLimiter(self.user)
+        rate_limiter.acquire(6)
+        bucket = AccountingRateLimit.objects.get(provider="xero", org_id="abc123")
+        bucket.last_refill -= timedelta(seconds=30)
+        bucket.save()
+        rate_limiter.acquire(3)
+        with self.assertRaises(AccountingRateLimitError):
+            rate_limiter.acquire(1)
+
+    def test_buckets_are_per_org(self):
+        AccountingRateLimiter(self.user).acquire(6)
+        other_user = UserFactory(accounting_org="xero", accounting_org_id="def456")
+        AccountingRateLimiter(other_user).acquire(6)
+        self.assertEqual(AccountingRateLimit.objects.count(), 2)
+
+    def test_providers_without_limit_are_not_tracked(self):
+        self.user.accounting_org = "sage"
+        rate_limiter = AccountingRateLimiter(self.user)
+        for _ in range(10):
+            rate_limiter.acquire(5)
+        self.assertEqual(AccountingRateLimit.objects.count(), 0)
+
+    def test_over_quota_invoice_sync_is_deferred(self):
+        AccountingRateLimiter(self.user).acquire(5)
+        with MockAccountingServer() as server:
+            invoice_synced, error_raised = self.sent_invoice.sync_invoice()
+            self.assertEqual(server.stats()["total"], 0)
+
+        self.assertFalse(invoice_synced)
+        self.assertIn("retry syncing", error_raised)
+        retry = Schedule.objects.get(func="timary.tasks.sync_sent_invoice")
+        self.assertIn(str(self.sent_invoice.id), retry.args)
+
+        # Retrying again before the schedule runs doesn't queue a duplicate
+        self.sent_invoice.sync_invoice()
+        self.assertEqual(
+            Schedule.objects.filter(func="timary.tasks.sync_sent_invoice").count(), 1
+        )
+
+    def test_provider_rate_limit_drains_bucket_and_defers(self):
+        with MockAccountingServer() as server:
+            server.fail_next("xero", status=429)
+            invoice_synced, error_raised = self.sent_invoice.sync_invoice()
+
+        self.assertFalse(invoice_synced)
+        self.assertIn("retry syncing", error_raised)
+        self.assertEqual(
+            AccountingRateLimit.objects.get(provider="xero", org_id="abc123").tokens, 0
+        )
+        self.assertTrue(
+            Schedule.objects.filter(func="timary.tasks.sync_sent_invoice").exists()
+        )
+
+    def test_deferred_sync_task(self):
+        with MockAccountingServer():
+            sync_sent_invoice(str(self.sent_invoice.id))
+        self.sent_invoice.refresh_from_db()
+        self.assertIsNotNone(self.sent_invoice.accounting_invoice_id)
+
+    def test_accounting_sync_view_defers_over_quota(self):
+        self.client_obj.accounting_customer_id = None
+        self.client_obj.save()
+        self.client.force_login(self.user)
+        with MockAccountingServer():
+            AccountingService({"user": self.user}).call_with_rate_limit(
+                self.user, "get_customers", self.user
+            )
+            AccountingRateLimiter(self.user).acquire(4)
+            response = self.client.get(reverse("timary:accounting_sync"))
+
+        self.assertEqual(response.status_code, 200)
+        self.client_obj.refresh_from_db()
+        self.assertIsNotNone(self.client_obj.accounting_customer_id)
+        self.assertTrue(
+            Schedule.objects.filter(func="timary.tasks.sync_sent_invoice").exists()
+        )
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import stripe
+from django.core.cache import cache
+from django.test import TestCase
+
+from timary.services.stripe_service import StripeService
+from timary.tests.factories import SentInvoiceFactory
+
+
+class TestStripeService(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.sent_invoice = SentInvoiceFactory(
+            total_price=100,
+            invoice__client__stripe_customer_id="cus_123",
+            user__stripe_connect_id="acct_123",
+        )
+
+    def intent(self, **kwargs):
+        intent = {
+            "id": "pi_123",
+            "status": "requires_payment_method",
+            "customer": "cus_123",
+            "amount": 10500,
+            "transfer_data": {"destination": "acct_123"},
+            "client_secret": "pi_123_secret",
+        }
+        intent.update(kwargs)
+        return stripe.util.convert_to_stripe_object(intent)
+
+    def test_stripe_is_configured_once(self):
+        self.assertIsInstance(
+            stripe.default_http_client, stripe.http_client.RequestsClient
+        )
+        self.assertEqual(stripe.max_network_retries, 2)
+
+    @patch("stripe.PaymentIntent.create")
+    def test_create_payment_intent_without_previous_intent(self, create_mock):
+        create_mock.return_value = self.intent()
+        intent = StripeService.create_payment_intent_for_payout(self.sent_invoice)
+        self.assertEqual(intent["id"], "pi_123")
+        self.assertEqual(create_mock.call_args.kwargs["amount"], 10500)
+
+    @patch("stripe.PaymentIntent.create")
+    @patch("stripe.PaymentIntent.retrieve")
+    def test_reuse_unpaid_payment_intent(self, retrieve_mock, create_mock):
+        self.sent_invoice.stripe_payment_intent_id = "pi_123"
+        retrieve_mock.return_value = self.intent()
+
+        intent = StripeService.create_payment_intent_for_payout(self.sent_invoice)
+
+        self.assertEqual(intent["id"], "pi_123")
+        retrieve_mock.assert_called_once_with("pi_123")
+        create_mock.assert_not_called()
+
+    @patch("stripe.PaymentIntent.modify")
+    @patch("stripe.PaymentIntent.retrieve")
+    def test_reused_payment_intent_amount_is_updated(self, retrieve_mock, modify_mock):
+        self.sent_invoice.stripe_payment_intent_id = "pi_123"
+        self.sent_invoice.total_price = 150
+        retrieve_mock.return_value = self.intent()
+        modify_mock.return_value = self.intent(amount=15500)
+
+        intent = StripeService.create_payment_intent_for_payout(self.sent_invoice)
+
+        self.assertEqual(intent["amount"], 15500)
+        modify_mock.assert_called_once_with(
+            "pi_123", amount=15500, application_fee_amount=500
+        )
+
+    @patch("stripe.PaymentIntent.create")
+    @patch("stripe.PaymentIntent.retrieve")
+    def test_new_payment_intent_if_previous_is_processing(
+        self, retrieve_mock, create_mock
+    ):
+        self.sent_invoice.stripe_payment_intent_id = "pi_123"
+        retrieve_mock.return_value = self.intent(status="processing")
+        create_mock.return_value = self.intent(id="pi_456")
+
+        intent = StripeService.create_payment_intent_for_payout(self.sent_invoice)
+
+        self.assertEqual(intent["id"], "pi_456")
+        create_mock.assert_called_once()
+
+    @patch("stripe.Customer.list_payment_methods")
+    def test_customer_payment_method_is_cached(self, list_payment_methods_mock):
+        list_payment_methods_mock.return_value = stripe.util.convert_to_stripe_object(
+            {"data": [{"id": "pm_123", "us_bank_account": {"last4": "6789"}}]}
+        )
+
+        for _ in range(3):
+            payment_method = StripeService.retrieve_customer_payment_method("cus_123")
+            self.assertEqual(payment_method["us_bank_account"]["last4"], "6789")
+        self.assertEqual(list_payment_methods_mock.call_count, 1)
+
+        StripeService.clear_customer_payment_method("cus_123")
+        StripeService.retrieve_customer_payment_method("cus_123")
+        self.assertEqual(list_payment_methods_mock.call_count, 2)
+
+    @patch("stripe.Customer.list_payment_methods")
+    def test_missing_customer_payment_method_is_cached(self, list_payment_methods_mock):
+        list_payment_methods_mock.return_value = {"data": []}
+        self.assertIsNone(StripeService.retrieve_customer_payment_method("cus_123"))
+        self.assertIsNone(StripeService.retrieve_customer_payment_method("cus_123"))
+        self.assertEqual(list_payment_methods_mock.call_count, 1)
@@ -0,0 +1,198 @@
+import zoneinfo
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from django_q.brokers import get_broker
+from django_q.models import Schedule
+from django_q.tasks import async_task
+
+from timary.models import TaskRun, User
+from timary.task_queue import (
+    InMemoryBroker,
+    instrument_task,
+    record_execute,
+    record_external_call,
+    record_result,
+    record_rows,
+    task_functions,
+    task_metrics,
+)
+from timary.tasks import prune_task_runs, remind_users_to_log_hours
+from timary.tests.factories import (
+    ClientFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+
+
+class TestInMemoryBroker(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.broker = InMemoryBroker(list_key="test")
+        self.addCleanup(self.broker.purge_queue)
+
+    def test_tests_use_in_memory_broker(self):
+        self.assertIsInstance(get_broker(), InMemoryBroker)
+
+    def test_enqueue_dequeue_acknowledge(self):
+        task_id = self.broker.enqueue("task")
+        self.assertEqual(self.broker.queue_size(), 1)
+
+        self.assertEqual(self.broker.dequeue(), [(task_id, "task")])
+        self.assertEqual(self.broker.queue_size(), 0)
+        self.assertEqual(self.broker.lock_size(), 1)
+
+        self.broker.acknowledge(task_id)
+        self.assertEqual(self.broker.lock_size(), 0)
+        self.assertIsNone(self.broker.dequeue())
+
+    def test_failed_task_is_requeued(self):
+        task_id = self.broker.enqueue("task")
+        self.broker.dequeue()
+        self.broker.fail(task_id)
+        self.assertEqual(self.broker.dequeue(), [(task_id, "task")])
+
+
+class TestTaskMetrics(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_task_functions_are_from_tasks_module(self):
+        functions = task_functions()
+        self.assertIn("timary.tasks.gather_invoices", functions)
+        self.assertNotIn("timary.tasks.async_task", functions)
+
+    def test_sync_task_is_measured(self):
+        sent_invoice = SentInvoiceFactory()
+        async_task("timary.tasks.sync_sent_invoice", str(sent_invoice.id))
+
+        metrics = task_metrics()["timary.tasks.sync_sent_invoice"]
+        self.assertEqual(metrics["enqueued"], 1)
+        self.assertEqual(metrics["succeeded"], 1)
+        self.assertEqual(metrics["failed"], 0)
+        self.assertEqual(metrics["queue_depth"], 0)
+
+    def test_queued_tasks_count_towards_depth(self):
+        broker = get_broker()
+        self.addCleanup(broker.purge_queue)
+        for _ in range(3):
+            async_task("timary.tasks.gather_invoices", sync=False, broker=broker)
+
+        self.assertEqual(broker.queue_size(), 3)
+        self.assertEqual(
+            task_metrics()["timary.tasks.gather_invoices"]["queue_depth"], 3
+        )
+
+    def test_latency_and_duration(self):
+        now = timezone.now()
+        for latency, duration in [(2, 1), (4, 3)]:
+            task = {
+                "func": "timary.tasks.gather_invoices",
+                "started": now - timedelta(seconds=latency),
+            }
+            record_execute("django_q", None, task)
+            task["success"] = True
+            task["stopped"] = task["executed"] + timedelta(seconds=duration)
+            record_result("django_q", task)
+
+        metrics = task_metrics(["timary.tasks.gather_invoices"])
+        self.assertEqual(metrics, {})
+
+        cache.set("task_metrics:timary.tasks.gather_invoices:enqueued", 2)
+        metrics = task_metrics(["timary.tasks.gather_invoices"])[
+            "timary.tasks.gather_invoices"
+        ]
+        self.assertAlmostEqual(metrics["avg_latency_ms"], 3000, delta=50)
+        self.assertAlmostEqual(metrics["max_latency_ms"], 4000, delta=50)
+        self.assertEqual(metrics["avg_duration_ms"], 2000)
+        self.assertEqual(metrics["max_duration_ms"], 3000)
+
+
+@instrument_task
+def count_users():
+    record_external_call("email")
+    record_rows(TaskRun.objects.count() + 2)
+    return "Counted"
+
+
+@instrument_task
+def failing_task():
+    raise ValueError("Nope")
+
+
+class TestInstrumentTask(TestCase):
+    def test_run_is_recorded(self):
+        self.assertEqual(count_users(), "Counted")
+
+        run = TaskRun.objects.get()
+        self.assertEqual(run.task, "timary.tests.test_task_queue.count_users")
+        self.assertEqual(run.query_count, 1)
+        self.assertEqual(run.external_calls, {"email": 1})
+        self.assertEqual(run.rows_processed, 2)
+        self.assertTrue(run.success)
+        self.assertEqual(run.result, "Counted")
+
+    def test_failed_run_is_recorded(self):
+        with self.assertRaises(ValueError):
+            failing_task()
+
+        run = TaskRun.objects.get()
+        self.assertFalse(run.success)
+        self.assertEqual(run.result, "ValueError('Nope')")
+
+    @patch("timary.models.TaskRun.objects.create", side_effect=Exception("DB down"))
+    def test_failed_recording_keeps_task_outcome(self, create_mock):
+        self.assertEqual(count_users(), "Counted")
+        with self.assertRaisesMessage(ValueError, "Nope"):
+            failing_task()
+        self.assertEqual(create_mock.call_count, 2)
+
+    def test_prune_task_runs_is_scheduled(self):
+        self.assertTrue(
+            Schedule.objects.filter(
+                func="timary.tasks.prune_task_runs", schedule_type=Schedule.DAILY
+            ).exists()
+        )
+
+    def test_calls_outside_tasks_are_ignored(self):
+        record_external_call("email")
+        record_rows(5)
+        self.assertEqual(TaskRun.objects.count(), 0)
+
+    @patch("timary.tasks.timezone")
+    def test_scheduled_task_records_emails_and_rows(self, today_mock):
+        today_mock.now.return_value = datetime(
+            2023, 3, 24, 12, 30, 0, tzinfo=zoneinfo.ZoneInfo("America/New_York")
+        )
+        user = UserFactory()
+        IntervalInvoiceFactory(user=user, client=ClientFactory(user=user))
+
+        remind_users_to_log_hours()
+
+        run = TaskRun.objects.get(task="timary.tasks.remind_users_to_log_hours")
+        self.assertEqual(run.external_calls, {"email": 1})
+        self.assertEqual(
+            run.rows_processed,
+            User.objects.exclude(
+                stripe_subscription_status=User.StripeSubscriptionStatus.INACTIVE
+            ).count(),
+        )
+        self.assertGreater(run.query_count, 0)
+
+    def test_prune_old_runs(self):
+        now = timezone.now()
+        for days in [1, 40]:
+            TaskRun.objects.create(
+                task="timary.tasks.gather_invoices",
+                started_at=now - timedelta(days=days),
+            )
+
+        self.assertEqual(prune_task_runs(), "Task runs deleted: 1")
+        self.assertEqual(
+            TaskRun.objects.filter(task="timary.tasks.gather_invoices").count(), 1
+        )
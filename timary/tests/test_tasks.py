@@ -21,6 +21,7 @@ from timary.tasks import (
     send_invoice_installment,
     send_invoice_preview,
     send_invoice_reminder,
+    send_paid_notification,
     send_weekly_updates,
 )
 from timary.tests.factories import (
@@ -917,6 +918,98 @@ class TestSendInvoice(TestCase):
             msg = f"<strong>Total Paid: ${floatformat(sent_invoice.total_price + 5, -2)}</strong>"
             self.assertInHTML(msg, html_message)
 
+    @patch("timary.models.async_task")
+    def test_paid_invoice_queues_each_notification(self, async_task_mock):
+        sent_invoice = SentInvoiceFactory(
+            paid_status=SentInvoice.PaidStatus.PAID,
+            user__accounting_org_id="abc123",
+        )
+        sent_invoice.success_notification()
+
+        queued = [c.args for c in async_task_mock.call_args_list]
+        sent_invoice_id = str(sent_invoice.id)
+        self.assertEqual(
+            queued,
+            [
+                ("timary.tasks.send_paid_notification", sent_invoice_id, "payment_sms"),
+                (
+                    "timary.tasks.send_paid_notification",
+                    sent_invoice_id,
+                    "receipt_email",
+                ),
+                (
+                    "timary.tasks.send_paid_notification",
+                    sent_invoice_id,
+                    "payment_email",
+                ),
+                ("timary.tasks.sync_sent_invoice", sent_invoice_id),
+            ],
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+    @patch("timary.services.twilio_service.TwilioClient.sent_payment_success")
+    def test_paid_notifications_are_only_sent_once(self, twilio_mock):
+        sent_invoice = SentInvoiceFactory(paid_status=SentInvoice.PaidStatus.PAID)
+        sent_invoice.success_notification()
+        sent_invoice.success_notification()
+
+        self.assertEqual(twilio_mock.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+        sent_invoice.refresh_from_db()
+        self.assertEqual(
+            set(sent_invoice.paid_notifications), set(SentInvoice.PAID_NOTIFICATIONS)
+        )
+        self.assertEqual(
+            send_paid_notification(sent_invoice.id, "payment_email"),
+            "payment_email already sent",
+        )
+
+    @patch("timary.tasks.schedule")
+    @patch("timary.services.twilio_service.TwilioClient.sent_payment_success")
+    def test_failed_paid_notification_retries_on_its_own(
+        self, twilio_mock, schedule_mock
+    ):
+        twilio_mock.side_effect = Exception("Twilio is down")
+        sent_invoice = SentInvoiceFactory(paid_status=SentInvoice.PaidStatus.PAID)
+        sent_invoice.success_notification()
+
+        # Emails still go out while the sms is retried later
+        self.assertEqual(len(mail.outbox), 2)
+        sent_invoice.refresh_from_db()
+        self.assertNotIn("payment_sms", sent_invoice.paid_notifications)
+        self.assertEqual(
+            schedule_mock.call_args.args,
+            (
+                "timary.tasks.send_paid_notification",
+                str(sent_invoice.id),
+                "payment_sms",
+                2,
+            ),
+        )
+
+        twilio_mock.side_effect = None
+        send_paid_notification(str(sent_invoice.id), "payment_sms", 2)
+        sent_invoice.refresh_from_db()
+        self.assertIn("payment_sms", sent_invoice.paid_notifications)
+
+    @patch("timary.services.twilio_service.TwilioClient.sent_payment_success")
+    def test_paid_notification_is_claimed_before_sending(self, twilio_mock):
+        sent_invoice = SentInvoiceFactory(paid_status=SentInvoice.PaidStatus.PAID)
+
+        def send_again(*args):
+            # A duplicate task running while the first one is still sending
+            self.assertEqual(
+                send_paid_notification(str(sent_invoice.id), "payment_sms"),
+                "payment_sms already sent",
+            )
+
+        twilio_mock.side_effect = send_again
+        self.assertEqual(
+            send_paid_notification(str(sent_invoice.id), "payment_sms"),
+            "payment_sms sent",
+        )
+        self.assertEqual(twilio_mock.call_count, 1)
+
     def test_dont_send_invoice_if_no_active_subscription(self):
         hours = HoursLineItemFactory()
         hours.invoice.user.stripe_subscription_status = 3
@@ -1,5 +1,9 @@
+from django.db import connection
 from django.template import Context, Engine, Template
 from django.test import Client, TestCase
+from django.urls import reverse
+
+from timary.middlware import RequestRecorder, duplicate_queries, query_budget
 
 
 class BaseTest(TestCase):
@@ -10,6 +14,7 @@ class BaseTest(TestCase):
         template = Engine(
             app_dirs=True,
             libraries={
+                "cache": "django.templatetags.cache",
                 "filters": "timary.templatetags.filters",
                 "tz": "django.templatetags.tz",
                 "waffle_tags": "waffle.templatetags.waffle_tags",
@@ -17,3 +22,26 @@ class BaseTest(TestCase):
         ).get_template(template_name)
         context = Context(context)
         return template.render(context)
+
+    def assertQueryBudget(
+        self, view_name, *args, budget=None, method="get", data=None, **kwargs
+    ):
+        """
+        Request the view and fail if it runs more queries than its budget or repeats a query (N+1).
+        The budget defaults to the one RequestPerformanceMiddleware logs against.
+        """
+        budget = budget or query_budget(view_name)
+        recorder = RequestRecorder()
+        with connection.execute_wrapper(recorder):
+            response = getattr(self.client, method)(
+                reverse(view_name, args=args, kwargs=kwargs), data
+            )
+        self.assertLessEqual(
+            len(recorder.queries),
+            budget,
+            f"{view_name} ran {len(recorder.queries)} queries, budget is {budget}",
+        )
+        self.assertEqual(
+            duplicate_queries(recorder.queries), {}, f"{view_name} repeated queries"
+        )
+        return response
@@ -2,14 +2,18 @@ import random
 import zoneinfo
 from unittest.mock import patch
 
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.db.models import Sum
 from django.template.defaultfilters import floatformat
 from django.template.defaultfilters import time as template_time
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode
 
-from timary.models import HoursLineItem
+from timary.middlware import RequestRecorder
+from timary.models import HoursImport, HoursLineItem
 from timary.tests.factories import (
     HoursLineItemFactory,
     IntervalInvoiceFactory,
@@ -217,6 +221,162 @@ class TestHourLineItems(BaseTest):
             response.content.decode("utf-8"),
         )
 
+    def bulk_hours_data(self, rows):
+        data = {"form-TOTAL_FORMS": len(rows), "form-INITIAL_FORMS": 0}
+        for index, row in enumerate(rows):
+            data.update(
+                {f"form-{index}-{field}": value for field, value in row.items()}
+            )
+        return data
+
+    def test_bulk_create_hours_for_a_week(self):
+        HoursLineItem.objects.all().delete()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        invoice2 = IntervalInvoiceFactory(user=self.user)
+        today = get_users_localtime(self.user)
+        rows = [
+            {
+                "quantity": 2,
+                "date_tracked": (today - timezone.timedelta(days=days)).date(),
+                "invoice": inv.id,
+            }
+            for days in range(6)
+            for inv in [invoice, invoice2]
+        ]
+        rows[0].update({"recurring": True, "repeat_interval_schedule": "d"})
+
+        recorder = RequestRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.post(
+                reverse("timary:bulk_create_hours"), data=self.bulk_hours_data(rows)
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("New hours added!", str(response.headers))
+        self.assertEqual(HoursLineItem.objects.count(), 12)
+        self.assertEqual(invoice2.line_items.instance_of(HoursLineItem).count(), 6)
+        self.assertEqual(
+            HoursLineItem.objects.exclude(recurring_logic={})
+            .get()
+            .recurring_logic["type"],
+            "recurring",
+        )
+
+    def test_bulk_create_hours_over_24_hours_across_rows(self):
+        HoursLineItem.objects.all().delete()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        invoice2 = IntervalInvoiceFactory(user=self.user)
+        today = get_users_localtime(self.user).date()
+        response = self.client.post(
+            reverse("timary:bulk_create_hours"),
+            data=self.bulk_hours_data(
+                [
+                    {"quantity": 14, "date_tracked": today, "invoice": invoice.id},
+                    {"quantity": 12, "date_tracked": today, "invoice": invoice2.id},
+                ]
+            ),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+        self.assertInHTML(
+            "Too many hours logged for today",
+            response.content.decode("utf-8"),
+        )
+
+    def test_bulk_create_hours_ignores_other_users_hours(self):
+        HoursLineItem.objects.all().delete()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        today = get_users_localtime(self.user)
+        HoursLineItemFactory(quantity=20, date_tracked=today)
+        response = self.client.post(
+            reverse("timary:bulk_create_hours"),
+            data=self.bulk_hours_data(
+                [
+                    {
+                        "quantity": 6,
+                        "date_tracked": today.date(),
+                        "invoice": invoice.id,
+                    },
+                    {
+                        "quantity": 6,
+                        "date_tracked": today.date(),
+                        "invoice": invoice.id,
+                    },
+                ]
+            ),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(invoice.line_items.instance_of(HoursLineItem).count(), 2)
+
+    def test_bulk_create_hours_invalid_row(self):
+        HoursLineItem.objects.all().delete()
+        invoice = IntervalInvoiceFactory(user=self.user)
+        today = get_users_localtime(self.user).date()
+        response = self.client.post(
+            reverse("timary:bulk_create_hours"),
+            data=self.bulk_hours_data(
+                [
+                    {"quantity": 1, "date_tracked": today, "invoice": invoice.id},
+                    {"quantity": -1, "date_tracked": today, "invoice": invoice.id},
+                ]
+            ),
+        )
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+        self.assertInHTML(
+            "Invalid hours logged. Please log between 0 and 24 hours",
+            response.content.decode("utf-8"),
+        )
+
+    def test_bulk_create_hours_missing_management_form(self):
+        response = self.client.post(reverse("timary:bulk_create_hours"), data={})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.InMemoryStorage")
+    def test_import_hours(self):
+        today = get_users_localtime(self.user).date()
+        file = SimpleUploadedFile(
+            "hours.csv",
+            f"date,hours,invoice\n{today},1.5,{self.hours.invoice.title}\n".encode(),
+        )
+        response = self.client.post(reverse("timary:import_hours"), {"file": file})
+
+        self.assertEqual(response.status_code, 200)
+        hours_import = HoursImport.objects.get(user=self.user)
+        self.assertEqual(hours_import.status, HoursImport.Status.COMPLETED)
+        self.assertEqual(hours_import.imported_rows, 1)
+        self.assertIn("1 hours imported", response.content.decode())
+
+        response = self.client.get(
+            reverse(
+                "timary:hours_import_progress",
+                kwargs={"hours_import_id": hours_import.id},
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+        # Finished imports stop polling
+        self.assertNotIn("hx-trigger", response.content.decode())
+
+    def test_import_hours_only_csv_or_xlsx(self):
+        file = SimpleUploadedFile("hours.pdf", b"date,hours,invoice")
+        response = self.client.post(reverse("timary:import_hours"), {"file": file})
+
+        self.assertIn(
+            "Only CSV and XLSX files can be imported.", response.content.decode()
+        )
+        self.assertFalse(HoursImport.objects.exists())
+
+    def test_cannot_view_other_users_hours_import(self):
+        hours_import = HoursImport.objects.create(
+            user=self.hours_no_user.invoice.user, file="hours_imports/hours.csv"
+        )
+        response = self.client.get(
+            reverse(
+                "timary:hours_import_progress",
+                kwargs={"hours_import_id": hours_import.id},
+            )
+        )
+        self.assertEqual(response.status_code, 302)
+
     def test_create_quick_hours(self):
         invoice = IntervalInvoiceFactory(user=self.user)
         hours_ref_id = f"{1.0}_{invoice.email_id}"
@@ -6,8 +6,10 @@ from unittest.mock import patch
 from dateutil.relativedelta import relativedelta
 from django.contrib.messages import get_messages
 from django.core import mail
+from django.db import connection
 from django.template.defaultfilters import date as template_date
 from django.template.defaultfilters import floatformat
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode
@@ -171,6 +173,24 @@ class TestRecurringInvoices(BaseTest):
         self.assertTemplateUsed(response, "invoices/manage_invoices.html")
         self.assertEqual(response.status_code, 200)
 
+    def test_invoice_list_query_count_is_constant(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("timary:get_invoices"))
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        # Warm the per-user cached reads, like the timer state, before counting
+        list_queries()
+        queries_for_one = list_queries()
+        for factory in [IntervalInvoiceFactory, WeeklyInvoiceFactory]:
+            for _ in range(3):
+                invoice = factory(user=self.user, total_budget=1000)
+                HoursLineItemFactory(invoice=invoice)
+                SentInvoiceFactory(invoice=invoice, user=self.user)
+        # One more query for the weekly child table
+        self.assertEqual(list_queries(), queries_for_one + 1)
+
     def test_manage_zero_invoices(self):
         Invoice.objects.filter(user=self.user).all().delete()
         response = self.client.get(reverse("timary:manage_invoices"))
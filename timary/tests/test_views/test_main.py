@@ -1,6 +1,8 @@
+import uuid
 from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode
@@ -10,6 +12,7 @@ from timary.hours_manager import HoursManager
 from timary.models import Invoice, User
 from timary.tests.factories import (
     HoursLineItemFactory,
+    IntervalInvoiceFactory,
     InvoiceFactory,
     SentInvoiceFactory,
     UserFactory,
@@ -52,6 +55,57 @@ class TestMain(BaseTest):
                 hours_last_month_template, response.content.decode("utf-8")
             )
 
+    @override_settings(HOURS_PAGE_SIZE=2)
+    def test_index_renders_first_page_of_hours(self):
+        invoice = IntervalInvoiceFactory(user=self.user)
+        now = timezone.now().replace(hour=12, minute=0)
+        hours = [
+            HoursLineItemFactory(
+                invoice=invoice, date_tracked=now - timezone.timedelta(minutes=i)
+            )
+            for i in range(3)
+        ]
+        response = self.client.get(reverse("timary:index"))
+
+        content = response.content.decode("utf-8")
+        self.assertIn(hours[1].slug_id, content)
+        self.assertNotIn(hours[2].slug_id, content)
+        self.assertIn(reverse("timary:hours_page"), content)
+
+        response = self.client.get(
+            reverse("timary:hours_page"),
+            {"cursor": response.context["next_cursor"]},
+        )
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode("utf-8")
+        self.assertInHTML(
+            self.setup_template("partials/_hour.html", {"hour": hours[2]}), content
+        )
+        self.assertNotIn(hours[0].slug_id, content)
+        # Same day as the previous page, so the day heading isn't repeated
+        self.assertNotIn("Copy hours...", content)
+        self.assertNotIn(reverse("timary:hours_page"), content)
+
+    def test_hours_page_continues_local_day(self):
+        # 1:30am UTC is still the evening before in New York
+        cursor = f"2023-10-19T01:30:00+00:00_{uuid.uuid4().hex}"
+        response = self.client.get(
+            reverse("timary:hours_page"), {"cursor": cursor, "month": "Oct. 01, 2023"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["continued_day"], "Oct. 18, 2023")
+
+    def test_hours_page_invalid_cursor(self):
+        response = self.client.get(reverse("timary:hours_page"), {"cursor": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_hours_page_invalid_month(self):
+        cursor = f"2023-10-19T01:30:00+00:00_{uuid.uuid4().hex}"
+        response = self.client.get(
+            reverse("timary:hours_page"), {"cursor": cursor, "month": "October"}
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_dashboard_stats(self):
         HoursLineItemFactory(invoice__user=self.user)
         HoursLineItemFactory(
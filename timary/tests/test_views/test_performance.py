@@ -0,0 +1,136 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+from timary.middlware import (
+    _view_metrics_buffer,
+    duplicate_queries,
+    query_signature,
+    registered_views,
+    view_metrics,
+)
+from timary.tests.factories import (
+    HoursLineItemFactory,
+    IntervalInvoiceFactory,
+    SentInvoiceFactory,
+    UserFactory,
+)
+from timary.tests.test_views.basetest import BaseTest
+
+
+class TestRequestPerformanceMiddleware(BaseTest):
+    def setUp(self) -> None:
+        super().setUp()
+        _view_metrics_buffer.flush()
+        cache.clear()
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+
+    def test_query_signature_ignores_in_list_length(self):
+        self.assertEqual(
+            query_signature('SELECT * FROM "a" WHERE "id" IN (%s, %s, %s)'),
+            query_signature('SELECT * FROM "a" WHERE "id" IN (%s, %s)'),
+        )
+
+    def test_duplicate_queries(self):
+        queries = ['SELECT * FROM "a" WHERE "id" = %s'] * 3 + ['SELECT * FROM "b"']
+        self.assertEqual(
+            duplicate_queries(queries, threshold=3),
+            {'SELECT * FROM "a" WHERE "id" = %s': 3},
+        )
+        self.assertEqual(duplicate_queries(queries, threshold=4), {})
+
+    @override_settings(REQUEST_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("timary:index"))
+        timings = [
+            timing.split(";")[0] for timing in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(timings, ["db", "tpl", "total"])
+        self.assertNotIn("tpl;dur=0.0", response["Server-Timing"])
+
+    @override_settings(REQUEST_SERVER_TIMING=False)
+    def test_no_server_timing_header(self):
+        response = self.client.get(reverse("timary:index"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_view_metrics(self):
+        self.client.get(reverse("timary:index"))
+        self.client.get(reverse("timary:index"))
+
+        metrics = view_metrics()["timary:index"]
+        self.assertEqual(metrics["requests"], 2)
+        self.assertGreater(metrics["max_queries"], 0)
+        self.assertEqual(metrics["over_budget"], 0)
+
+    @override_settings(REQUEST_METRICS_FLUSH_SECONDS=60)
+    def test_view_metrics_are_buffered(self):
+        _view_metrics_buffer.flush()
+        with patch("timary.middlware.incr_counter") as incr_mock:
+            self.client.get(reverse("timary:index"))
+            self.client.get(reverse("timary:index"))
+        incr_mock.assert_not_called()
+
+        self.assertEqual(view_metrics()["timary:index"]["requests"], 2)
+
+    def test_views_are_registered_once(self):
+        self.client.get(reverse("timary:index"))
+        self.client.get(reverse("timary:get_clients"))
+        self.client.get(reverse("timary:index"))
+        view_metrics()
+
+        self.assertEqual(registered_views(), ["timary:index", "timary:get_clients"])
+        self.assertEqual(cache.get("view_metrics:view_count"), 2)
+
+    def test_not_modified_rate(self):
+        url = reverse("timary:get_clients")
+        response = self.client.get(url)
+        self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.client.get(reverse("timary:index"))
+
+        metrics = view_metrics()
+        self.assertEqual(metrics["timary:get_clients"]["not_modified_rate"], 50)
+        self.assertIsNone(metrics["timary:index"]["not_modified_rate"])
+
+    @override_settings(REQUEST_QUERY_BUDGETS={"timary:index": 1})
+    def test_over_budget_is_logged(self):
+        with patch("sys.stderr", new_callable=StringIO) as stderr:
+            self.client.get(reverse("timary:index"))
+
+        self.assertIn(
+            "Query budget exceeded: view_name='timary:index'", stderr.getvalue()
+        )
+        self.assertEqual(view_metrics()["timary:index"]["over_budget"], 1)
+
+
+class TestQueryBudgets(BaseTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+        for _ in range(3):
+            invoice = IntervalInvoiceFactory(user=self.user)
+            HoursLineItemFactory(invoice=invoice)
+            SentInvoiceFactory(invoice=invoice, user=self.user)
+
+    def test_manage_invoices(self):
+        self.assertQueryBudget("timary:manage_invoices")
+
+    def test_edit_sent_invoice_hours(self):
+        invoice = IntervalInvoiceFactory(user=self.user)
+        sent_invoice = SentInvoiceFactory(invoice=invoice, user=self.user)
+        for _ in range(25):
+            HoursLineItemFactory(
+                invoice=invoice,
+                date_tracked=invoice.last_date,
+                sent_invoice_id=sent_invoice.id,
+            )
+
+        self.assertQueryBudget(
+            "timary:edit_sent_invoice_hours",
+            sent_invoice_id=sent_invoice.id,
+            budget=15,
+        )
@@ -1,3 +1,4 @@
+import io
 import json
 import uuid
 import zoneinfo
@@ -5,13 +6,15 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.core import mail
+from django.core.management import call_command
 from django.template.defaultfilters import date as template_date
 from django.template.defaultfilters import floatformat
 from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from timary.models import SentInvoice, User
+from timary.models import SentInvoice, StripeEvent, User
+from timary.stripe_events import process_stripe_event
 from timary.tests.factories import (
     HoursLineItemFactory,
     IntervalInvoiceFactory,
@@ -512,6 +515,7 @@ class TestStripeViews(BaseTest):
     ):
         success_notification_mock.return_value = None
         stripe_webhook_mock.return_value = {
+            "id": "evt_1",
             "type": "charge.succeeded",
             "data": {"object": {"id": "abc123"}},
         }
@@ -533,6 +537,7 @@ class TestStripeViews(BaseTest):
     def test_stripe_webhook_payment_error(self, stripe_webhook_mock):
         sent_invoice = SentInvoiceFactory(stripe_payment_intent_id="abc123")
         stripe_webhook_mock.return_value = {
+            "id": "evt_2",
             "type": "payment_intent.payment_failed",
             "data": {"object": {"id": "abc123"}},
         }
@@ -555,6 +560,7 @@ class TestStripeViews(BaseTest):
     @patch("stripe.Webhook.construct_event")
     def test_stripe_webhook_payment_error_email_invoice(self, stripe_webhook_mock):
         stripe_webhook_mock.return_value = {
+            "id": "evt_3",
             "type": "payment_intent.payment_failed",
             "data": {"object": {"id": "abc123"}},
         }
@@ -593,6 +599,7 @@ class TestStripeViews(BaseTest):
     def test_stripe_webhook_trial_success(self, stripe_webhook_mock, referral_mock):
         user = UserFactory(stripe_subscription_id="abc123")
         stripe_webhook_mock.return_value = {
+            "id": "evt_4",
             "type": "invoice.created",
             "data": {"object": {"id": "abc123"}},
         }
@@ -618,6 +625,7 @@ class TestStripeViews(BaseTest):
             stripe_subscription_status=User.StripeSubscriptionStatus.TRIAL,
         )
         stripe_webhook_mock.return_value = {
+            "id": "evt_5",
             "type": "invoice.finalization_failed",
             "data": {"object": {"id": "abc123"}},
         }
@@ -636,3 +644,129 @@ class TestStripeViews(BaseTest):
         self.assertEqual(
             mail.outbox[0].subject, "Oops, something went wrong over here at Timary"
         )
+
+
+class TestStripeEvents(BaseTest):
+    def post_event(self, event):
+        with patch("stripe.Webhook.construct_event") as stripe_webhook_mock:
+            stripe_webhook_mock.return_value = event
+            return self.client.post(
+                reverse("timary:stripe_webhook"),
+                data={},
+                HTTP_STRIPE_SIGNATURE="abc123",
+            )
+
+    @patch("timary.models.SentInvoice.success_notification")
+    def test_duplicate_deliveries_are_processed_once(self, success_notification_mock):
+        SentInvoiceFactory(stripe_payment_intent_id="abc123")
+        event = {
+            "id": "evt_abc123",
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": "abc123"}},
+        }
+        self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(self.post_event(event).status_code, 200)
+
+        stripe_event = StripeEvent.objects.get()
+        self.assertEqual(stripe_event.event_type, "payment_intent.succeeded")
+        self.assertIsNotNone(stripe_event.processed_at)
+        self.assertEqual(stripe_event.attempts, 1)
+        self.assertEqual(success_notification_mock.call_count, 1)
+
+    def test_unhandled_event_is_stored(self):
+        response = self.post_event(
+            {"id": "evt_abc123", "type": "customer.created", "data": {"object": {}}}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(StripeEvent.objects.get().processed_at)
+
+    @patch("timary.models.User.update_payouts_enabled")
+    def test_failed_event_is_acknowledged_and_replayed(self, payouts_mock):
+        user = UserFactory(stripe_connect_id="acct_123")
+        payouts_mock.side_effect = Exception("Database is locked")
+        response = self.post_event(
+            {
+                "id": "evt_abc123",
+                "type": "account.updated",
+                "data": {
+                    "object": {
+                        "id": user.stripe_connect_id,
+                        "requirements": {"disabled_reason": None},
+                    }
+                },
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        stripe_event = StripeEvent.objects.get()
+        self.assertIsNone(stripe_event.processed_at)
+        self.assertIn("Database is locked", stripe_event.error)
+
+        payouts_mock.side_effect = None
+        call_command("replay_stripe_events", stdout=io.StringIO())
+        stripe_event.refresh_from_db()
+        self.assertIsNotNone(stripe_event.processed_at)
+        self.assertIsNone(stripe_event.error)
+        self.assertEqual(stripe_event.attempts, 2)
+        payouts_mock.assert_called_with(None)
+
+    @patch("timary.services.stripe_service.StripeService.list_events")
+    def test_replay_backfills_missed_events(self, list_events_mock):
+        user = UserFactory(
+            stripe_subscription_id="sub_123",
+            stripe_subscription_status=User.StripeSubscriptionStatus.TRIAL,
+        )
+        StripeEvent.objects.create(
+            event_id="evt_1",
+            event_type="invoice.created",
+            payload={},
+            processed_at=timezone.now(),
+        )
+        list_events_mock.return_value = [
+            {"id": "evt_1", "type": "invoice.created", "data": {"object": {}}},
+            {
+                "id": "evt_2",
+                "type": "invoice.created",
+                "data": {"object": {"id": user.stripe_subscription_id}},
+            },
+        ]
+
+        out = io.StringIO()
+        call_command(
+            "replay_stripe_events", "--fetch", "--since", "2023-08-01", stdout=out
+        )
+
+        self.assertIn("Stored 1 missed event(s) from Stripe", out.getvalue())
+        self.assertIn("Replayed 1 of 1 event(s)", out.getvalue())
+        user.refresh_from_db()
+        self.assertEqual(
+            user.stripe_subscription_status, User.StripeSubscriptionStatus.ACTIVE
+        )
+
+    @patch("timary.models.SentInvoice.success_notification")
+    def test_abandoned_claim_is_processed_again(self, success_notification_mock):
+        SentInvoiceFactory(stripe_payment_intent_id="abc123")
+        event = {
+            "id": "evt_abc123",
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": "abc123"}},
+        }
+        # A worker claimed the event and was killed before finishing it
+        stripe_event = StripeEvent.objects.create(
+            event_id=event["id"],
+            event_type=event["type"],
+            payload=event,
+            claimed_at=timezone.now(),
+            attempts=1,
+        )
+        self.assertFalse(process_stripe_event(stripe_event))
+
+        StripeEvent.objects.filter(id=stripe_event.id).update(
+            claimed_at=timezone.now() - timezone.timedelta(minutes=5)
+        )
+        self.assertEqual(self.post_event(event).status_code, 200)
+
+        stripe_event.refresh_from_db()
+        self.assertIsNotNone(stripe_event.processed_at)
+        self.assertIsNone(stripe_event.claimed_at)
+        self.assertEqual(stripe_event.attempts, 2)
+        self.assertEqual(success_notification_mock.call_count, 1)
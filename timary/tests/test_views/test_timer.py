@@ -0,0 +1,115 @@
+import datetime
+import json
+
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from timary.context_processors import timer
+from timary.models import Timer
+from timary.tests.factories import UserFactory
+from timary.tests.test_views.basetest import BaseTest
+
+
+class TestTimer(BaseTest):
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+
+    def timer_event(self, response):
+        return json.loads(response["HX-Trigger"])["updateTimer"]
+
+    def test_start_timer(self):
+        response = self.client.get(reverse("timary:start_timer"))
+        self.assertEqual(
+            self.timer_event(response), {"active_timer_ms": 0, "action": "start"}
+        )
+        self.assertContains(response, "pause-timer")
+        self.assertIsNotNone(Timer.objects.get(user=self.user).started_at)
+
+    def test_timer_does_not_write_user(self):
+        updated_at = self.user.updated_at
+        self.client.get(reverse("timary:start_timer"))
+        self.client.get(reverse("timary:pause_timer"))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.updated_at, updated_at)
+
+    def test_pause_and_resume_timer(self):
+        Timer.objects.create(
+            user=self.user,
+            started_at=timezone.now() - datetime.timedelta(minutes=5),
+            elapsed=datetime.timedelta(minutes=10),
+        )
+        response = self.client.get(reverse("timary:pause_timer"))
+        self.assertContains(response, "resume-timer")
+        self.assertAlmostEqual(
+            self.timer_event(response)["active_timer_ms"], 15 * 60 * 1000, delta=1000
+        )
+        timer = Timer.objects.get(user=self.user)
+        self.assertIsNone(timer.started_at)
+        self.assertAlmostEqual(timer.elapsed.total_seconds(), 15 * 60, delta=1)
+
+        # Pausing again doesn't count the time twice
+        response = self.client.get(reverse("timary:pause_timer"))
+        self.assertAlmostEqual(
+            self.timer_event(response)["active_timer_ms"], 15 * 60 * 1000, delta=1000
+        )
+
+        response = self.client.get(reverse("timary:resume_timer"))
+        self.assertContains(response, "pause-timer")
+        self.assertIsNotNone(Timer.objects.get(user=self.user).started_at)
+
+    def test_stop_timer(self):
+        Timer.objects.create(
+            user=self.user,
+            started_at=timezone.now() - datetime.timedelta(minutes=1),
+            elapsed=datetime.timedelta(minutes=2),
+        )
+        response = self.client.get(reverse("timary:stop_timer"))
+        self.assertAlmostEqual(
+            self.timer_event(response)["active_timer_ms"], 3 * 60 * 1000, delta=1000
+        )
+        timer = Timer.objects.get(user=self.user)
+        self.assertIsNone(timer.started_at)
+        self.assertEqual(timer.elapsed, datetime.timedelta())
+
+    def test_reset_timer(self):
+        Timer.objects.create(user=self.user, elapsed=datetime.timedelta(minutes=2))
+        response = self.client.get(reverse("timary:reset_timer"))
+        self.assertEqual(self.timer_event(response)["active_timer_ms"], 0)
+        self.assertEqual(
+            Timer.objects.get(user=self.user).elapsed, datetime.timedelta()
+        )
+
+    def test_context_processor_reads_cached_state(self):
+        request = RequestFactory().get("/main/")
+        request.user = self.user
+        with self.assertNumQueries(0):
+            context = timer(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(context["active_timer_ms"], 0)
+        self.assertEqual(context["timer_running"], False)
+        self.assertEqual(context["is_main_view"], True)
+        with self.assertNumQueries(0):
+            self.assertEqual(timer(request)["active_timer_ms"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Timer.start(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(timer(request)["timer_running"])
+
+    def test_cached_state_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Timer.start(self.user.id)
+        self.assertIsNone(cache.get(Timer.cache_key(self.user.id)))
+
+        callbacks[0]()
+        self.assertIsNotNone(cache.get(Timer.cache_key(self.user.id))["started_at"])
+
+    def test_context_processor_skips_htmx(self):
+        request = RequestFactory().get("/main/", HTTP_HX_REQUEST="true")
+        request.user = self.user
+        self.assertEqual(timer(request), {})
@@ -1,5 +1,6 @@
 import zoneinfo
 from dataclasses import dataclass
+from io import StringIO
 from unittest.mock import patch
 
 from django.db.models import Sum
@@ -9,8 +10,10 @@ from django.test.utils import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django_twilio.decorators import twilio_view
+from twilio.twiml.messaging_response import MessagingResponse
 
-from timary.models import HoursLineItem
+from timary.models import HoursLineItem, SMSConversation, User
+from timary.services.twilio_service import TwilioClient
 from timary.tasks import remind_sms_again, send_reminder_sms
 from timary.tests.factories import (
     HoursLineItemFactory,
@@ -27,32 +30,32 @@ user_timezone = zoneinfo.ZoneInfo("America/New_York")
     "timary.tasks.timezone.now",
     return_value=timezone.datetime(2022, 1, 10, 12, tzinfo=user_timezone),
 )
-@patch(
-    "timary.tasks.get_users_localtime",
-    return_value=timezone.datetime(2022, 1, 10, hour=17, tzinfo=user_timezone),
-)
 class TestTwilioSendReminderSMS(TestCase):
+    def send_reminder_sms_at(self, today_mock, *args):
+        today_mock.return_value = timezone.datetime(*args, tzinfo=user_timezone)
+        return send_reminder_sms()
+
     def test_send_0_messages_if_no_active_subscription(
-        self, localtime_mock, today_mock, message_create_mock
+        self, today_mock, message_create_mock
     ):
         invoice = IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
         invoice.user.stripe_subscription_status = 3
         invoice.user.save()
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("0 message(s) sent.", invoices_sent)
 
-    def test_send_0_messages(self, localtime_mock, today_mock, message_create_mock):
-        invoices_sent = send_reminder_sms()
+    def test_send_0_messages(self, today_mock, message_create_mock):
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("0 message(s) sent.", invoices_sent)
 
-    def test_send_1_message(self, localtime_mock, today_mock, message_create_mock):
+    def test_send_1_message(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("1 message(s) sent.", invoices_sent)
 
     def test_send_1_message_filtered_by_already_tracked(
-        self, localtime_mock, today_mock, message_create_mock
+        self, today_mock, message_create_mock
     ):
         user = UserFactory(phone_number_availability=["Mon"])
         IntervalInvoiceFactory(user=user)
@@ -64,73 +67,149 @@ class TestTwilioSendReminderSMS(TestCase):
             ),
         )
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("1 message(s) sent.", invoices_sent)
 
-    def test_send_3_messages(self, localtime_mock, today_mock, message_create_mock):
+    def test_send_3_messages(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("3 message(s) sent.", invoices_sent)
 
-    def test_send_1_message_filtering_users(
-        self, localtime_mock, today_mock, message_create_mock
-    ):
+    def test_send_1_message_filtering_users(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number=None)
         IntervalInvoiceFactory(user__phone_number="")
         IntervalInvoiceFactory(is_paused=True)
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("1 message(s) sent.", invoices_sent)
 
     def test_send_1_message_from_1_user_with_2_invoices(
-        self, localtime, today_mock, message_create_mock
+        self, today_mock, message_create_mock
     ):
         user = UserFactory(phone_number_availability=["Mon"])
 
         IntervalInvoiceFactory(user=user)
         IntervalInvoiceFactory(user=user)
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("1 message(s) sent.", invoices_sent)
 
-    def test_does_not_send_1_message_on_off_day(
-        self, localtime, today_mock, message_create_mock
-    ):
+    def test_does_not_send_1_message_on_off_day(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Tue"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("0 message(s) sent.", invoices_sent)
 
-    def test_does_not_send_1_message_on_off_hour(
-        self, localtime, today_mock, message_create_mock
-    ):
-        localtime.return_value = timezone.datetime(
-            2022, 1, 10, hour=17, minute=1, tzinfo=user_timezone
-        )
+    def test_does_not_send_1_message_on_off_hour(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 16, 59)
         self.assertEqual("0 message(s) sent.", invoices_sent)
 
-    def test_do_not_send_1_message_in_between(
-        self, localtime, today_mock, message_create_mock
-    ):
+    def test_do_not_send_1_message_in_between(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Sun", "Tue"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("0 message(s) sent.", invoices_sent)
 
-    def test_send_reminder(self, localtime, today_mock, message_create_mock):
+    def test_send_reminder(self, today_mock, message_create_mock):
         IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
 
-        invoices_sent = send_reminder_sms()
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
         self.assertEqual("1 message(s) sent.", invoices_sent)
 
-    def test_resend_sms_reminder(self, localtime, today_mock, message_create_mock):
+    def test_send_reminder_once_and_reschedule(self, today_mock, message_create_mock):
+        invoice = IntervalInvoiceFactory(user__phone_number_availability=["Mon", "Wed"])
+        self.assertEqual(
+            invoice.user.next_sms_reminder_at,
+            timezone.datetime(2022, 1, 10, 17, tzinfo=user_timezone),
+        )
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17, 20)
+        self.assertEqual("1 message(s) sent.", invoices_sent)
+        invoice.user.refresh_from_db()
+        self.assertEqual(
+            invoice.user.next_sms_reminder_at,
+            timezone.datetime(2022, 1, 12, 17, tzinfo=user_timezone),
+        )
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17, 21)
+        self.assertEqual("0 message(s) sent.", invoices_sent)
+
+    def test_missed_reminder_is_rescheduled(self, today_mock, message_create_mock):
+        invoice = IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 18, 1)
+        self.assertEqual("0 message(s) sent.", invoices_sent)
+        invoice.user.refresh_from_db()
+        self.assertEqual(
+            invoice.user.next_sms_reminder_at,
+            timezone.datetime(2022, 1, 17, 17, tzinfo=user_timezone),
+        )
+
+    def test_reminder_stays_at_5pm_across_dst(self, today_mock, message_create_mock):
+        today_mock.return_value = timezone.datetime(
+            2022, 3, 12, 18, tzinfo=user_timezone
+        )
+        invoice = IntervalInvoiceFactory(user__phone_number_availability=["Sun"])
+        self.assertEqual(
+            invoice.user.next_sms_reminder_at,
+            timezone.datetime(2022, 3, 13, 21, tzinfo=zoneinfo.ZoneInfo("UTC")),
+        )
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 3, 13, 17)
+        self.assertEqual("1 message(s) sent.", invoices_sent)
+
+    def test_unrelated_save_after_5pm_keeps_reminder(
+        self, today_mock, message_create_mock
+    ):
+        invoice = IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
+        today_mock.return_value = timezone.datetime(
+            2022, 1, 10, 17, 0, 30, tzinfo=user_timezone
+        )
+        user = User.objects.get(id=invoice.user.id)
+        user.first_name = "Ari"
+        user.save()
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17, 1)
+        self.assertEqual("1 message(s) sent.", invoices_sent)
+
+    def test_failed_sms_does_not_stop_run_or_repeat(
+        self, today_mock, message_create_mock
+    ):
+        IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
+        IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
+        message_create_mock.side_effect = [Exception("Invalid number"), None]
+
+        with patch("sys.stderr", new_callable=StringIO) as stderr:
+            invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
+        self.assertEqual("1 message(s) sent.", invoices_sent)
+        self.assertIn("Unable to send reminder sms", stderr.getvalue())
+
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17, 1)
+        self.assertEqual("0 message(s) sent.", invoices_sent)
+        self.assertEqual(message_create_mock.call_count, 2)
+
+    def test_overlapping_runs_text_once(self, today_mock, message_create_mock):
+        IntervalInvoiceFactory(user__phone_number_availability=["Mon"])
+        overlapping_runs = []
+
+        def send_again(*args, **kwargs):
+            # Another run starting while this one is still texting
+            if not overlapping_runs:
+                overlapping_runs.append(send_reminder_sms())
+
+        message_create_mock.side_effect = send_again
+        invoices_sent = self.send_reminder_sms_at(today_mock, 2022, 1, 10, 17)
+        self.assertEqual("1 message(s) sent.", invoices_sent)
+        self.assertEqual(overlapping_runs, ["0 message(s) sent."])
+        self.assertEqual(message_create_mock.call_count, 1)
+
+    def test_resend_sms_reminder(self, today_mock, message_create_mock):
         user = UserFactory(phone_number_availability=["Mon"], email="test@test.com")
         IntervalInvoiceFactory(user=user)
 
@@ -138,7 +217,7 @@ class TestTwilioSendReminderSMS(TestCase):
         self.assertEqual("1 message(s) resent.", invoices_sent)
 
     def test_do_not_resend_sms_reminder_if_set_prior(
-        self, localtime, today_mock, message_create_mock
+        self, today_mock, message_create_mock
     ):
         user = UserFactory(phone_number_availability=["Mon"], email="test@test.com")
         IntervalInvoiceFactory(user=user, sms_ping_today=True)
@@ -147,11 +226,6 @@ class TestTwilioSendReminderSMS(TestCase):
         self.assertEqual("0 message(s) resent.", invoices_sent)
 
 
-@dataclass
-class Message:
-    body: str
-
-
 @dataclass
 class MessageResponse:
     response: str
@@ -176,13 +250,10 @@ class TestTwilioReplyWebhook(TestCase):
         }
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_no_invoices_left_to_sms(self, message_list_mock, message_response_mock):
+    def test_no_invoices_left_to_sms(self, message_response_mock):
         invoice = IntervalInvoiceFactory(user=self.user)
 
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -198,15 +269,12 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.first().quantity, 1)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_1_invoice_left_to_sms(self, message_list_mock, message_response_mock):
+    def test_1_invoice_left_to_sms(self, message_response_mock):
         invoice = IntervalInvoiceFactory(user=self.user)
         invoice2 = IntervalInvoiceFactory(user=self.user)
 
         # FIRST INVOICE SMS SENT
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -221,9 +289,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 1)
 
         # SECOND INVOICE SMS SENT
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice2.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice2)
         self.data["Body"] = "2"
         request = self.factory.post(
             reverse("timary:twilio_reply"),
@@ -240,19 +306,14 @@ class TestTwilioReplyWebhook(TestCase):
         )
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_1_invoice_left_to_sms_already_sent(
-        self, message_list_mock, message_response_mock
-    ):
+    def test_1_invoice_left_to_sms_already_sent(self, message_response_mock):
         IntervalInvoiceFactory(user=self.user, sms_ping_today=True)
         invoice2 = IntervalInvoiceFactory(user=self.user)
 
         self.assertEqual(len(self.user.invoices_not_logged()), 1)
 
         # FIRST INVOICE SMS SENT
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice2.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice2)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -267,15 +328,10 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(self.user.invoices_not_logged(), None)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_invalid_response_type_in_body(
-        self, message_list_mock, message_response_mock
-    ):
+    def test_invalid_response_type_in_body(self, message_response_mock):
         invoice = IntervalInvoiceFactory(user=self.user)
 
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         invalid_data = self.data.copy()
@@ -299,10 +355,8 @@ class TestTwilioReplyWebhook(TestCase):
     @patch("timary.services.twilio_service.TwilioClient.send_message")
     @patch("timary.services.twilio_service.TwilioClient.log_hours")
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
     def test_twilio_get_messages_error_resends_message_to_log(
         self,
-        message_list_mock,
         message_response_mock,
         log_hours_mock,
         send_message_mock,
@@ -311,7 +365,6 @@ class TestTwilioReplyWebhook(TestCase):
         send_message_mock.return_value = None
         invoice = IntervalInvoiceFactory(user=self.user)
 
-        message_list_mock.return_value = [None]
         message_response_mock.return_value = MessageResponse(response="")
 
         # FIRST INVOICE SENT, ERROR ON TWILIO SIDE
@@ -328,9 +381,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
         # RESEND INVOICE SMS
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -345,16 +396,11 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 1)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_body_has_to_be_greater_than_half_hour(
-        self, message_list_mock, message_response_mock
-    ):
+    def test_body_has_to_be_greater_than_half_hour(self, message_response_mock):
         invoice = IntervalInvoiceFactory(user=self.user)
 
         # FIRST INVOICE SENT, NOT ENOUGH HOURS
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         invalid_data = self.data.copy()
@@ -375,11 +421,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
         # SECOND INVOICE SENT, HOURS LOGGED MORE THAN 30 MINUTES
-        message_list_mock.return_value = [
-            Message(
-                f"Hours have to be greater than 0. How many hours to log for: {invoice.title}. Reply 'S' to skip"
-            )
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         updated_data = self.data.copy()
         updated_data["Body"] = "0.6"
         request = self.factory.post(
@@ -394,16 +436,11 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 1)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_body_has_to_be_less_than_24(
-        self, message_list_mock, message_response_mock
-    ):
+    def test_body_has_to_be_less_than_24(self, message_response_mock):
         invoice = IntervalInvoiceFactory(user=self.user)
 
         # FIRST INVOICE SENT, NOT ENOUGH HOURS
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         invalid_data = self.data.copy()
@@ -424,11 +461,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
         # SECOND INVOICE SENT, HOURS LOGGED MORE THAN 30 MINUTES
-        message_list_mock.return_value = [
-            Message(
-                f"Hours have to be greater than 0. How many hours to log for: {invoice.title}. Reply 'S' to skip"
-            )
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         updated_data = self.data.copy()
         updated_data["Body"] = "5"
         request = self.factory.post(
@@ -443,17 +476,14 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 1)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_skip_invoice(self, message_list_mock, message_response_mock):
+    def test_skip_invoice(self, message_response_mock):
         """Since we hide hours logged with '0' hours, this is a hack to 'skip'"""
         invoice = IntervalInvoiceFactory(title="Invoice1", user=self.user)
         invoice2 = IntervalInvoiceFactory(title="Invoice2", user=self.user)
         self.data["Body"] = "S"
 
         # FIRST INVOICE SMS SENT
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}. Reply 'S' to skip")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -470,9 +500,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(invoice.get_hours_tracked().count(), 0)
 
         # SECOND INVOICE SMS SENT
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice2.title}.")
-        ]
+        SMSConversation.record_prompt(self.user, invoice2)
 
         self.data["Body"] = "2"
         request = self.factory.post(
@@ -489,17 +517,14 @@ class TestTwilioReplyWebhook(TestCase):
             HoursLineItem.objects.aggregate(total=Sum("quantity"))["total"], 2
         )
 
+    @patch("timary.services.twilio_service.TwilioClient.send_message")
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_invoice_not_found(self, message_list_mock, message_response_mock):
-        """Return an error message if invoice isn't found in twilio body."""
+    def test_invoice_not_found(self, message_response_mock, send_message_mock):
+        """Nothing is logged if the invoice prompted for was deleted since."""
         self.data["Body"] = "1"
-        fake_invoice_title = "Invoice Not Found"
-        message_list_mock.return_value = [
-            Message(
-                f"How many hours to log for: {fake_invoice_title}. Reply 'S' to skip"
-            )
-        ]
+        invoice = IntervalInvoiceFactory(user=self.user)
+        SMSConversation.record_prompt(self.user, invoice)
+        invoice.delete()
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -508,24 +533,74 @@ class TestTwilioReplyWebhook(TestCase):
         )
 
         with override_settings(DEBUG=True):
-            response = twilio_view(twilio_reply(request))
+            twilio_view(twilio_reply(request))
 
-        self.assertIn(
-            f"Unable to track hours for {fake_invoice_title}.", response.response
+        send_message_mock.assert_called_once_with(
+            self.user, "All set for today. Keep it up!"
         )
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
+    @patch("timary.services.twilio_service.TwilioClient.send_message")
+    @patch("timary.services.twilio_service.TwilioClient.log_hours")
+    def test_unknown_number_gets_empty_reply(self, log_hours_mock, send_message_mock):
+        self.data["From"] = "+17742613187"
+        IntervalInvoiceFactory(user=self.user)
+
+        request = self.factory.post(reverse("timary:twilio_reply"), data=self.data)
+        with override_settings(DEBUG=True):
+            response = twilio_reply(request)
+
+        self.assertEqual(response.content.decode(), str(MessagingResponse()))
+        log_hours_mock.assert_not_called()
+        send_message_mock.assert_not_called()
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+
+    @patch("timary.services.twilio_service.TwilioClient.log_hours")
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
-    def test_hours_passed_as_hours_and_min(
-        self, message_list_mock, message_response_mock
+    def test_conversation_ignored_after_number_changes(
+        self, message_response_mock, log_hours_mock
+    ):
+        invoice = IntervalInvoiceFactory(user=self.user)
+        SMSConversation.record_prompt(self.user, invoice)
+        self.user.phone_number = "+17742613187"
+        self.user.save()
+        new_owner = UserFactory(phone_number=self.phone_number)
+        new_invoice = IntervalInvoiceFactory(user=new_owner)
+        message_response_mock.return_value = MessageResponse(response="")
+
+        request = self.factory.post(reverse("timary:twilio_reply"), data=self.data)
+        with override_settings(DEBUG=True):
+            twilio_view(twilio_reply(request))
+
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+        log_hours_mock.assert_called_once_with(new_invoice)
+
+    @patch("timary.services.twilio_service.TwilioClient.send_message")
+    @patch("timary.views.twilio_views.MessagingResponse")
+    def test_invoice_logged_since_prompt_is_not_logged_again(
+        self, message_response_mock, send_message_mock
     ):
+        invoice = IntervalInvoiceFactory(user=self.user)
+        SMSConversation.record_prompt(self.user, invoice)
+        invoice.sms_ping_today = True
+        invoice.save()
+        message_response_mock.return_value = MessageResponse(response="")
+
+        request = self.factory.post(reverse("timary:twilio_reply"), data=self.data)
+        with override_settings(DEBUG=True):
+            twilio_view(twilio_reply(request))
+
+        self.assertEqual(HoursLineItem.objects.count(), 0)
+        send_message_mock.assert_called_once_with(
+            self.user, "All set for today. Keep it up!"
+        )
+
+    @patch("timary.views.twilio_views.MessagingResponse")
+    def test_hours_passed_as_hours_and_min(self, message_response_mock):
         """Return an error message if invoice isn't found in twilio body."""
         self.data["Body"] = "1:30"
         invoice = IntervalInvoiceFactory(title="Invoice1", user=self.user)
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}. Reply 'S' to skip")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -539,17 +614,40 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(response.response, "All set for today. Keep it up!")
         self.assertEqual(HoursLineItem.objects.count(), 1)
 
-    @patch("timary.views.twilio_views.MessagingResponse")
     @patch("twilio.rest.api.v2010.account.message.MessageList.list")
+    @patch("twilio.rest.api.v2010.account.message.MessageList.create")
+    @patch("timary.views.twilio_views.MessagingResponse")
+    def test_prompts_are_recorded_for_replies(
+        self, message_response_mock, message_create_mock, message_list_mock
+    ):
+        """Replies find the invoice prompted for without reading messages back from Twilio"""
+        invoice = IntervalInvoiceFactory(title="Website", user=self.user)
+        invoice2 = IntervalInvoiceFactory(title="Website", user=self.user)
+        message_response_mock.return_value = MessageResponse(response="")
+
+        TwilioClient.log_hours(invoice)
+        conversation = SMSConversation.objects.get(phone_number=self.phone_number)
+        self.assertEqual(conversation.invoice_id, invoice.id)
+
+        request = self.factory.post(reverse("timary:twilio_reply"), data=self.data)
+        with override_settings(DEBUG=True):
+            response = twilio_view(twilio_reply(request))
+
+        message_list_mock.assert_not_called()
+        self.assertIn("How many hours to log for: Website", response.response)
+        self.assertEqual(invoice.get_hours_tracked().count(), 1)
+        self.assertEqual(invoice2.get_hours_tracked().count(), 0)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.invoice_id, invoice2.id)
+
+    @patch("timary.views.twilio_views.MessagingResponse")
     def test_raise_error_if_hours_passed_as_hours_and_min_not_valid(
-        self, message_list_mock, message_response_mock
+        self, message_response_mock
     ):
         """Return an error message if invoice isn't found in twilio body."""
         self.data["Body"] = "1::30"
         invoice = IntervalInvoiceFactory(title="Invoice1", user=self.user)
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}. Reply 'S' to skip")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -568,17 +666,14 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
     @patch("timary.views.twilio_views.MessagingResponse")
-    @patch("twilio.rest.api.v2010.account.message.MessageList.list")
     def test_respond_to_raised_error_if_hours_passed_as_hours_and_min_not_valid(
-        self, message_list_mock, message_response_mock
+        self, message_response_mock
     ):
         """Return an error message if invoice isn't found in twilio body."""
         # FIRST INVOICE IS VALID PARSED
         self.data["Body"] = "1::30"
         invoice = IntervalInvoiceFactory(title="Invoice1", user=self.user)
-        message_list_mock.return_value = [
-            Message(f"How many hours to log for: {invoice.title}. Reply 'S' to skip")
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
         message_response_mock.return_value = MessageResponse(response="")
 
         request = self.factory.post(
@@ -597,12 +692,7 @@ class TestTwilioReplyWebhook(TestCase):
         self.assertEqual(HoursLineItem.objects.count(), 0)
 
         # SECOND INVOICE PARSED IT CORRECTLY DUE TO THE SECOND ':' IN BODY
-        message_list_mock.return_value = [
-            Message(
-                f"Wrong input, allowed formats are '1.5' or '1:30'. "
-                f"How many hours to log for: {invoice.title}. Reply 'S' to skip",
-            )
-        ]
+        SMSConversation.record_prompt(self.user, invoice)
 
         self.data["Body"] = "2:30"
         request = self.factory.post(
@@ -86,9 +86,17 @@ urlpatterns += [
 # HOURS URLS
 urlpatterns += [
     path("hours/", views.create_daily_hours, name="create_hours"),
+    path("hours/bulk/", views.bulk_create_hours, name="bulk_create_hours"),
+    path("hours/import/", views.import_hours, name="import_hours"),
+    path(
+        "hours/import/<uuid:hours_import_id>/",
+        views.hours_import_progress,
+        name="hours_import_progress",
+    ),
     path("hours/quick/", views.quick_hours, name="quick_hours"),
     path("hours/repeat/", views.repeat_hours, name="repeat_hours"),
     path("hours/month/", views.hours_for_month, name="hours_for_month"),
+    path("hours/page/", views.hours_page, name="hours_page"),
     path("hours/<uuid:hours_id>/", views.get_hours, name="get_single_hours"),
     path("hours/<uuid:hours_id>/edit/", views.edit_hours, name="edit_hours"),
     path("hours/<uuid:hours_id>/update/", views.update_hours, name="update_hours"),
@@ -3,12 +3,13 @@ import json
 import zoneinfo
 from calendar import HTMLCalendar
 from datetime import datetime
-from functools import reduce
 
 from django.db.models import Sum
 from django.utils import timezone
 from requests import Response
 
+from timary.cache import HOURS_CALENDAR, cached_for_user
+
 
 def show_alert_message(
     response, alert_type, message, other_trigger=None, persist=False
@@ -25,25 +26,21 @@ def show_alert_message(
     )
 
 
-def show_active_timer(user):
-    context = {}
-    if user.timer_is_active:
-        running_times = (
-            user.timer_is_active["running_times"]
-            if "running_times" in user.timer_is_active
-            else []
-        )
-        timer_running = user.timer_is_active["timer_running"]
-        if timer_running:
-            now = datetime.timestamp(datetime.now())
-            running_times.append(now - int(user.timer_is_active["time_started"]))
-        context["active_timer_ms"] = calculate_accumulative_time(running_times)
-        context["timer_running"] = timer_running
-    return context
+def timer_context(state):
+    """Milliseconds on a Timer.state() and whether it's counting"""
+    seconds = state["elapsed"]
+    if state["started_at"]:
+        seconds += max(timezone.now().timestamp() - state["started_at"], 0)
+    return {
+        "active_timer_ms": seconds * 1000,
+        "timer_running": bool(state["started_at"]),
+    }
+
 
+def show_active_timer(user):
+    from timary.models import Timer
 
-def calculate_accumulative_time(times):
-    return reduce(lambda a, b: a + b, times, 0) * 1000
+    return timer_context(Timer.state(user.id))
 
 
 def simulate_requests_response(status_code, error_num, message):
@@ -201,15 +198,22 @@ class Calendar(HTMLCalendar):
     def formatmonth(self, withyear=True):
         from timary.models import HoursLineItem
 
-        events = HoursLineItem.objects.filter(
-            date_tracked__year=self.year,
-            date_tracked__month=self.month,
-            invoice__user=self.user,
-        ).select_related("invoice", "invoice__user")
-
-        cal = '<table border="0" cellpadding="0" cellspacing="0" class="calendar">\n'
-        cal += f"{self.formatmonthname(self.year, self.month, withyear=withyear)}\n"
-        cal += f"{self.formatweekheader()}\n"
-        for week in self.monthdays2calendar(self.year, self.month):
-            cal += f"{self.formatweek(week, events)}\n"
-        return cal
+        def month_calendar():
+            events = HoursLineItem.objects.filter(
+                date_tracked__year=self.year,
+                date_tracked__month=self.month,
+                invoice__user=self.user,
+            ).select_related("invoice", "invoice__user")
+
+            cal = (
+                '<table border="0" cellpadding="0" cellspacing="0" class="calendar">\n'
+            )
+            cal += f"{self.formatmonthname(self.year, self.month, withyear=withyear)}\n"
+            cal += f"{self.formatweekheader()}\n"
+            for week in self.monthdays2calendar(self.year, self.month):
+                cal += f"{self.formatweek(week, events)}\n"
+            return cal
+
+        return cached_for_user(
+            self.user, HOURS_CALENDAR, month_calendar, self.year, self.month, withyear
+        )
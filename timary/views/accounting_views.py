@@ -114,7 +114,14 @@ def accounting_sync(request):
         }
         if not client.accounting_customer_id:
             try:
-                accounting_service.service_klass().create_customer(client, auth_token)
+                accounting_service.call_with_rate_limit(
+                    request.user,
+                    "create_customer",
+                    client,
+                    auth_token,
+                    retry_task="timary.tasks.sync_client",
+                    retry_id=client.id,
+                )
             except AccountingError as ae:
                 synced_client["customer_synced_error"] = ae.log()
                 synced_client["customer_synced"] = False
@@ -144,8 +151,13 @@ def accounting_sync(request):
             else:
                 # Only sync if invoice isn't synced and paid already
                 try:
-                    accounting_service.service_klass().create_invoice(
-                        sent_invoice, auth_token
+                    accounting_service.call_with_rate_limit(
+                        request.user,
+                        "create_invoice",
+                        sent_invoice,
+                        auth_token,
+                        retry_task="timary.tasks.sync_sent_invoice",
+                        retry_id=sent_invoice.id,
                     )
                 except AccountingError as ae:
                     sent_invoice_synced_error = ae.log()
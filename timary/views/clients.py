@@ -6,6 +6,7 @@ from django.http import Http404, HttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from timary.cache import conditional_on_user_data
 from timary.custom_errors import AccountingError
 from timary.forms import ClientForm
 from timary.models import Client, Invoice
@@ -16,6 +17,7 @@ from timary.utils import show_alert_message
 
 @login_required()
 @require_http_methods(["GET"])
+@conditional_on_user_data()
 def get_clients(request):
     clients = request.user.my_clients.prefetch_related("proposals").order_by("name")
     context = {
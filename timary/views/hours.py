@@ -9,10 +9,11 @@ from django.http import Http404, HttpResponse, QueryDict
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
+from django_q.tasks import async_task
 
-from timary.forms import HoursLineItemForm
+from timary.forms import HoursFormSet, HoursImportForm, HoursLineItemForm
 from timary.hours_manager import HoursManager
-from timary.models import HoursLineItem, Invoice, MilestoneInvoice
+from timary.models import HoursImport, HoursLineItem, Invoice, MilestoneInvoice
 from timary.tasks import gather_recurring_hours
 from timary.utils import get_users_localtime, show_alert_message
 
@@ -29,7 +30,7 @@ def create_daily_hours(request):
     repeat_interval_schedule = request_data.get("repeat_interval_schedule")
     repeat_interval_days = request_data.getlist("repeat_interval_days")
 
-    hour_forms = []
+    rows = []
     for inv in request_data.getlist("invoice"):
         data = {
             "quantity": hours,
@@ -46,19 +47,85 @@ def create_daily_hours(request):
                     "repeat_interval_days": repeat_interval_days,
                 }
             )
+        rows.append(data)
 
-        hr_form = HoursLineItemForm(data=data, user=request.user)
-        if not hr_form.is_valid():
-            response = render(request, "hours/_create.html", {"form": hr_form})
-            response["HX-Retarget"] = "#new-hours-form"
-            return response
-        else:
-            hour_forms.append(hr_form)
-    for hour_form in hour_forms:
-        hours_saved = hour_form.save()
-        if "recurring_logic" in hour_form.cleaned_data:
-            hours_saved.recurring_logic = hour_form.cleaned_data.get("recurring_logic")
-            hours_saved.save()
+    hours_formset = HoursFormSet.from_rows(rows, user=request.user)
+    if not hours_formset.is_valid():
+        return render_hours_formset_errors(request, hours_formset)
+    return save_hours_formset(request, hours_formset)
+
+
+@login_required()
+@require_http_methods(["POST"])
+def bulk_create_hours(request):
+    """
+    Create many rows of hours at once, e.g. a week of hours across invoices, posted as a formset:
+    form-TOTAL_FORMS, form-INITIAL_FORMS and form-<n>-quantity/date_tracked/invoice per row.
+    Rows take the same repeating/recurring fields as a single hours entry.
+    """
+    hours_formset = HoursFormSet(request.POST, user=request.user)
+    if not hours_formset.is_valid():
+        return render_hours_formset_errors(request, hours_formset)
+    return save_hours_formset(request, hours_formset)
+
+
+@login_required()
+@require_http_methods(["GET", "POST"])
+def import_hours(request):
+    """Upload a CSV or XLSX file of hours, imported in the background by timary.tasks.import_hours"""
+    form = HoursImportForm()
+    if request.method == "POST":
+        form = HoursImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            hours_import = form.save(commit=False)
+            hours_import.user = request.user
+            hours_import.save()
+            _ = async_task("timary.tasks.import_hours", str(hours_import.id))
+            form = HoursImportForm()
+    return render(
+        request,
+        "partials/settings/bookkeeping/_edit_import_hours.html",
+        {
+            "form": form,
+            "hours_imports": request.user.hours_imports.order_by("-created_at")[:3],
+        },
+    )
+
+
+@login_required()
+@require_http_methods(["GET"])
+def hours_import_progress(request, hours_import_id):
+    hours_import = get_object_or_404(HoursImport, id=hours_import_id, user=request.user)
+    return render(
+        request,
+        "partials/settings/bookkeeping/_import_hours_progress.html",
+        {"hours_import": hours_import},
+    )
+
+
+def render_hours_formset_errors(request, hours_formset):
+    if not hours_formset.management_form.is_valid():
+        response = HttpResponse(status=400)
+        show_alert_message(response, "warning", "Unable to add hours")
+        return response
+    # Show the first row with an error, errors across rows are shown on the first row
+    hr_form = next((form for form in hours_formset if form.errors), None)
+    if not hr_form:
+        hr_form = (
+            hours_formset.forms[0]
+            if hours_formset.forms
+            else HoursFormSet.form(user=request.user)
+        )
+        for error in hours_formset.non_form_errors():
+            hr_form.add_error(None, error)
+    response = render(request, "hours/_create.html", {"form": hr_form})
+    response["HX-Retarget"] = "#new-hours-form"
+    return response
+
+
+def save_hours_formset(request, hours_formset):
+    """Insert every row, then render the hours list once"""
+    hours_formset.save()
 
     user = request.user
     if not user.onboarding_tasks["add_first_hours"]:
@@ -70,7 +137,7 @@ def create_daily_hours(request):
     show_most_frequent_options = hours_manager.show_most_frequent_options()
 
     context = {
-        "hours": hours_manager.hours,
+        **hours_manager.get_hours_page(),
         "show_repeat": show_repeat_option,
         "last_month_date": datetime.date.today() - relativedelta(months=1),
     }
@@ -112,7 +179,7 @@ def quick_hours(request):
         hours_manager = HoursManager(request.user)
         show_most_frequent_options = hours_manager.show_most_frequent_options()
         context = {
-            "hours": hours_manager.hours,
+            **hours_manager.get_hours_page(),
             "last_month_date": datetime.date.today() - relativedelta(months=1),
         }
         if len(show_most_frequent_options) > 0:
@@ -337,7 +404,7 @@ def repeat_hours(request):
     show_repeat_option = hours_manager.can_repeat_previous_hours_logged()
     show_most_frequent_options = hours_manager.show_most_frequent_options()
     context = {
-        "hours": hours_manager.hours,
+        **hours_manager.get_hours_page(),
         "show_repeat": show_repeat_option,
         "last_month_date": datetime.date.today() - relativedelta(months=1),
     }
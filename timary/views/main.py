@@ -5,13 +5,22 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Sum
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
+from django.template.defaultfilters import date as date_filter
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.views.decorators.http import require_http_methods
 
+from timary.cache import (
+    PENDING_SENT_INVOICES,
+    cached_for_user,
+    conditional_on_user_data,
+    user_data_etag,
+)
 from timary.forms import HoursLineItemForm
 from timary.hours_manager import HoursManager
-from timary.models import SentInvoice, User
+from timary.models import SentInvoice, Timer, User
+from timary.querysets import decode_hours_cursor
 from timary.utils import Calendar, get_users_localtime, show_active_timer
 
 
@@ -20,17 +29,20 @@ def bad_request(request, exception):
 
 
 def get_pending_sent_invoices(user):
-    sent_invoices_pending = SentInvoice.objects.filter(user=user).exclude(
-        Q(paid_status=SentInvoice.PaidStatus.PAID)
-        | Q(paid_status=SentInvoice.PaidStatus.CANCELLED)
-    )
-    balance_owed = sent_invoices_pending.aggregate(owed=Sum("total_price"))
-    return {
-        "pending_invoices": {
-            "num_pending": sent_invoices_pending.count(),
-            "balance": balance_owed["owed"] or 0,
+    def pending_sent_invoices():
+        sent_invoices_pending = SentInvoice.objects.filter(user=user).exclude(
+            Q(paid_status=SentInvoice.PaidStatus.PAID)
+            | Q(paid_status=SentInvoice.PaidStatus.CANCELLED)
+        )
+        balance_owed = sent_invoices_pending.aggregate(owed=Sum("total_price"))
+        return {
+            "pending_invoices": {
+                "num_pending": sent_invoices_pending.count(),
+                "balance": balance_owed["owed"] or 0,
+            }
         }
-    }
+
+    return cached_for_user(user, PENDING_SENT_INVOICES, pending_sent_invoices)
 
 
 @login_required
@@ -43,7 +55,7 @@ def index(request):
 
     context = {
         "new_hour_form": HoursLineItemForm(user=user),
-        "hours": hours_manager.hours,
+        **hours_manager.get_hours_page(),
         "show_repeat": show_repeat_option,
         "is_main_view": True,  # Needed to show timer controls, hidden for other views
         "last_month_date": datetime.date.today() - relativedelta(months=1),
@@ -57,8 +69,16 @@ def index(request):
     return render(request, "timary/index.html", context=context)
 
 
+def dashboard_stats_etag(request):
+    # A running timer's elapsed time changes on every request
+    if Timer.state(request.user.id)["started_at"]:
+        return None
+    return user_data_etag(request)
+
+
 @login_required()
 @require_http_methods(["GET"])
+@conditional_on_user_data(dashboard_stats_etag)
 def dashboard_stats(request):
     hours_manager = HoursManager(request.user)
     context = hours_manager.get_hours_tracked()
@@ -76,13 +96,14 @@ def dashboard_stats(request):
 
 @login_required()
 @require_http_methods(["GET"])
+@conditional_on_user_data()
 def hours_for_month(request):
     """Show updated hours list for month"""
     request_month = request.GET.get("month")
     month_date = datetime.datetime.strptime(request_month, "%b. %d, %Y")
     hours_manager = HoursManager(request.user, month_date)
     context = {
-        "hours": hours_manager.hours,
+        **hours_manager.get_hours_page(),
         "last_month_date": (month_date - relativedelta(months=1)).date(),
         "specific_month": month_date,
     }
@@ -97,6 +118,31 @@ def hours_for_month(request):
 
 @login_required()
 @require_http_methods(["GET"])
+def hours_page(request):
+    """Next page of the hours list, loaded when the end of the list is scrolled to"""
+    request_month = request.GET.get("month")
+    cursor = request.GET.get("cursor", "")
+    try:
+        month_date = (
+            datetime.datetime.strptime(request_month, "%b. %d, %Y")
+            if request_month
+            else None
+        )
+        last_date_tracked, _ = decode_hours_cursor(cursor)
+        context = HoursManager(request.user, month_date).get_hours_page(cursor)
+    except ValueError:
+        return HttpResponse(status=400)
+    context["specific_month"] = month_date
+    # The template groups hours by their local date, the cursor is in UTC
+    context["continued_day"] = date_filter(
+        timezone.localtime(last_date_tracked), "M. j, Y"
+    )
+    return render(request, "partials/_hours_page.html", context)
+
+
+@login_required()
+@require_http_methods(["GET"])
+@conditional_on_user_data()
 def hours_calendar(request):
     today = get_users_localtime(request.user)
     cal = Calendar(request.user, today)
@@ -7,7 +7,14 @@ from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
-from timary.forms import ClientForm, HoursLineItemForm, InvoiceFeedbackForm, InvoiceForm
+from timary.cache import conditional_on_user_data
+from timary.forms import (
+    ClientForm,
+    HoursLineItemForm,
+    InvoiceChoices,
+    InvoiceFeedbackForm,
+    InvoiceForm,
+)
 from timary.models import Invoice, InvoiceManager
 from timary.services.email_service import EmailService
 from timary.tasks import send_invoice
@@ -16,12 +23,13 @@ from timary.utils import get_users_localtime, show_alert_message
 
 @login_required()
 @require_http_methods(["GET"])
+@conditional_on_user_data()
 def get_invoices(request):
     return render(
         request,
         "invoices/list.html",
         {
-            "invoices": request.user.get_invoices.order_by("title"),
+            "invoices": request.user.get_invoices.with_card_stats().order_by("title"),
         },
     )
 
@@ -33,9 +41,9 @@ def get_archived_invoices(request):
         request,
         "invoices/archive_list.html",
         {
-            "archived_invoices": request.user.invoices.filter(
-                is_archived=True
-            ).order_by("title"),
+            "archived_invoices": request.user.invoices.filter(is_archived=True)
+            .with_card_stats()
+            .order_by("title"),
         },
     )
 
@@ -43,7 +51,7 @@ def get_archived_invoices(request):
 @login_required()
 @require_http_methods(["GET"])
 def manage_invoices(request):
-    invoices = request.user.get_invoices.order_by("title")
+    invoices = request.user.get_invoices.with_card_stats().order_by("title")
     context = {
         "invoices": invoices,
         "new_invoice": InvoiceForm(user=request.user),
@@ -318,14 +326,22 @@ def edit_invoice_hours(request, invoice_id):
         raise Http404
     hours = invoice.get_hours_tracked()
 
-    hour_forms = [HoursLineItemForm(instance=hour, user=request.user) for hour in hours]
+    invoice_choices = InvoiceChoices(request.user)
+    hour_forms = [
+        HoursLineItemForm(
+            instance=hour, user=request.user, invoice_choices=invoice_choices
+        )
+        for hour in hours
+    ]
     return render(
         request,
         "partials/_edit_hours.html",
         {
             "hour_forms": hour_forms,
             "new_hours": HoursLineItemForm(
-                user=request.user, min_date=invoice.last_date
+                user=request.user,
+                min_date=invoice.last_date,
+                invoice_choices=invoice_choices,
             ),
             "invoice": invoice,
         },
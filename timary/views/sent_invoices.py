@@ -12,7 +12,8 @@ from django.views.decorators.http import require_http_methods
 from qrcode.image.svg import SvgPathFillImage
 from weasyprint import CSS, HTML
 
-from timary.forms import HoursLineItemForm
+from timary.cache import conditional_on_user_data
+from timary.forms import HoursLineItemForm, InvoiceChoices
 from timary.invoice_builder import InvoiceBuilder
 from timary.models import HoursLineItem, InvoiceManager, SentInvoice, SingleInvoice
 from timary.services.email_service import EmailService
@@ -109,6 +110,7 @@ def resend_invoice_email(request, sent_invoice_id):
 
 @login_required()
 @require_http_methods(["GET"])
+@conditional_on_user_data()
 def sent_invoices_list(request, invoice_id):
     invoice = InvoiceManager(invoice_id).invoice
     if request.user != invoice.user:
@@ -226,8 +228,12 @@ def edit_sent_invoice_hours(request, sent_invoice_id):
 
     if request.method == "GET":
         hours = sent_invoice.get_hours_tracked()
+        invoice_choices = InvoiceChoices(request.user)
         hour_forms = [
-            HoursLineItemForm(instance=hour, user=request.user) for hour in hours
+            HoursLineItemForm(
+                instance=hour, user=request.user, invoice_choices=invoice_choices
+            )
+            for hour in hours
         ]
         return render(
             request,
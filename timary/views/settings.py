@@ -46,6 +46,8 @@ def settings_partial(request, setting):
         template = "partials/settings/bookkeeping/_accounting.html"
     if setting == "tax_center":
         template = "partials/settings/bookkeeping/_tax_center.html"
+    if setting == "import_hours":
+        template = "partials/settings/bookkeeping/_import_hours.html"
     return render(
         request,
         template,
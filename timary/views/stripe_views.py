@@ -7,15 +7,14 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django_q.tasks import async_task
 
 from timary.forms import PayInvoiceForm
-from timary.invoice_builder import InvoiceBuilder
 from timary.models import SentInvoice, SingleInvoice, User
-from timary.services.email_service import EmailService
 from timary.services.stripe_service import StripeService
+from timary.stripe_events import store_stripe_event, unprocessed_stripe_event
 
 
 @require_http_methods(["GET", "POST"])
@@ -193,120 +192,11 @@ def stripe_webhook(request, stripe_secret):
         # Invalid signature
         raise e
 
-    # Handle the event
-    if event["type"] == "payment_intent.payment_failed":
-        payment_intent = event["data"]["object"]
-
-        if SentInvoice.objects.filter(
-            stripe_payment_intent_id=payment_intent["id"]
-        ).exists():
-            sent_invoice = SentInvoice.objects.get(
-                stripe_payment_intent_id=payment_intent["id"]
-            )
-
-            sent_invoice.paid_status = SentInvoice.PaidStatus.FAILED
-            sent_invoice.save()
-
-            msg_body = InvoiceBuilder(sent_invoice.user).send_invoice(
-                {
-                    "sent_invoice": sent_invoice,
-                    "line_items": sent_invoice.get_rendered_line_items(),
-                }
-            )
-            EmailService.send_html(
-                f"Unable to process {sent_invoice.invoice.user.first_name}'s invoice. "
-                f"An error occurred while trying to "
-                f"transfer the funds for this invoice. Please give it another try.",
-                msg_body,
-                sent_invoice.invoice.client.email,
-            )
-        else:
-            # Other stripe webhook event
-            pass
-
-    elif event["type"] in [
-        "payment_intent.succeeded",
-        "charge.succeeded",
-        "transfer.created",
-    ]:
-        # Handle a successful payment
-        payment_intent = event["data"]["object"]
-        if SentInvoice.objects.filter(
-            stripe_payment_intent_id=payment_intent["id"]
-        ).exists():
-            sent_invoice = SentInvoice.objects.get(
-                stripe_payment_intent_id=payment_intent["id"]
-            )
-            if sent_invoice.paid_status == SentInvoice.PaidStatus.PAID:
-                return JsonResponse({"success": True})
-
-            sent_invoice.paid_status = SentInvoice.PaidStatus.PAID
-            sent_invoice.date_paid = timezone.now()
-            sent_invoice.save()
-            sent_invoice.success_notification()
-        else:
-            # Other stripe webhook event
-            pass
-
-    elif event["type"] == "account.updated":
-        user_account_id = event["data"]["object"]["id"]
-        user = User.objects.filter(stripe_connect_id=user_account_id)
-        if user.exists():
-            user = user.first()
-            account_connect_requirements_reason = event["data"]["object"][
-                "requirements"
-            ]["disabled_reason"]
-            user.update_payouts_enabled(account_connect_requirements_reason)
-
-    elif event["type"] == "invoice.created":
-        user_subscription_id = event["data"]["object"]["id"]
-        user_found = User.objects.filter(stripe_subscription_id=user_subscription_id)
-        if user_found.exists():
-            user = user_found.first()
-            user.stripe_subscription_status = User.StripeSubscriptionStatus.ACTIVE
-            user.save()
-
-            if user.referrer_id:
-                referred_user = User.objects.get(referral_id=user.referral_id)
-                if referred_user:
-                    referred_user.add_referral_discount()
-
-    elif event["type"] in [
-        "invoice.finalization_failed",
-        "invoice.payment_action_required",
-        "invoice.payment_failed",
-    ]:
-        # Could be any reason, but subscription has failed
-        user_subscription_id = event["data"]["object"]["id"]
-        user = User.objects.filter(stripe_subscription_id=user_subscription_id)
-        if user.exists():
-            user = user.first()
-            user.stripe_subscription_status = User.StripeSubscriptionStatus.INACTIVE
-            user.save()
-            EmailService.send_plain(
-                "Oops, something went wrong over here at Timary",
-                f"""
-Hello {user.first_name.capitalize()},
-
-Looks like Stripe had trouble charging your card.
-
-Nothing to worry about, just head to your profile page and update your payment method.
-
-Once that succeeds, then re-activate the subscription and you should be good to go.
-
-If there are any questions, please do not hesitate to reply to this email.
-
-Otherwise, enjoy the rest of your day.
-Aristotel F
-ari@usetimary.com
-                """,
-                user.email,
-            )
-            if not settings.DEBUG:
-                print(f"Subscription failed: user_id={user.id}", file=sys.stderr)
-    else:
-        # ... handle other event types
-        print("Unhandled event type {}".format(event["type"]))
+    # Store the event and let a worker handle it, retried deliveries are dropped here
+    # unless the event was never processed, e.g. its worker was killed.
+    stripe_event = store_stripe_event(event) or unprocessed_stripe_event(event)
+    if stripe_event:
+        _ = async_task("timary.tasks.process_stripe_event", str(stripe_event.id))
     return JsonResponse({"success": True})
 
 
@@ -5,7 +5,7 @@ from django_twilio.decorators import twilio_view
 from django_twilio.request import decompose
 from twilio.twiml.messaging_response import MessagingResponse
 
-from timary.models import HoursLineItem, User
+from timary.models import HoursLineItem, SMSConversation, User
 from timary.services.twilio_service import TwilioClient
 from timary.utils import convert_hours_to_decimal_hours
 
@@ -13,10 +13,17 @@ from timary.utils import convert_hours_to_decimal_hours
 @twilio_view
 def twilio_reply(request):
     twilio_request = decompose(request)
-    user = User.objects.get(phone_number=twilio_request.from_)
+    conversation = SMSConversation.pending(twilio_request.from_)
+    if conversation:
+        user, invoice = conversation.user, conversation.pending_invoice
+    else:
+        user = User.objects.filter(phone_number=twilio_request.from_).first()
+        if not user:
+            # Not a number we text, nothing to reply to
+            return MessagingResponse()
+        invoice = None
 
-    last_message = TwilioClient.get_user_messages(user.formatted_phone_number)
-    if not last_message:
+    if not invoice:
         remaining_invoices = user.invoices_not_logged()
         if remaining_invoices:
             TwilioClient.log_hours(remaining_invoices.pop())
@@ -24,18 +31,6 @@ def twilio_reply(request):
             TwilioClient.send_message(user, "All set for today. Keep it up!")
         return MessagingResponse()
 
-    _, invoice_title = last_message.body.rsplit(":", maxsplit=1)
-    invoice_title = invoice_title.split(".")[0].strip()
-    invoices = user.get_invoices.filter(title__exact=invoice_title)
-    invoice = None
-    if invoices.count() == 1:
-        invoice = invoices.first()
-
-    if not invoice:
-        r = MessagingResponse()
-        r.message(f"Unable to track hours for {invoice_title}.")
-        return r
-
     skip = False
     if twilio_request.body.lower() == "s":
         skip = True
@@ -90,10 +85,12 @@ def twilio_reply(request):
     remaining_invoices = user.invoices_not_logged()
     if remaining_invoices:
         invoice = remaining_invoices.pop()
+        SMSConversation.record_prompt(user, invoice)
         r = MessagingResponse()
         r.message(f"How many hours to log for: {invoice.title}. Reply 'S' to skip")
         return r
     else:
+        SMSConversation.record_prompt(user, None)
         r = MessagingResponse()
         r.message("All set for today. Keep it up!")
         return r